@@ -0,0 +1,195 @@
+'''
+This module contains a persistent archive of elite schedules per problem
+instance, letting new runs on the same or a slightly modified instance
+start from the best schedules of earlier runs.
+
+Archives are kept in a compact binary file per instance.  Each schedule
+stores its fitness as a double followed by the shift and the position within
+that shift of every activity as unsigned shorts.  Archives hold at most
+``archiveSize`` schedules, and keep them diverse: a new schedule assigning
+few activities to other shifts than an archived one competes with it
+instead of being added, and when the archive is full the worse of the two
+most similar schedules is evicted.
+'''
+import os
+import struct
+from array import array
+from Individual import Individual
+import Seeding
+
+HEADER = struct.Struct('<8sHHI')
+MAGIC = 'LTGAELIT'
+VERSION = 1
+FITNESS = struct.Struct('<d')
+
+
+class Elite(object):
+    '''
+    A decoded schedule with its fitness, as kept by an ``Archive``.
+    '''
+    def __init__(self, fitness, shifts, positions):
+        '''
+        Parameters:
+
+        - ``fitness``: The fitness of the schedule.
+        - ``shifts``: The array of the shift of every activity.
+        - ``positions``: The array of every activity's position within its
+          shift.
+        '''
+        self.fitness = fitness
+        self.shifts = shifts
+        self.positions = positions
+
+    @classmethod
+    def fromIndividual(cls, individual):
+        '''
+        Returns the elite holding the schedule of an individual.
+        '''
+        assignment, routes = individual.decode()
+        positions = array('H', [0] * len(assignment))
+        for route in routes.itervalues():
+            for position, activity in enumerate(route):
+                positions[activity - 1] = position
+        return cls(individual.fitness, array('H', assignment), positions)
+
+    def genes(self):
+        '''
+        Returns random-key genes decoding to this schedule.
+        '''
+        routes = {}
+        for activity, shift in enumerate(self.shifts, 1):
+            routes.setdefault(shift, []).append(activity)
+        for route in routes.itervalues():
+            route.sort(key=lambda activity: self.positions[activity - 1])
+        return Seeding.encode(routes, len(self.shifts))
+
+    def distance(self, other):
+        '''
+        Returns the number of activities assigned to different shifts.
+        '''
+        return sum(1 for a, b in zip(self.shifts, other.shifts) if a != b)
+
+    def sameSchedule(self, other):
+        '''
+        Returns True if the other elite holds the same schedule.
+        '''
+        return (self.shifts == other.shifts and
+                self.positions == other.positions)
+
+
+class Archive(object):
+    '''
+    Bounded, diverse set of elite schedules for one instance, loaded from and
+    saved to its binary file.
+    '''
+    def __init__(self, filename, numActivities, size):
+        '''
+        Loads the archive, starting empty if the file does not exist, is not
+        an archive or was made for a different number of activities.
+
+        Parameters:
+
+        - ``filename``: The relative path to the archive file.
+        - ``numActivities``: The number of activities of the instance.
+        - ``size``: The largest number of schedules kept.
+        '''
+        self.filename = filename
+        self.numActivities = numActivities
+        self.size = size
+        self.minimumDistance = max(1, numActivities // 10)
+        self.elites = []
+        try:
+            with open(filename, 'rb') as f:
+                data = f.read()
+        except IOError:
+            return
+        try:
+            magic, version, length, count = HEADER.unpack_from(data)
+        except struct.error:
+            return
+        if magic != MAGIC or version != VERSION or length != numActivities:
+            return
+        offset = HEADER.size
+        width = 2 * numActivities
+        for _ in xrange(count):
+            fitness, = FITNESS.unpack_from(data, offset)
+            offset += FITNESS.size
+            shifts = array('H', data[offset:offset + width])
+            positions = array('H', data[offset + width:offset + 2 * width])
+            offset += 2 * width
+            self.elites.append(Elite(fitness, shifts, positions))
+
+    def save(self):
+        '''
+        Writes the archive to its file, replacing it at once so readers never
+        see a partially written archive.
+        '''
+        directory = os.path.dirname(self.filename)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        parts = [HEADER.pack(MAGIC, VERSION, self.numActivities,
+                             len(self.elites))]
+        for elite in self.elites:
+            parts.append(FITNESS.pack(elite.fitness))
+            parts.append(elite.shifts.tostring())
+            parts.append(elite.positions.tostring())
+        temporary = '%s.%i.tmp' % (self.filename, os.getpid())
+        with open(temporary, 'wb') as f:
+            f.write(''.join(parts))
+        os.rename(temporary, self.filename)
+
+    def add(self, individual):
+        '''
+        Offers the schedule of an evaluated individual to the archive.
+        '''
+        candidate = Elite.fromIndividual(individual)
+        if self.elites:
+            nearest = min(self.elites, key=candidate.distance)
+            if (nearest.sameSchedule(candidate) or
+                    candidate.distance(nearest) < self.minimumDistance):
+                # Too similar to be kept alongside, so they compete
+                if nearest.fitness < candidate.fitness:
+                    self.elites[self.elites.index(nearest)] = candidate
+                return
+        self.elites.append(candidate)
+        if len(self.elites) > self.size:
+            pairs = [(a.distance(b), i, j)
+                     for i, a in enumerate(self.elites)
+                     for j, b in enumerate(self.elites) if i < j]
+            _, i, j = min(pairs)
+            worse = i if self.elites[i].fitness < self.elites[j].fitness else j
+            del self.elites[worse]
+
+    def best(self, count):
+        '''
+        Returns new individuals, without fitness, holding the ``count`` best
+        archived schedules.
+        '''
+        elites = sorted(self.elites, key=lambda elite: elite.fitness,
+                        reverse=True)
+        return [Individual(elite.genes()) for elite in elites[:count]]
+
+
+def archiveFor(config):
+    '''
+    Returns the archive of the instance of a configuration.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information.
+      Should include values for:
+
+      - ``archiveFolder``: The relative path of the folder holding archives.
+      - ``archiveSize``: The largest number of schedules kept per instance.
+      - All values identifying the instance: ``numActivities``,
+        ``numShifts`` and ``problemId``.
+    '''
+    filename = os.path.join(
+        config["archiveFolder"],
+        "hhcrsp_%(numActivities)i_%(numShifts)i_%(problemId)i.elite" % config)
+    return Archive(filename, config['hhcrsp'].numActivities,
+                   config["archiveSize"])
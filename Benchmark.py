@@ -0,0 +1,200 @@
+'''
+This module times the fast paths of LTGA against the code they replace or
+compete with, so claimed speed-ups can be reproduced.  Every benchmark runs
+on the instance of every problem id, from the same seeded initial
+population, and prints the time of each of its variants along with its
+speed-up over the first one.  For example
+
+````pypy Benchmark.py problems/hhcrsp_5_4.cfg -i 1 2 -b linkage````
+'''
+import argparse
+import json
+import random
+import time
+from itertools import combinations
+import Equivalence
+import Experiments
+import FitnessFunction
+import Util
+from Individual import Individual
+from LTGA import LTGA
+from ParallelLinkage import ParallelLinkage
+
+
+def timed(function, *args):
+    '''
+    Returns the number of seconds a call takes.
+    '''
+    start = time.time()
+    function(*args)
+    return time.time() - start
+
+
+def optimizer(config):
+    '''
+    Returns an ``LTGA`` object holding the seeded initial population of the
+    instance of a configuration, ready to build linkage models.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information
+      required by ``Experiments.createInitialPopulation``, including the
+      instance.
+    '''
+    options = Util.moduleClasses(FitnessFunction)
+    evaluator = options[config["problem"]](config, 0)
+    random.seed(hash((config["seed"], 'benchmark')))
+    ltga = LTGA()
+    ltga.hhcrsp = config['hhcrsp']
+    ltga.neighbourhoodSize = config["neighbourhoodSize"]
+    ltga.individuals = Experiments.createInitialPopulation(
+        0, evaluator, config)[0]
+    return ltga
+
+
+def linkage(config):
+    '''
+    Generates ``(variant, seconds)`` for the pairwise linkage of a population
+    with ``clusterDependencyDistance`` and ``pairwiseMutualInformation``,
+    over all pairs of genes and over the edges of ``buildSparseTree``.
+    '''
+    ltga = optimizer(config)
+    length = len(ltga.individuals[0].genes)
+    pairs = list(combinations(xrange(length), 2))
+    for name in ['clusterDependencyDistance', 'pairwiseMutualInformation']:
+        distance = getattr(ltga, name)
+
+        def allPairs():
+            '''
+            Internal function computing every pair with one lookup.
+            '''
+            lookup = {}
+            for a, b in pairs:
+                distance((a,), (b,), lookup)
+
+        yield '%s all pairs' % name, timed(allPairs)
+        random.seed(config["seed"])
+        yield '%s sparse tree' % name, timed(ltga.buildSparseTree, distance,
+                                             {})
+
+
+def parallelLinkage(config):
+    '''
+    Generates ``(variant, seconds)`` for the distance of every pair of genes
+    with the ``distance`` of a configuration, computed with a fresh lookup
+    per pair as ``ParallelLinkage`` workers used to, with one lookup, and by
+    ``linkageWorkers`` processes.
+    '''
+    ltga = optimizer(config)
+    distance = getattr(ltga, config["distance"])
+    length = len(ltga.individuals[0].genes)
+    pairs = list(combinations(xrange(length), 2))
+
+    def fresh():
+        '''
+        Internal function computing every pair with its own lookup.
+        '''
+        for a, b in pairs:
+            distance((a,), (b,), {})
+
+    def shared():
+        '''
+        Internal function computing every pair with one lookup.
+        '''
+        lookup = {}
+        for a, b in pairs:
+            distance((a,), (b,), lookup)
+
+    yield 'fresh lookup per pair', timed(fresh)
+    yield 'one lookup', timed(shared)
+    parallel = ParallelLinkage(ltga, config["distance"], pairs,
+                               max(1, config["linkageWorkers"]))
+    try:
+        yield '%i workers' % max(1, config["linkageWorkers"]), timed(
+            parallel.pairLookup, ltga.individuals)
+    finally:
+        parallel.close()
+
+
+def offspring(ltga, count):
+    '''
+    Returns the genes and threshold of ``count`` offspring of random
+    parents, donors and masks of the population, the threshold being the
+    fitness of the parent.
+    '''
+    random.seed(hash((ltga.hhcrsp.numActivities, 'offspring')))
+    length = len(ltga.individuals[0].genes)
+    result = []
+    for _ in xrange(count):
+        parent, donor = random.sample(ltga.individuals, 2)
+        mask = random.sample(xrange(length), random.randint(1, length // 2))
+        result.append((ltga.applyMask(parent, donor, mask).genes,
+                       parent.fitness))
+    return result
+
+
+def earlyExit(config):
+    '''
+    Generates ``(variant, seconds)`` for the evaluation of offspring in
+    full with ``evaluateBatch`` and against the fitness of their parent with
+    ``evaluateBoundedBatch``, without the route memo so that both compute
+    every route they need.
+    '''
+    ltga = optimizer(config)
+    evaluator = FitnessFunction.FitnessFunction_HHCRSP(
+        dict(config, routeMemoSize=0), 0)
+    children = offspring(ltga, 20 * len(ltga.individuals))
+
+    def batch():
+        '''
+        Internal function returning fresh individuals of the offspring, so
+        no variant reuses schedules decoded by another.
+        '''
+        individuals = []
+        for genes, threshold in children:
+            individual = Individual(list(genes))
+            individual.threshold = threshold
+            individuals.append(individual)
+        return individuals
+
+    yield 'full evaluation', timed(evaluator.evaluateBatch, batch())
+    yield 'early exit', timed(evaluator.evaluateBoundedBatch, batch())
+
+
+# Benchmarks selectable by name, each generating ``(variant, seconds)``
+BENCHMARKS = {'linkage': linkage, 'parallelLinkage': parallelLinkage,
+              'earlyExit': earlyExit}
+
+description = 'Timings of LTGA fast paths'
+parser = argparse.ArgumentParser(description=description)
+parser.add_argument('configs', metavar='Configuration Files',
+                    type=str, nargs='+',
+                    help='One or more json formatted files containing' +
+                    ' configuration information')
+
+parser.add_argument('-i', dest='ids', type=int, nargs='+', default=[0],
+                    help='The problem ids of the instances to use')
+
+parser.add_argument('-b', dest='benchmarks', type=str, nargs='+',
+                    default=sorted(BENCHMARKS), choices=sorted(BENCHMARKS),
+                    help='The benchmarks to run')
+
+parser.add_argument('-x', dest='overrides', type=str, default='{}',
+                    help='A json object of configuration values overriding' +
+                    ' the files')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    args.configs.append('experiments/general.cfg')
+    args.configs.append('variants/hhcrsp.cfg')
+    config = Util.loadConfigurations(args.configs)
+    config.update(json.loads(args.overrides))
+    config['verbose'] = False
+    for name, instanceConfig in Equivalence.instances(config, args.ids):
+        for benchmark in args.benchmarks:
+            reference = None
+            for variant, seconds in BENCHMARKS[benchmark](instanceConfig):
+                if reference is None:
+                    reference = seconds
+                print '%s %s: %.3fs, speed-up %.2fx' % (
+                    name, variant, seconds, reference / max(seconds, 1e-9))
@@ -0,0 +1,302 @@
+'''
+This module contains a golden output harness, which pins the behaviour of the
+current implementation so that later speed-ups can be checked against it.
+Recording stores, for seeded instances, the outputs of each component along
+with the time it took:
+
+- ``fitness``: Fitness values of random genes.
+- ``dependency``: The distance of every pair of genes in an initial
+  population.
+- ``subtrees``: The linkage tree built from that population.
+- ``applyMask``: Offspring created with each mask of that tree.
+- ``oneRun``: Full result dictionaries of seeded runs, without timings.
+
+Checking recomputes them, compares them with the recorded outputs, exactly
+for integers, strings and structure and within a relative tolerance for
+floating point values, and reports the speed-up of each component.  Fast
+paths selected by configuration, such as ``linkageWorkers`` or
+``earlyExit``, are checked by giving overrides.  Result values added since
+recording are not compared, and the harness also runs on trees older than
+itself, so goldens can be recorded from the baseline implementation.  For
+example
+
+````pypy Equivalence.py record golden.json problems/hhcrsp_5_4.cfg -i 1 2````
+
+````pypy Equivalence.py check golden.json problems/hhcrsp_5_4.cfg -i 1 2
+-x '{"linkageWorkers": 4}'````
+'''
+import argparse
+import inspect
+import json
+import random
+import shutil
+import tempfile
+import time
+from itertools import combinations
+import Experiments
+import FitnessFunction
+import Util
+from HHCRSP import HHCRSP
+from LTGA import LTGA
+
+# Result values that depend on the machine rather than the search
+TIMINGS = ['seconds', 'initialSeconds', 'traceSeconds', 'peakMemoryMB']
+
+
+def normalize(value):
+    '''
+    Returns a value as it reads back from json, so recorded and recomputed
+    outputs compare alike.
+    '''
+    return json.loads(json.dumps(value))
+
+
+def compare(reference, value, tolerance, ignored=(), path='',
+            mismatches=None):
+    '''
+    Returns the list of paths at which a recomputed output differs from its
+    reference.  Floating point values only differ if their relative
+    difference is above ``tolerance``.
+
+    Parameters:
+
+    - ``reference``: The recorded output.
+    - ``value``: The recomputed output, already normalized.
+    - ``tolerance``: The relative tolerance of floating point values.
+    - ``ignored``: Dictionary keys whose values are not compared.
+    - ``path``: Where in the output these values are.
+    - ``mismatches``: The list to add differences to.
+    '''
+    if mismatches is None:
+        mismatches = []
+    if isinstance(reference, dict) and isinstance(value, dict):
+        # Keys the recorded implementation did not output yet are new outputs
+        for key in sorted(reference):
+            if key in ignored:
+                continue
+            if key not in value:
+                mismatches.append('%s/%s missing' % (path, key))
+            else:
+                compare(reference[key], value[key], tolerance, ignored,
+                        '%s/%s' % (path, key), mismatches)
+    elif isinstance(reference, list) and isinstance(value, list):
+        if len(reference) != len(value):
+            mismatches.append('%s length %i != %i' % (path, len(reference),
+                                                      len(value)))
+        else:
+            for index, (r, v) in enumerate(zip(reference, value)):
+                compare(r, v, tolerance, ignored, '%s[%i]' % (path, index),
+                        mismatches)
+    elif isinstance(reference, float) or isinstance(value, float):
+        try:
+            scale = max(1.0, abs(reference), abs(value))
+            if abs(reference - value) > tolerance * scale:
+                mismatches.append('%s %r != %r' % (path, reference, value))
+        except TypeError:
+            mismatches.append('%s %r != %r' % (path, reference, value))
+    elif reference != value:
+        mismatches.append('%s %r != %r' % (path, reference, value))
+    return mismatches
+
+
+def components(config):
+    '''
+    Generates ``(name, output, seconds)`` for every component on the
+    instance of a configuration.  Each component is seeded on its own, so
+    its output does not depend on how the others are implemented.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information
+      required by ``Experiments.oneRun``, including the instance.
+    '''
+    def seed(name):
+        '''
+        Internal function seeding the random numbers of a component.
+        '''
+        random.seed(hash((config["seed"], name)))
+
+    options = Util.moduleClasses(FitnessFunction)
+    evaluator = options[config["problem"]](config, 0)
+
+    seed('fitness')
+    genes = [Util.randomGene(config) for _ in xrange(config["popSize"])]
+    start = time.time()
+    output = [evaluator.evaluate(g) for g in genes]
+    yield 'fitness', output, time.time() - start
+
+    seed('dependency')
+    population = Experiments.createInitialPopulation(0, evaluator, config)
+    if isinstance(population, tuple):
+        population = population[0]  # Along with its description
+    ltga = LTGA()
+    ltga.hhcrsp = config['hhcrsp']
+    ltga.neighbourhoodSize = config["neighbourhoodSize"]
+    ltga.skippedOffspring = 0
+    ltga.individuals = population
+    distance = Util.classMethods(ltga)[config["distance"]]
+    length = len(population[0].genes)
+    pairs = list(combinations(xrange(length), 2))
+    start = time.time()
+    if config["linkageWorkers"] > 1:
+        from ParallelLinkage import ParallelLinkage
+        parallel = ParallelLinkage(ltga, config["distance"], pairs,
+                                   config["linkageWorkers"])
+        try:
+            lookup = parallel.pairLookup(population)
+        finally:
+            parallel.close()
+    else:
+        lookup = {}
+    output = [distance((a,), (b,), lookup) for a, b in pairs]
+    yield 'dependency', output, time.time() - start
+
+    seed('subtrees')
+    linkage = Util.classMethods(ltga)[config["linkage"]]
+    start = time.time()
+    if len(inspect.getargspec(linkage).args) > 2:
+        subtrees = linkage(distance, {})
+    else:
+        subtrees = linkage(distance)
+    yield 'subtrees', subtrees, time.time() - start
+
+    seed('applyMask')
+    ordering = Util.classMethods(ltga)[config["ordering"]]
+    start = time.time()
+    output = []
+    for mask in ordering(subtrees):
+        p1, p2 = random.sample(population, 2)
+        output.append(ltga.applyMask(p1, p2, mask).genes)
+    yield 'applyMask', output, time.time() - start
+
+    start = time.time()
+    output = []
+    for runNumber in xrange(config["runs"]):
+        random.seed(hash((config["seed"], runNumber)))
+        evaluator = options[config["problem"]](config, runNumber)
+        result = Experiments.oneRun(runNumber, LTGA, evaluator, config)
+        output.append({key: value for key, value in result.iteritems()
+                       if key not in TIMINGS})
+    yield 'oneRun', output, time.time() - start
+
+
+def instances(config, problemIds):
+    '''
+    Generates ``(name, config)`` for the instance of every problem id, with
+    a fresh folder of initial populations so outputs do not depend on
+    populations saved by earlier experiments.  The folder is removed once
+    the instance is done.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information.
+    - ``problemIds``: The list of problem ids to use.
+    '''
+    for problemId in problemIds:
+        folder = tempfile.mkdtemp()
+        instanceConfig = dict(config, problemId=problemId,
+                              initialPopFolder=folder)
+        random.seed(hash((config['seed'], problemId)))
+        instanceConfig['hhcrsp'] = HHCRSP(instanceConfig)
+        name = 'hhcrsp_%(numActivities)i_%(numShifts)i_%(problemId)i' % (
+            instanceConfig)
+        try:
+            yield name, instanceConfig
+        finally:
+            shutil.rmtree(folder)
+
+
+def record(filename, config, problemIds):
+    '''
+    Records the outputs of every component on the instance of every problem
+    id into a json file.
+
+    Parameters:
+
+    - ``filename``: The relative path to the file to be written to.
+    - ``config``: A dictionary containing all configuration information.
+    - ``problemIds``: The list of problem ids to use.
+    '''
+    golden = {}
+    for name, instanceConfig in instances(config, problemIds):
+        golden[name] = {}
+        for component, output, seconds in components(instanceConfig):
+            golden[name][component] = {'output': normalize(output),
+                                       'seconds': seconds}
+            print name, component, 'recorded in %.3fs' % seconds
+    Util.saveConfiguration(filename, golden)
+
+
+def check(filename, config, problemIds, tolerance, ignored=()):
+    '''
+    Recomputes the outputs of every component and compares them with those
+    recorded, printing the result and speed-up of each.  Returns True if
+    all of them match.
+
+    Parameters:
+
+    - ``filename``: The relative path to the recorded outputs.
+    - ``config``: A dictionary containing all configuration information,
+      which may select different code paths than when recording.
+    - ``problemIds``: The list of problem ids to use.
+    - ``tolerance``: The relative tolerance of floating point values.
+    - ``ignored``: Result values not compared, such as counters a fast path
+      changes by design.
+    '''
+    golden = Util.loadConfiguration(filename)
+    success = True
+    for name, instanceConfig in instances(config, problemIds):
+        for component, output, seconds in components(instanceConfig):
+            reference = golden[name][component]
+            mismatches = compare(reference['output'], normalize(output),
+                                 tolerance, ignored)
+            success = success and not mismatches
+            print '%s %s %s, %.3fs -> %.3fs, speed-up %.2fx' % (
+                name, component, 'MISMATCH' if mismatches else 'ok',
+                reference['seconds'], seconds,
+                reference['seconds'] / max(seconds, 1e-9))
+            for mismatch in mismatches[:5]:
+                print '   ', mismatch
+    return success
+
+
+description = 'Golden output harness for LTGA components'
+parser = argparse.ArgumentParser(description=description)
+parser.add_argument('mode', choices=['record', 'check'],
+                    help='Record the outputs of the current implementation' +
+                    ' or check it against recorded outputs')
+
+parser.add_argument('golden', type=str,
+                    help='The json file holding the recorded outputs')
+
+parser.add_argument('configs', metavar='Configuration Files',
+                    type=str, nargs='+',
+                    help='One or more json formatted files containing' +
+                    ' configuration information')
+
+parser.add_argument('-i', dest='ids', type=int, nargs='+', default=[0],
+                    help='The problem ids of the instances to use')
+
+parser.add_argument('-x', dest='overrides', type=str, default='{}',
+                    help='A json object of configuration values overriding' +
+                    ' the files, for instance to select a fast path')
+
+parser.add_argument('-t', dest='tolerance', type=float, default=1e-9,
+                    help='The relative tolerance of floating point values')
+
+parser.add_argument('-k', dest='ignored', type=str, nargs='+', default=[],
+                    help='Result values not to compare, for instance' +
+                    ' partialEvaluations when checking earlyExit')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    args.configs.append('experiments/general.cfg')
+    args.configs.append('variants/hhcrsp.cfg')
+    config = Util.loadConfigurations(args.configs)
+    config.update(json.loads(args.overrides))
+    config['verbose'] = False
+    if args.mode == 'record':
+        record(args.golden, config, args.ids)
+    elif not check(args.golden, config, args.ids, args.tolerance,
+                   args.ignored):
+        raise SystemExit(1)
@@ -0,0 +1,122 @@
+'''
+This module contains the client side of the ``EvaluatorService`` protocol.
+Messages are json objects, each preceded by its length as a 4 byte big
+endian integer, sent over Unix domain sockets.  It only depends on the
+standard library, so fitness functions can use it without importing the
+service.
+'''
+import collections
+import errno
+import json
+import select
+import socket
+import struct
+
+HEADER = struct.Struct('>I')
+
+
+def encode(message):
+    '''
+    Returns the bytes sent for a json-able message.
+    '''
+    payload = json.dumps(message)
+    return HEADER.pack(len(payload)) + payload
+
+
+def decode(buffered):
+    '''
+    Splits the first complete message off the received bytes.  Returns the
+    message, or None if it is not complete yet, and the remaining bytes.
+    '''
+    if len(buffered) < HEADER.size:
+        return None, buffered
+    length, = HEADER.unpack(buffered[:HEADER.size])
+    end = HEADER.size + length
+    if len(buffered) < end:
+        return None, buffered
+    return json.loads(buffered[HEADER.size:end]), buffered[end:]
+
+
+class Client(object):
+    '''
+    Connection to an evaluator service which keeps many requests in flight
+    at once, spread over several connections, hiding the latency of the
+    service.
+    '''
+    def __init__(self, address, connections, inFlight):
+        '''
+        Parameters:
+
+        - ``address``: The path of the service's socket.
+        - ``connections``: The number of connections to open.
+        - ``inFlight``: The largest number of requests sent but not yet
+          answered.
+        '''
+        self.sockets = []
+        for _ in xrange(connections):
+            connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            connection.connect(address)
+            connection.setblocking(0)
+            self.sockets.append(connection)
+        self.inFlight = inFlight
+
+    def evaluate(self, requests):
+        '''
+        Sends a list of ``(genes, threshold)`` requests, using None when there
+        is no threshold, and returns the list of their ``(fitness, bound)``
+        responses, where ``bound`` tells if the evaluation stopped early.
+        '''
+        results = [None] * len(requests)
+        outgoing = {connection: '' for connection in self.sockets}
+        incoming = dict(outgoing)
+        # Positions of the requests each connection has yet to answer
+        waiting = {connection: collections.deque()
+                   for connection in self.sockets}
+        sent = answered = 0
+        while answered < len(requests):
+            while sent < len(requests) and sent - answered < self.inFlight:
+                connection = self.sockets[sent % len(self.sockets)]
+                genes, threshold = requests[sent]
+                outgoing[connection] += encode({'genes': genes,
+                                                'threshold': threshold})
+                waiting[connection].append(sent)
+                sent += 1
+            readable, writable, _ = select.select(
+                [c for c in self.sockets if waiting[c]],
+                [c for c in self.sockets if outgoing[c]], [])
+            for connection in writable:
+                try:
+                    count = connection.send(outgoing[connection])
+                except socket.error as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+                    continue
+                outgoing[connection] = outgoing[connection][count:]
+            for connection in readable:
+                try:
+                    data = connection.recv(65536)
+                except socket.error as e:
+                    if e.errno != errno.EAGAIN:
+                        raise
+                    continue
+                if not data:
+                    raise Exception("Evaluator service closed the connection")
+                response, incoming[connection] = decode(incoming[connection] +
+                                                        data)
+                while response is not None:
+                    if 'error' in response:
+                        raise Exception("Evaluator service failed: " +
+                                        response['error'])
+                    results[waiting[connection].popleft()] = (
+                        response['fitness'], response['bound'])
+                    answered += 1
+                    response, incoming[connection] = decode(
+                        incoming[connection])
+        return results
+
+    def close(self):
+        '''
+        Closes the connections.
+        '''
+        for connection in self.sockets:
+            connection.close()
@@ -0,0 +1,150 @@
+'''
+This module lets fitness functions run in a separate evaluator service, which
+any number of optimizer processes can share.  Messages are json objects,
+each preceded by its length as a 4 byte big endian integer, sent over Unix
+domain sockets.  A request holds ``genes`` and a ``threshold``, which may be
+null, and the matching response holds the ``fitness`` and whether it is only
+a ``bound``.  Each connection is answered in order.  Optimizers connect
+with an ``EvaluatorClient.Client``.
+
+The service is started with the same configuration files as ``main.py``, and
+serves the problem with a pool of worker processes.  For example
+
+````pypy EvaluatorService.py problems/hhcrsp_5_4.cfg -i 7 -a evaluator.sock````
+
+after which optimizers using ``FitnessFunction_Remote`` as their ``problem``
+send it their evaluations.
+'''
+import argparse
+import multiprocessing
+import os
+import random
+import select
+import socket
+import FitnessFunction
+import Util
+from EvaluatorClient import encode, decode
+from HHCRSP import HHCRSP
+
+
+def answer(evaluator, request):
+    '''
+    Evaluates a request and returns the response message.  Failed
+    evaluations are answered with an ``error`` instead, keeping the worker
+    alive.
+    '''
+    try:
+        if request['threshold'] is None:
+            fitness = evaluator.evaluate(request['genes'])
+        else:
+            fitness = evaluator.evaluateBounded(request['genes'],
+                                                request['threshold'])
+    except Exception as e:
+        return {'error': repr(e)}
+    return {'fitness': fitness,
+            'bound': isinstance(fitness, FitnessFunction.FitnessBound)}
+
+
+def serveWorker(listener, evaluator):
+    '''
+    Process entry point serving connections accepted from the shared
+    listening socket, along with connections accepted by other workers,
+    until killed.
+
+    Parameters:
+
+    - ``listener``: The non blocking listening socket.
+    - ``evaluator``: The ``FitnessFunction`` answering requests.
+    '''
+    received = {}
+    while True:
+        readable, _, _ = select.select([listener] + received.keys(), [], [])
+        for connection in readable:
+            if connection is listener:
+                try:
+                    accepted, _ = listener.accept()
+                except socket.error:
+                    continue  # Another worker accepted it first
+                accepted.setblocking(1)
+                received[accepted] = ''
+                continue
+            data = connection.recv(65536)
+            if not data:
+                connection.close()
+                del received[connection]
+                continue
+            buffered = received[connection] + data
+            replies = []
+            request, buffered = decode(buffered)
+            while request is not None:
+                replies.append(encode(answer(evaluator, request)))
+                request, buffered = decode(buffered)
+            received[connection] = buffered
+            connection.sendall(''.join(replies))
+
+
+def serve(address, evaluator, workers):
+    '''
+    Serves an evaluator on a Unix domain socket with a pool of worker
+    processes until interrupted.
+
+    Parameters:
+
+    - ``address``: The path of the socket, replaced if it exists.
+    - ``evaluator``: The ``FitnessFunction`` answering requests.
+    - ``workers``: The number of worker processes.
+    '''
+    if os.path.exists(address):
+        os.remove(address)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(address)
+    listener.listen(128)
+    listener.setblocking(0)
+    processes = [multiprocessing.Process(target=serveWorker,
+                                         args=(listener, evaluator))
+                 for _ in xrange(workers)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print "Caught interrupt, exiting"
+    finally:
+        for process in processes:
+            process.terminate()
+        os.remove(address)
+
+
+description = 'Evaluator service for LTGA optimizers'
+parser = argparse.ArgumentParser(description=description)
+parser.add_argument('configs', metavar='Configuration Files',
+                    type=str, nargs='+',
+                    help='One or more json formatted files containing' +
+                    ' configuration information')
+
+parser.add_argument('-i', dest='id', type=int, default=0,
+                    help='problem Id')
+
+parser.add_argument('-a', dest='address', type=str,
+                    default='evaluator.sock',
+                    help='The path of the Unix domain socket to serve on')
+
+parser.add_argument('-p', dest='problem', type=str,
+                    default='FitnessFunction_HHCRSP',
+                    help='The fitness function to serve')
+
+parser.add_argument('-w', dest='workers', type=int,
+                    default=multiprocessing.cpu_count(),
+                    help='The number of worker processes')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    args.configs.append('experiments/general.cfg')
+    args.configs.append('variants/hhcrsp.cfg')
+    config = Util.loadConfigurations(args.configs)
+    config['problemId'] = args.id
+    random.seed(config['seed'])
+    config['hhcrsp'] = HHCRSP(config)
+    options = Util.moduleClasses(FitnessFunction)
+    serve(args.address, options[args.problem](config, 0), args.workers)
@@ -3,23 +3,41 @@ This module contains the code used to actually run experiments and to parse
 the results of those experiments.
 '''
 import os
+import time
 import random
+import itertools
+import multiprocessing
+import Archive
 import HillClimber
+import Islands
+import JobQueue
+import Memory
+import Multilevel
+import ResultStore
+import Seeding
+import Surrogate
+import TraceRecorder
 from Individual import Individual
 from LTGA import LTGA
 import FitnessFunction
 import Util
 import gzip
 
+# Initial population data by file name, kept in memory by long lived worker
+# processes such as those of ``Sweep``.  None disables the cache.
+populationCache = None
+
 
 def createInitialPopulation(runNumber, evaluator, config):
     '''
     Used to create the initial population for a given run on a specified
-    problem.  Uses a ``HillClimber.steepestAscentHillClimber`` to optimize all
-    individuals.  Will store results to the 'initialPopFolder' specified by
-    ``config`` for future use, and will automatically load past saved
-    information.  Returns the population and a dictionary describing features
-    of that population as well as how it was created.
+    problem.  If ``localSearch`` is set, uses a
+    ``HillClimber.randomKeyHillClimber`` to optimize all individuals.  Will
+    store results to the 'initialPopFolder' specified by ``config`` for
+    future use, and will automatically load past saved information, keeping
+    it in ``populationCache`` when that is enabled.  Returns the population
+    and a dictionary describing features of that population as well as how
+    it was created.
 
     Parameters:
 
@@ -38,21 +56,47 @@ def createInitialPopulation(runNumber, evaluator, config):
       - ``dimensions``: The number of dimensions in the problem.
       - ``k``: The k value used by the problem.
       - ``popSize``: The population size to be created.
+      - ``localSearch``: A True / False value to determine if individuals
+        are optimized by local search.
+      - ``localSearchEvaluations``: The maximum number of moves scored by
+        the local search of a single individual.
+      - ``seedRatio``: The share of individuals built by the constructive
+        heuristics of a ``Seeding.Seeder`` instead of drawn at random.
+        Seeded populations are stored separately for each ratio and list
+        of heuristics.
+      - ``seeding``: The list of heuristics used in turn.
+      - ``archiveFolder``: The relative path of the folder holding the
+        ``Archive`` of each instance, or an empty string.
+      - ``archiveInject``: The number of the best archived schedules that
+        replace individuals of the population, 0 for none.
     '''
     rngState = random.getstate()  # Stores the state of the RNG
     filename = config["initialPopFolder"] + os.sep
-    filename += "%(problem)s_%(numActivities)i_%(numShifts)i_%(problemId)i" % config + os.sep
+    filename += "%(problem)s_%(numActivities)i_%(numShifts)i_%(problemId)i" % config
+    if config["localSearch"]:
+        filename += "_ls"
+    if config["seedRatio"] > 0:
+        filename += "_seed%g_%s" % (config["seedRatio"],
+                                    "+".join(config["seeding"]))
+    filename += os.sep
     filename += "p%i.dat.gz" % runNumber
     try:
-        data = Util.loadConfiguration(filename, gzip.open)
-    except IOError:
-        data = []
+        data = populationCache[filename]
+    except (TypeError, KeyError):
+        try:
+            data = Util.loadConfiguration(filename, gzip.open)
+        except IOError:
+            data = []
+        if populationCache is not None:
+            populationCache[filename] = data
 
     # Build new individuals if there aren't enough stored
     newInfo = len(data) < config["popSize"]
+    if newInfo:
+        nextGenes = Seeding.genomeSource(config, evaluator)
     while len(data) < config["popSize"]:
         row = {}
-        genes = Util.randomGene(config)
+        genes = nextGenes()
         # evaluations = HillClimber.climb(genes, evaluator,
         #                          HillClimber.steepestAscentHillClimber)
         # iterations = evaluations / config['dimensions']
@@ -60,6 +104,9 @@ def createInitialPopulation(runNumber, evaluator, config):
         # subproblems = evaluator.subProblemsSolved(genes)
         evaluations = 0
         iterations = 0
+        if config["localSearch"]:
+            evaluations, iterations = HillClimber.randomKeyHillClimber(
+                genes, evaluator, config["localSearchEvaluations"])
         fitness = evaluator.evaluate(genes)
         subproblems = evaluator.subProblemsSolved(genes)
         try:
@@ -83,17 +130,195 @@ def createInitialPopulation(runNumber, evaluator, config):
 
     # Trim extra information
     data = data[:config["popSize"]]
-    population = [Individual(row["genes"], row["fitness"]) for row in data]
+    population = [Individual(list(row["genes"]), row["fitness"])
+                  for row in data]
+
+    # Archived elites replace the last individuals, and are evaluated again
+    # in case the instance changed since they were archived
+    injected = []
+    if config["archiveFolder"] and config["archiveInject"]:
+        injected = Archive.archiveFor(config).best(
+            min(config["archiveInject"], len(population)))
+        for individual in injected:
+            individual.fitness = evaluator.evaluate(individual.genes)
+        population[len(population) - len(injected):] = injected
 
     # Get the last row's information about the population
     total = data[-1]
     random.setstate(rngState)  # Ensures RNG isn't modified by this function
-    return  population
+    return population, {'LS_iterations': total['iterations'],
+                        'LS_evaluations': total['evaluations'],
+                        'minSubProblem': total['minSubProblem'],
+                        'archiveInjected': len(injected)}
+
+def evaluateIndividuals(individuals, evaluator, lookup, result, config,
+                        surrogate=None, recorder=None):
+    '''
+    Finds the fitness of a list of individuals sent out by an optimizer.
+    Known genomes are taken from ``lookup`` and the rest are evaluated with a
+    single ``evaluator.evaluateBatch`` call, counting towards
+    ``result['evaluations']``.  If the remaining evaluation budget is too
+    small for the whole list, only the fitness values of the leading
+    individuals that fit in the budget are returned.
+
+    With ``earlyExit`` set, they are instead evaluated with a single
+    ``evaluator.evaluateBoundedBatch`` call against their ``threshold``.
+    Evaluations that stop early return a ``FitnessBound``, are counted in
+    ``result['partialEvaluations']`` and are only reused from ``lookup`` for
+    individuals they still rule out.
+
+    With a ``surrogate``, individuals with a ``threshold`` it screens out are
+    not evaluated and get its prediction back, capped at their threshold, as
+    a ``PredictedFitness``, which is never stored in ``lookup`` nor counted
+    as an evaluation but is recorded.  The surrogate learns from every full
+    evaluation.
+
+    Parameters:
+
+    - ``individuals``: The list of individuals to find the fitness of.
+    - ``evaluator``: The problem being solved.
+    - ``lookup``: A dictionary mapping individual hashes to known fitness
+      values.  Extended with new evaluations when ``unique`` is set.
+    - ``result``: The result dictionary of the current run.
+    - ``config``: A dictionary containing all configuration information
+      required by ``oneRun``.
+    - ``surrogate``: A ``Surrogate.Surrogate`` pre-screening individuals, or
+      None.
+    - ``recorder``: A ``TraceRecorder.TraceRecorder`` recording every
+      evaluation, or None.
+    '''
+    def slotOf(position):
+        '''
+        Internal function giving the identity under which an individual is
+        evaluated, so that duplicates within the list share one evaluation.
+        '''
+        if not config['unique']:
+            return position
+        if config['earlyExit']:
+            return keys[position], individuals[position].threshold
+        return keys[position]
+
+    def isKnown(position):
+        '''
+        Internal function checking if ``lookup`` settles an individual.
+        '''
+        try:
+            fitness = lookup[keys[position]]
+        except KeyError:
+            return False
+        threshold = individuals[position].threshold
+        return (not isinstance(fitness, FitnessFunction.FitnessBound) or
+                (threshold is not None and fitness <= threshold))
+
+    budget = config["maximumEvaluations"] - result['evaluations']
+    keys = [hash(individual) for individual in individuals]
+    # Maps the slot of each individual to evaluate to its index in ``pending``
+    slots = {}
+    pending = []
+    # Surrogate predictions and rejections, by position
+    predictions = {}
+    screened = {}
+    count = len(individuals)
+    for position in xrange(len(individuals)):
+        slot = slotOf(position)
+        if slot in slots or isKnown(position):
+            continue
+        threshold = individuals[position].threshold
+        if surrogate is not None and threshold is not None:
+            predictions[position], skip, predicted = surrogate.screen(
+                individuals[position])
+            if skip:
+                screened[position] = FitnessFunction.PredictedFitness(
+                    min(predicted, threshold))
+                if recorder is not None:
+                    recorder.record(individuals[position], screened[position])
+                continue
+        if len(pending) >= budget:
+            count = position
+            break
+        slots[slot] = len(pending)
+        pending.append(position)
+
+    if config['earlyExit']:
+        evaluated = evaluator.evaluateBoundedBatch([individuals[position]
+                                                    for position in pending])
+    else:
+        evaluated = evaluator.evaluateBatch([individuals[position]
+                                             for position in pending])
+    result['evaluations'] += len(pending)
+
+    for position, fitness in zip(pending, evaluated):
+        if isinstance(fitness, FitnessFunction.FitnessBound):
+            result['partialEvaluations'] += 1
+        elif surrogate is not None:
+            surrogate.observe(individuals[position], fitness)
+        if position in predictions:
+            surrogate.record(predictions[position], fitness,
+                             individuals[position].threshold)
+        if recorder is not None:
+            recorder.record(individuals[position], fitness)
+        if not config['unique']:
+            continue
+        known = lookup.get(keys[position])
+        # Never replace a true fitness, and keep the tightest bound
+        if (known is None or
+                isinstance(known, FitnessFunction.FitnessBound) and
+                (not isinstance(fitness, FitnessFunction.FitnessBound) or
+                 fitness < known)):
+            lookup[keys[position]] = fitness
+
+    fitnesses = []
+    for position in xrange(count):
+        if position in screened:
+            fitnesses.append(screened[position])
+            continue
+        try:
+            fitnesses.append(evaluated[slots[slotOf(position)]])
+        except KeyError:
+            # If this individual has been rated before
+            fitnesses.append(lookup[keys[position]])
+    return fitnesses
+
 
-def oneRun(runNumber, optimizerClass, evaluator, config):
+def restartPopulation(population, size, config):
+    '''
+    Creates a new population of ``size`` individuals, without fitness, to
+    restart the optimizer from once ``population`` has converged.  With
+    ``restarts`` set to ``fresh`` all individuals are random.  With ``elite``
+    the best individual is kept and half of the rest are copies of it with
+    each gene redrawn with probability ``restartMutation``, re-seeding the
+    search around it.
+
+    Parameters:
+
+    - ``population``: The converged population.
+    - ``size``: The size of the new population.
+    - ``config``: A dictionary containing all configuration information
+      required by ``oneRun``.
+    '''
+    individuals = []
+    if config["restarts"] == "elite":
+        elite = max(population)
+        individuals.append(Individual(list(elite.genes)))
+        while len(individuals) < size // 2:
+            genes = [random.uniform(1, config['hhcrsp'].numShifts + 1 - 1e-10)
+                     if random.random() < config["restartMutation"] else gene
+                     for gene in elite.genes]
+            individuals.append(Individual(genes))
+    while len(individuals) < size:
+        individuals.append(Individual(Util.randomGene(config)))
+    return individuals
+
+
+def oneRun(runNumber, optimizerClass, evaluator, config,
+           initialPopulation=None, finalPopulation=None):
     '''
     Performs a single run of LTGA in solving a specific problem.  Returns
-    a dictionary of result information
+    a dictionary of result information.  Besides summary values it contains
+    an anytime trace, with one entry in each of the ``traceSeconds``,
+    ``traceEvaluations`` and ``traceFitness`` lists per improvement of the
+    best fitness.  ``seconds`` and ``traceSeconds`` count from the end of
+    the initial population.
 
     Parameters:
 
@@ -111,12 +336,81 @@ def oneRun(runNumber, optimizerClass, evaluator, config):
         success.
       - ``unique``: A True / False value to determine if only unique
         evaluations should be counted
+      - ``earlyExit``: A True / False value to determine if evaluations may
+        stop as soon as an individual cannot beat its threshold.  Requires
+        the ``improving`` ``acceptance``.
+      - ``intensification``: A True / False value to determine if the best
+        individual found is improved by local search at the end of the run.
+        Its moves are counted in the ``LS_evaluations`` result.
+      - ``restarts``: What to do when the optimizer converges before the
+        budget is used: ``none`` ends the run, ``fresh`` and ``elite``
+        continue from a new population built by ``restartPopulation``.  The
+        evaluation lookup is shared by all restarts.
+      - ``restartGrowth``: The factor the population size is multiplied by
+        on every restart.
+      - ``maximumSeconds``: Wall-clock time after which the run stops, 0 for
+        no limit.  The clock starts once the initial population is built,
+        which takes the ``initialSeconds`` result.  The optimizer builds no
+        linkage model after the deadline, and the final local search stops
+        at it too.
+      - ``surrogate``: A True / False value to determine if offspring are
+        pre-screened by a ``Surrogate.Surrogate``, trained on the initial
+        population and every evaluation of the run.  Its statistics are
+        added to the result.  Requires the ``improving`` ``acceptance``.
+      - ``surrogateMargin``, ``surrogateAudit`` and ``surrogateWarmup``: The
+        ``margin``, ``auditRate`` and ``warmup`` of the surrogate.
+      - ``speculation``: The number of offspring the optimizer sends out at
+        once, or 0 for the ``inFlight`` of the ``evaluator``.
+      - ``memoryReport``: A True / False value to determine if the
+        ``Memory.PhaseReport`` of the run is added to its ``memoryPhases``
+        result.  The process's ``peakMemoryMB`` is always
+        reported.
+      - ``archiveFolder``: The relative path of the folder holding the
+        ``Archive`` of each instance, which the best individual and the
+        final population are offered to, or an empty string.
+      - ``traceFolder``: The relative path of the folder holding the
+        evaluation trace of each run, written by a
+        ``TraceRecorder.TraceRecorder``, or an empty string.  Evaluations of
+        the final local search are not recorded.
+      - ``memoryLimitMB``: A memory ceiling kept by a ``Memory.MemoryGuard``
+        compacting the evaluation lookup, a ``Memory.CompactLookup``, 0 for
+        no limit.
       - All configuration information required by ``createInitialPopulation``
         and any required by the ``optimizerClass``.
+    - ``initialPopulation``: A list of evaluated individuals to start from
+      instead of those of ``createInitialPopulation``, or None.
+    - ``finalPopulation``: A list the final population, best first, is added
+      to, or None.
     '''
-    population = createInitialPopulation(runNumber, evaluator, config)
-    result = {}
+    if ((config["earlyExit"] or config["surrogate"]) and
+            config["acceptance"] != "improving"):
+        raise Exception("earlyExit and surrogate only give bounds on whether"
+                        " offspring beat their parent, which crossovers"
+                        " need the improving acceptance to use")
+    if not config["speculation"]:
+        # As many offspring at once as the evaluator keeps in flight
+        config = dict(config, speculation=evaluator.inFlight)
+    startTime = time.time()
+    if initialPopulation is None:
+        population, result = createInitialPopulation(runNumber, evaluator,
+                                                     config)
+    else:
+        population = list(initialPopulation)
+        result = {'LS_iterations': 0, 'LS_evaluations': 0, 'minSubProblem': 0,
+                  'archiveInjected': 0}
+    # The time limit and trace only cover the search itself
+    result['initialSeconds'] = time.time() - startTime
+    startTime = time.time()
+    report = None
+    if config["memoryReport"]:
+        report = Memory.PhaseReport()
+        report.snapshot('initialPopulation')
     result["evaluations"] = 0
+    result["partialEvaluations"] = 0
+    result["restarts"] = 0
+    result["skippedOffspring"] = 0
+    result["prunedOffspring"] = 0
+    result["discardedOffspring"] = 0
 
     # if config['verbose']:
     #   print('population:')
@@ -128,45 +422,195 @@ def oneRun(runNumber, optimizerClass, evaluator, config):
 
     lookup = {hash(individual): individual.fitness
               for individual in population}
-    optimizer = optimizerClass().generate(population, config)
-    try:
-        individual = optimizer.next()  # Get the first individual
-        while (result['evaluations'] < config["maximumEvaluations"] and
-               bestFitness < config["maximumFitness"]):
-            key = hash(individual)
-            try:
-                # If this individual has been rated before
-                fitness = lookup[key]
-            except KeyError:
-                # Evaluate the individual
-                fitness = evaluator.evaluate(individual.genes)
-                if config['unique']:
-                    lookup[key] = fitness
-                result['evaluations'] += 1
-
-            # if config['verbose']:
-            #   print('recombination: ', individual.genes, fitness)
-
+    if config["memoryLimitMB"]:
+        lookup = Memory.CompactLookup(lookup)
+
+    surrogate = None
+    if config["surrogate"]:
+        surrogate = Surrogate.Surrogate(config["hhcrsp"],
+                                        config["surrogateMargin"],
+                                        config["surrogateAudit"],
+                                        config["surrogateWarmup"])
+        for individual in population:
+            surrogate.observe(individual, individual.fitness)
+
+    deadline = None
+    if config["maximumSeconds"]:
+        deadline = startTime + config["maximumSeconds"]
+    ticks = itertools.count(1)
+    guard = None
+    if config["memoryLimitMB"]:
+        guard = Memory.MemoryGuard(config["memoryLimitMB"])
+        guard.register(evaluator.shrinkCaches)
+    recorder = TraceRecorder.recorderFor(runNumber, config)
+
+    def expired():
+        '''
+        Internal function checking the deadline.  Only reads the clock once
+        every 16 calls to keep the check cheap.
+        '''
+        return (deadline is not None and next(ticks) % 16 == 0 and
+                time.time() >= deadline)
+
+    def trace(fitness):
+        '''
+        Internal function adding an improvement of the best fitness to the
+        anytime trace.
+        '''
+        result['traceSeconds'].append(time.time() - startTime)
+        result['traceEvaluations'].append(result['evaluations'])
+        result['traceFitness'].append(fitness)
+
+    result['traceSeconds'] = []
+    result['traceEvaluations'] = []
+    result['traceFitness'] = []
+    trace(bestFitness)
+    while True:
+        converged = False
+        ltga = optimizerClass()
+        ltga.deadline = deadline
+        optimizer = ltga.generate(population, config)
+        try:
+            individual = optimizer.next()  # Get the first individual
+            while (result['evaluations'] < config["maximumEvaluations"] and
+                   bestFitness < config["maximumFitness"] and not expired()):
+                previousFitness = bestFitness
+                # Optimizers may send out a whole batch of individuals at once
+                batch = (individual if isinstance(individual, list)
+                         else [individual])
+                fitnesses = evaluateIndividuals(batch, evaluator, lookup,
+                                                result, config, surrogate,
+                                                recorder)
+
+                # if config['verbose']:
+                #   print('recombination: ', individual.genes, fitness)
+
+                for member, fitness in zip(batch, fitnesses):
+                    if isinstance(fitness, (FitnessFunction.FitnessBound,
+                                            FitnessFunction.PredictedFitness)):
+                        continue  # Not an actual fitness
+                    if bestFitness < fitness:
+                        bestFitness = fitness
+                        bestIndividual = member
+                if previousFitness != bestFitness:
+                    trace(bestFitness)
+                if len(fitnesses) < len(batch):
+                    break  # The evaluation budget ran out inside the batch
+                if guard is not None:
+                    guard.check(lookup, ltga.individuals)
+                if batch is not individual:
+                    fitnesses = fitnesses[0]
+                # Send the fitness into the optimizer and get the next
+                # individual
+                individual = optimizer.send(fitnesses)
+        except StopIteration:  # If the optimizer ever stops, just end the run
+            converged = True
+        optimizer.close()
+        # Offspring the optimizer did not send out as they equal their parent
+        result['skippedOffspring'] += ltga.skippedOffspring
+        # Offspring of masks the optimizer pruned, saving their evaluations
+        result['prunedOffspring'] += ltga.prunedOffspring
+        # Offspring evaluated ahead that a replaced parent made useless
+        result['discardedOffspring'] += ltga.discardedOffspring
+
+        # Restart if the optimizer converged with budget and time left
+        if (not converged or config["restarts"] == "none" or
+                result['evaluations'] >= config["maximumEvaluations"] or
+                bestFitness >= config["maximumFitness"] or
+                (deadline is not None and time.time() >= deadline)):
+            break
+        size = int(len(population) * config["restartGrowth"])
+        population = restartPopulation(ltga.individuals, size, config)
+        fitnesses = evaluateIndividuals(population, evaluator, lookup, result,
+                                        config, surrogate, recorder)
+        previousFitness = bestFitness
+        for individual, fitness in zip(population, fitnesses):
+            individual.fitness = fitness
             if bestFitness < fitness:
                 bestFitness = fitness
                 bestIndividual = individual
-            # Send the fitness into the optimizer and get the next individual
-            individual = optimizer.send(fitness)
-    except StopIteration:  # If the optimizer ever stops, just end the run
-        pass
-
+        if previousFitness != bestFitness:
+            trace(bestFitness)
+        population = population[:len(fitnesses)]
+        if len(population) < 2:
+            break  # The evaluation budget ran out while restarting
+        result["restarts"] += 1
+    result["finalPopSize"] = len(population)
+    if report is not None:
+        report.snapshot('evolution')
+
+    if config["intensification"]:
+        genes = list(bestIndividual.genes)
+        evaluations, iterations = HillClimber.randomKeyHillClimber(
+            genes, evaluator, config["localSearchEvaluations"], deadline)
+        result['LS_evaluations'] += evaluations
+        result['LS_iterations'] += iterations
+        fitness = evaluator.evaluate(genes)
+        if bestFitness < fitness:
+            bestFitness = fitness
+            bestIndividual = Individual(genes, fitness)
+            trace(bestFitness)
+
+    evaluator.report(result)
+    if surrogate is not None:
+        surrogate.report(result)
+    if guard is not None:
+        guard.report(result)
+    if recorder is not None:
+        recorder.close()
+        result['traceRecords'] = recorder.records
+    if report is not None:
+        report.snapshot('intensification')
+        result['memoryPhases'] = report.phases
+    result['peakMemoryMB'] = Memory.peakMB()
+    if finalPopulation is not None:
+        finalPopulation.append(bestIndividual)
+        finalPopulation.extend(sorted(ltga.individuals, reverse=True))
+    if config["archiveFolder"]:
+        archive = Archive.archiveFor(config)
+        for individual in [bestIndividual] + sorted(ltga.individuals,
+                                                    reverse=True):
+            archive.add(individual)
+        archive.save()
+
+    result['seconds'] = time.time() - startTime
+    result['timedOut'] = int(deadline is not None and
+                             result['seconds'] >= config["maximumSeconds"])
     result['success'] = int(bestFitness >= config["maximumFitness"])
+    result['fitness'] = bestFitness
     result['bestFitness'] = str(bestIndividual)
     if config['verbose']:
         print runNumber, result
     return result
 
 
+def performRun(runNumber, config):
+    '''
+    Performs a single run in the solve mode a configuration selects: a
+    ``Multilevel.multilevelRun`` if ``multilevelCoarsest`` is above 0, an
+    ``Islands.islandRun`` with more than one of ``islands``, and a
+    ``oneRun`` of ``LTGA`` otherwise.  Returns the result dictionary.
+
+    Parameters:
+
+    - ``runNumber``: What number run this is.
+    - ``config``: A dictionary containing all configuration information
+      required by the selected solve mode, including the instance.
+    '''
+    if config["multilevelCoarsest"] > 0:
+        return Multilevel.multilevelRun(runNumber, config)
+    if config["islands"] > 1:
+        return Islands.islandRun(runNumber, config)
+    options = Util.moduleClasses(FitnessFunction)
+    evaluator = options[config["problem"]](config, runNumber)
+    return oneRun(runNumber, LTGA, evaluator, config)
+
+
 def fullRun(config):
     '''
-    Performs a full run of the specified configuration using ``oneRun``. Will
-    return a list of result dictionaries describing what happened in each run.
-    If a keyboard interrupt occurs, will return partial information.
+    Performs a full run of the specified configuration using ``performRun``.
+    Will return a list of result dictionaries describing what happened in each
+    run.  If a keyboard interrupt occurs, will return partial information.
 
     Parameters
 
@@ -178,15 +622,44 @@ def fullRun(config):
         ``DeceptiveStepTrap`` or ``NearestNeighborNK``.
       - All configuration information required to initialize the
         ``FitnessFunction.``
+      - ``islands``: The number of LTGA populations evolving in parallel
+        during each run.  With more than 1, runs are performed by
+        ``Islands.islandRun``.
+      - ``multilevelCoarsest``: The largest number of activities of the
+        coarsest level of ``Multilevel.multilevelRun``, which performs the
+        runs when above 0.
       - All configuration information required by ``oneRun``.
+      - ``resultStore``: The relative path to a ``ResultStore`` database, or
+        an empty string.  When given, runs already stored for this
+        configuration are loaded instead of performed, each new run is
+        stored as soon as it finishes, and every run is seeded from its run
+        number so it does not depend on which runs were skipped.
+      - ``jobQueue``: The relative path to a ``JobQueue`` directory, or an
+        empty string.  When given, the runs are performed by
+        ``JobQueue.queueRun`` together with any other workers of the queue,
+        skipping and filling the ``resultStore`` in the same way.
     '''
+    store = None
+    if config["resultStore"]:
+        store = ResultStore.ResultStore(config["resultStore"])
+    if config["jobQueue"]:
+        return JobQueue.queueRun(config, store)
     results = []
+    if store is not None:
+        key = ResultStore.configKey(config)
+        completed = store.completed(key)
     try:
         for runNumber in range(config["runs"]):
+            if store is not None:
+                if runNumber in completed:
+                    results.append(completed[runNumber])
+                    continue
+                random.seed(hash((config["seed"], runNumber)))
             print 'runNumber: %d' % runNumber
-            options = Util.moduleClasses(FitnessFunction)
-            evaluator = options[config["problem"]](config, runNumber)
-            results.append(oneRun(runNumber, LTGA, evaluator, config))
+            result = performRun(runNumber, config)
+            results.append(result)
+            if store is not None:
+                store.put(key, runNumber, result, config)
     except KeyboardInterrupt:
         print "Caught interrupt, exiting"
     return results
@@ -226,62 +699,105 @@ def combineResults(results):
     return combined
 
 
-# def bisection(config):
-#     '''
-#     Determines the minimum population size for a configuration that acceptably
-#     solves the specified problem using bisection.  Starts with a minimum
-#     population size of 2, this will double the population size until the
-#     success criteria are met.  It will then perform a binary search of the
-#     space between the lowest found successful population size and the highest
-#     found unsuccessful population size.  Modifies the input configuration
-#     dictionary to contain the minimum successful population size found.
-
-#     Parameters:
-
-#     - ``config``: A dictionary containing all configuration information
-#       required to perform bisection.  Should include values for:
-
-#       - ``bisectionRuns``: The number of runs to use a given population size in
-#         order to determine if it is successful.
-#       - ``problem``: The problem being solved, for instance ``DeceptiveTrap``,
-#         ``DeceptiveStepTrap`` or ``NearestNeighborNK``.
-#       - ``bisectionFailureLimit``: The maximum number of times a population
-#         size can fail to find the global optimum of a problem before it is
-#         marked as unsuccessful.  IE: A failure limit of 1 means it can fail one
-#         of the ``bisectionRuns`` without being marked as unsuccessful.
-#       - All configuration information required to initialize the
-#         ``FitnessFunction.``
-#       - All configuration information required by ``oneRun``.
-#     '''
-#     def canSucceed(config):
-#         failures = 0
-#         for runNumber in xrange(config["bisectionRuns"]):
-#             options = Util.moduleClasses(FitnessFunction)
-#             evaluator = options[config["problem"]](config, runNumber)
-#             result = oneRun(runNumber, LTGA, evaluator, config)
-#             if not result['success']:
-#                 failures += 1
-#                 if failures > config['bisectionFailureLimit']:
-#                     return False
-#         return True
-
-#     least, most = 0, 1
-#     while True:
-#         least = most
-#         most *= 2
-#         config['popSize'] = most
-#         if config['verbose']:
-#             print 'Trying population size', config['popSize']
-#         if canSucceed(config):
-#             break
-#     while least + 1 < most:
-#         config['popSize'] = (most + least) / 2
-#         if config['verbose']:
-#             print 'Trying population size', config['popSize']
-#         if canSucceed(config):
-#             most = config['popSize']
-#         else:
-#             least = config['popSize']
-#     config['popSize'] = most
-#     if config['verbose']:
-#         print 'Bisection set population size as', config['popSize']
+def bisectionTrial(task):
+    '''
+    Worker function performing one trial run of ``bisection`` with
+    ``performRun``.  Returns if the run succeeded.
+
+    Parameters:
+
+    - ``task``: A tuple of the configuration, the run number and the
+      population size to try.
+    '''
+    config, runNumber, popSize = task
+    config = dict(config, popSize=popSize)
+    # Every trial gets its own reproducible random stream
+    random.seed(hash((config["seed"], runNumber, popSize)))
+    return performRun(runNumber, config)['success']
+
+
+def bisection(config):
+    '''
+    Determines the minimum population size for a configuration that acceptably
+    solves the specified problem using bisection.  Starts with a minimum
+    population size of 2, this will double the population size until the
+    success criteria are met.  It will then perform a binary search of the
+    space between the lowest found successful population size and the highest
+    found unsuccessful population size.  Modifies the input configuration
+    dictionary to contain the minimum successful population size found.
+
+    The trial runs of each population size are performed in parallel, and the
+    remaining ones are cancelled as soon as too many have failed.  Initial
+    populations are stored per run by ``createInitialPopulation``, so every
+    size tried reuses and extends those of the previous sizes.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information
+      required to perform bisection.  Should include values for:
+
+      - ``bisectionRuns``: The number of runs to use a given population size in
+        order to determine if it is successful.
+      - ``problem``: The problem being solved, for instance
+        ``FitnessFunction_HHCRSP``.
+      - ``bisectionFailureLimit``: The maximum number of times a population
+        size can fail to find the global optimum of a problem before it is
+        marked as unsuccessful.  IE: A failure limit of 1 means it can fail one
+        of the ``bisectionRuns`` without being marked as unsuccessful.
+      - ``bisectionWorkers``: The number of trial runs performed at once.
+        With more than 1, trials run in a pool of processes, which cannot
+        start more, so ``islands`` must be 1 and ``linkageWorkers`` is set
+        to 1.
+      - All configuration information required to initialize the
+        ``FitnessFunction.``
+      - All configuration information required by ``performRun``.
+    '''
+    def canSucceed(config):
+        pool = None
+        if config["bisectionWorkers"] > 1:
+            # Trials inside the pool cannot start more processes
+            config = dict(config, linkageWorkers=1)
+            pool = multiprocessing.Pool(config["bisectionWorkers"])
+        tasks = [(config, runNumber, config['popSize'])
+                 for runNumber in xrange(config["bisectionRuns"])]
+        if pool is not None:
+            trials = pool.imap_unordered(bisectionTrial, tasks)
+        else:
+            trials = itertools.imap(bisectionTrial, tasks)
+        failures = 0
+        try:
+            for success in trials:
+                if not success:
+                    failures += 1
+                    if failures > config['bisectionFailureLimit']:
+                        return False
+            return True
+        finally:
+            if pool is not None:
+                # Cancels any trials still pending
+                pool.terminate()
+                pool.join()
+
+    if config["bisectionWorkers"] > 1 and config["islands"] > 1:
+        raise Exception("Parallel bisection trials cannot use islands")
+
+    least, most = 0, 1
+    while True:
+        least = most
+        most *= 2
+        config['popSize'] = most
+        if config['verbose']:
+            print 'Trying population size', config['popSize']
+        if canSucceed(config):
+            break
+    while least + 1 < most:
+        config['popSize'] = (most + least) / 2
+        if config['verbose']:
+            print 'Trying population size', config['popSize']
+        if canSucceed(config):
+            most = config['popSize']
+        else:
+            least = config['popSize']
+    config['popSize'] = most
+    if config['verbose']:
+        print 'Bisection set population size as', config['popSize']
@@ -5,7 +5,27 @@ with solvers, as well as the definitions for a few benchmark problems
 import random
 import os
 import math
+import EvaluatorClient
 from Util import binaryCounter, loadConfiguration, saveConfiguration
+from Util import decodeSchedule
+
+
+class FitnessBound(float):
+    '''
+    Fitness value flagged as the result of an evaluation that stopped early.
+    The penalty accumulated so far is a lower bound on the true penalty, so
+    the true fitness is no higher than this value.
+    '''
+    pass
+
+
+class PredictedFitness(float):
+    '''
+    Fitness value predicted by a surrogate for an individual that was not
+    evaluated.  It is neither a true fitness nor a bound, only guaranteed
+    not to beat the threshold the individual was screened against.
+    '''
+    pass
 
 
 class FitnessFunction(object):
@@ -13,6 +33,9 @@ class FitnessFunction(object):
     An interface for a fitness function provided to ensure all required
     functions of a fitness function object are implemented
     '''
+    # How many evaluations a batch can usefully hold at once
+    inFlight = 1
+
     def __init__(self, config, runNumber):
         '''
         Empty constructor, useful for fitness functions that are configuration
@@ -27,6 +50,59 @@ class FitnessFunction(object):
         '''
         raise Exception("Fitness function did not override evaluate")
 
+    def evaluateIndividual(self, individual, threshold=None):
+        '''
+        Given an individual, returns the fitness of its genes.  When a
+        ``threshold`` is given it behaves as ``evaluateBounded``.  Evaluators
+        able to reuse information cached on the individual should override
+        this.
+        '''
+        if threshold is None:
+            return self.evaluate(individual.genes)
+        return self.evaluateBounded(individual.genes, threshold)
+
+    def evaluateBatch(self, individuals):
+        '''
+        Given a list of individuals, returns the list of their fitness values.
+        Evaluates them one at a time unless overridden by an evaluator that
+        can do better with a whole batch.
+        '''
+        return [self.evaluateIndividual(individual)
+                for individual in individuals]
+
+    def evaluateBoundedBatch(self, individuals):
+        '''
+        Given a list of individuals, returns the list of their fitness values
+        as found by ``evaluateIndividual`` against their ``threshold``.
+        Evaluates them one at a time unless overridden.
+        '''
+        return [self.evaluateIndividual(individual, individual.threshold)
+                for individual in individuals]
+
+    def evaluateBounded(self, genes, threshold):
+        '''
+        Given a list of genes and an acceptance threshold, returns their
+        fitness, or a ``FitnessBound`` no higher than ``threshold`` if the
+        evaluation could stop as soon as the genes were known not to beat it.
+        Evaluates fully unless overridden.  A ``threshold`` of None disables
+        stopping early.
+        '''
+        return self.evaluate(genes)
+
+    def report(self, result):
+        '''
+        Adds statistics about the evaluations of a run to its result
+        dictionary.  Does nothing unless overridden.
+        '''
+        pass
+
+    def shrinkCaches(self):
+        '''
+        Frees memory held by caches of the evaluator, called when a
+        ``Memory.MemoryGuard`` shrinks.  Does nothing unless overridden.
+        '''
+        pass
+
     def subProblemsSolved(self, genes):
         '''
         Empty function handle that throws an exception if not overridden.
@@ -56,18 +132,126 @@ class FitnessFunction_HHCRSP(FitnessFunction):
         self.p = hhcrsp.p
         self.u = hhcrsp.u
 
-        pass
+        # (shift, activities) -> route_cost, shared by all individuals
+        self.routeMemo = {}
+        self.routeMemoSize = config['routeMemoSize']
+        self.routeMemoHits = 0
+        self.routeMemoMisses = 0
 
     def evaluate(self, genes):
         result = self.fitness_function(genes, self.w_x, self.w_y, self.w_z, self.matrixD, self.tStart, self.tEnd, self.p, self.u)
         return result
+
+    def evaluateBounded(self, genes, threshold):
+        return self.fitness_function(genes, self.w_x, self.w_y, self.w_z, self.matrixD, self.tStart, self.tEnd, self.p, self.u, threshold)
+
+    def evaluateIndividual(self, individual, threshold=None):
+        # Reuses the schedule the individual already decoded
+        return self.schedule_fitness(individual.decode()[1], self.w_x, self.w_y, self.w_z, self.matrixD, self.tStart, self.tEnd, self.p, self.u, threshold)
     
     def subProblemsSolved(self, genes):
         return [0]
+
+    def shrinkCaches(self):
+        # Halving the size also makes the memo refill half as far
+        self.routeMemo.clear()
+        self.routeMemoSize //= 2
+
+    def report(self, result):
+        result['routeMemoHits'] = self.routeMemoHits
+        result['routeMemoMisses'] = self.routeMemoMisses
+        lookups = self.routeMemoHits + self.routeMemoMisses
+        result['routeMemoHitRate'] = (float(self.routeMemoHits) / lookups
+                                      if lookups else 0)
     
-    def fitness_function(self, gene, w_x, w_y, w_z, d, s, e, p, u):
+    def fitness_function(self, gene, w_x, w_y, w_z, d, s, e, p, u, threshold=None):
+        """
+        Args:
+            gene: random-key genes, decoded with Util.decodeSchedule.
+            Other arguments are passed on to schedule_fitness.
+
+        Returns:
+            fitness.
+        """
+        shifts = decodeSchedule(gene)[1]
+        return self.schedule_fitness(shifts, w_x, w_y, w_z, d, s, e, p, u, threshold)
+
+    def route_cost(self, shift, activities, d, s, e, p, u):
         """
         Args:
+            shift: the shift (ca truc).
+            activities: non-empty list of its activity ids in visiting order.
+            Other arguments as for schedule_fitness.
+
+        Returns:
+            (travel time, overtime, waiting time) of the shift.
+        """
+        travel_time = 0
+        waiting_time = 0
+
+        first_activity = activities[0]
+        activity = first_activity
+        next_activity = first_activity
+        start_time = max(0, s[first_activity] - d[0][first_activity])
+        arrival_time = max(start_time, s[first_activity] - d[0][first_activity])
+
+        for i in range(len(activities)):
+            if i == 0 : continue
+            activity = activities[i-1]
+            next_activity = activities[i]
+
+            travel_time += d[activity ][next_activity]
+            arrival_time = max(s[next_activity], arrival_time + p[activity] + d[activity][next_activity])
+
+            wait_time = max(0, arrival_time - d[activity][next_activity] - e[activity])
+            waiting_time += wait_time
+
+        overtime = max(0, arrival_time + p[next_activity] + d[next_activity][0] - (start_time + u[shift]))
+        return travel_time, overtime, waiting_time
+
+    def memo_route_cost(self, shift, activities, count=False):
+        """
+        route_cost of the instance's own data through a memo keyed by the
+        shift and its activities, so routes shared by many individuals are
+        only computed once.  The memo is emptied whenever it holds
+        routeMemoSize routes, and a size of 0 disables it.  Hits and misses
+        are only counted with count set, as schedule_fitness does, so the
+        reported hit rate is that of fitness evaluations, not of the route
+        penalties seeding and local search look up.
+        """
+        d, s, e, p, u = self.matrixD, self.tStart, self.tEnd, self.p, self.u
+        if not self.routeMemoSize:
+            return self.route_cost(shift, activities, d, s, e, p, u)
+        key = shift, tuple(activities)
+        try:
+            cost = self.routeMemo[key]
+            if count:
+                self.routeMemoHits += 1
+            return cost
+        except KeyError:
+            if count:
+                self.routeMemoMisses += 1
+            if len(self.routeMemo) >= self.routeMemoSize:
+                self.routeMemo.clear()
+            cost = self.routeMemo[key] = self.route_cost(shift, activities, d, s, e, p, u)
+            return cost
+
+    def route_penalty(self, shift, activities):
+        """
+        Weighted penalty of a single shift, 0 for an empty one.  The fitness
+        of a schedule is minus the sum of the penalties of its shifts, which
+        lets local search score moves from the shifts they change only.
+        """
+        if not activities:
+            return 0
+        travel_time, overtime, waiting_time = self.memo_route_cost(shift, activities)
+        return self.w_x * travel_time + self.w_y * overtime + self.w_z * waiting_time
+
+    def schedule_fitness(self, shifts, w_x, w_y, w_z, d, s, e, p, u, threshold=None):
+        """
+        Args:
+            shifts: dictionary mapping each shift to its activity ids in
+                visiting order, as decoded by Util.decodeSchedule.
             p: .
             w_x: weight of travel time.
             w_y: weight of shift over time.
@@ -77,63 +261,97 @@ class FitnessFunction_HHCRSP(FitnessFunction):
             s: Thoi gian bat dau som nhat cua moi hoat dong.
             e: Thoi gian ket thuc du tinh cua moi hoat dong.
             u: Thoi gian lam viec du tinh cua moi ca truc.
+            threshold: fitness the schedule has to beat, or None. Once the
+                penalty of the shifts seen so far rules that out, stops and
+                returns it as a FitnessBound.
+
+        Routes are taken from the memo only when d, s, e, p and u are the
+        instance's own data.
 
         Returns:
             fitness.
         """
 
-        shifts = {}  # tao mot dictionary de luu cac hoat dong trong tung ca truc
-
-        # Giai ma lich trinh
-        for i, activity in enumerate(gene):
-            shift = math.floor(activity)
-            priority = activity - shift
-            activity_id = i + 1
-            shifts.setdefault(shift, []).append((activity_id, priority))
-
-        # sap xep cac hoat dong trong moi ca truc theo muc do uu tien tang dan
-        for shift in shifts:
-            shifts[shift].sort(key=lambda x: x[1])
-
         # if self.config['verbose']:
         #     print("--->>> Schedule --------------------------")
         #     for shift in shifts:
         #         print(shifts[shift])
         #     print("------------------------------------------\n")
         
-        # --- Thay doi o day ---
-        # num_shifts = len(shifts) + 1  # lay so luong ca truc tu dictionary shifts
-        t_v0 = [0 for _ in range(self.numShifts + 1)] # khoi tao mang t_v0
-        for shift in shifts:
-            first_activity_in_shift = shifts[shift][0][0]  # lay hoat dong dau tien cua moi ca
-            # print(first_activity_in_shift)
-            t_v0[int(shift)] = max(0, s[first_activity_in_shift] - d[0][first_activity_in_shift]) 
         total_travel_time = 0
         total_overtime = 0
         total_waiting_time = 0
 
+        own = (d is self.matrixD and s is self.tStart and e is self.tEnd and
+               p is self.p and u is self.u)
+        remaining = len(shifts)
         for shift, activities in shifts.items():
-            start_time = t_v0[int(shift)]
+            if own:
+                travel_time, overtime, waiting_time = self.memo_route_cost(shift, activities, True)
+            else:
+                travel_time, overtime, waiting_time = self.route_cost(shift, activities, d, s, e, p, u)
+            total_travel_time += travel_time
+            total_overtime += overtime
+            total_waiting_time += waiting_time
 
-            first_activity = activities[0][0]
-            activity = first_activity
-            next_activity = first_activity
-            arrival_time = max(start_time, s[first_activity] - d[0][first_activity])
+            # Penalties only accumulate, so the partial fitness is an upper bound
+            remaining -= 1
+            if threshold is not None and remaining > 0:
+                bound = -(w_x * total_travel_time + w_y * total_overtime + w_z * total_waiting_time)
+                if bound <= threshold:
+                    return FitnessBound(bound)
 
-            for i in range(len(activities)):
-                if i == 0 : continue
-                activity = activities[i-1][0]
-                next_activity = activities[i][0]
+        # tinh gia tri fitness
+        # fitness = w_x * total_travel_time + w_y * total_overtime + w_z * total_waiting_time
+        return -(w_x * total_travel_time + w_y * total_overtime + w_z * total_waiting_time)
 
-                total_travel_time += d[activity ][next_activity]
-                arrival_time = max(s[next_activity], arrival_time + p[activity] + d[activity][next_activity])
 
-                wait_time = max(0, arrival_time - d[activity][next_activity] - e[activity])
-                total_waiting_time += wait_time
+class FitnessFunction_Remote(FitnessFunction):
+    '''
+    Fitness function computed by an ``EvaluatorService`` running in another
+    process.  Batches are pipelined, keeping up to ``evaluatorInFlight``
+    requests in flight over ``evaluatorConnections`` connections to the
+    service at ``evaluatorAddress``, and ``inFlight`` tells crossovers how
+    many offspring to send out at once.  Local search and seeding score
+    single shifts with ``route_penalty``, which is answered by a local
+    ``FitnessFunction_HHCRSP`` of the same instance rather than the service.
+    '''
+    def __init__(self, config, runNumber):
+        self.client = EvaluatorClient.Client(config["evaluatorAddress"],
+                                             config["evaluatorConnections"],
+                                             config["evaluatorInFlight"])
+        self.inFlight = config["evaluatorInFlight"]
+        self.local = FitnessFunction_HHCRSP(config, runNumber)
+        self.numActivities = self.local.numActivities
+        self.numShifts = self.local.numShifts
 
-            overtime = max(0, arrival_time + p[next_activity] + d[next_activity][0] - (start_time + u[int(shift)]))
-            total_overtime += overtime
+    def request(self, requests):
+        '''
+        Sends a list of ``(genes, threshold)`` requests to the service and
+        returns their fitness values, bounds given as ``FitnessBound``.
+        '''
+        return [FitnessBound(fitness) if bound else fitness
+                for fitness, bound in self.client.evaluate(requests)]
 
-        # tinh gia tri fitness
-        # fitness = w_x * total_travel_time + w_y * total_overtime + w_z * total_waiting_time
-        return -(w_x * total_travel_time + w_y * total_overtime + w_z * total_waiting_time)
\ No newline at end of file
+    def evaluate(self, genes):
+        return self.request([(genes, None)])[0]
+
+    def evaluateBounded(self, genes, threshold):
+        return self.request([(genes, threshold)])[0]
+
+    def evaluateBatch(self, individuals):
+        return self.request([(individual.genes, None)
+                             for individual in individuals])
+
+    def evaluateBoundedBatch(self, individuals):
+        return self.request([(individual.genes, individual.threshold)
+                             for individual in individuals])
+
+    def route_penalty(self, shift, activities):
+        return self.local.route_penalty(shift, activities)
+
+    def shrinkCaches(self):
+        self.local.shrinkCaches()
+
+    def subProblemsSolved(self, genes):
+        return [0]
@@ -0,0 +1,115 @@
+'''
+This module holds what the ``test_*`` modules share: configurations of small
+random instances built in memory, evaluated random populations and a test
+case running in a temporary folder, since runs write initial populations,
+archives and traces relative to the working directory.
+'''
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import FitnessFunction
+import Util
+from HHCRSP import HHCRSP
+from Individual import Individual
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIGS = ['problems/hhcrsp_5_4.cfg', 'experiments/general.cfg',
+           'variants/hhcrsp.cfg']
+
+
+def instance(config, seed):
+    '''
+    Returns a random instance drawn like ``HHCRSP`` does, without reading or
+    saving files.
+
+    Parameters:
+
+    - ``config``: A dictionary containing the instance size and generator
+      settings, such as ``numActivities``, ``numShifts`` and ``MAX_D``.
+    - ``seed``: The seed of the instance.
+    '''
+    rng = random.Random(seed)
+    n = config['numActivities']
+    v = config['numShifts']
+    tStart = [rng.randint(0, config['MAX_START']) for _ in xrange(n + 1)]
+    return HHCRSP.fromData({
+        'N': n, 'V': v,
+        'matrixQ': [[int(rng.random() > config['THRESHOLD'])
+                     for _ in xrange(v + 1)] for _ in xrange(n + 1)],
+        'matrixD': [[rng.randint(1, config['MAX_D']) if i != j else 0
+                     for j in xrange(n + 1)] for i in xrange(n + 1)],
+        'tStart': tStart,
+        'eEnd': [start + rng.randint(1, config['MAX_WINDOW_SIZE'])
+                 for start in tStart],
+        'p': [rng.randint(1, config['MAX_P']) for _ in xrange(n + 1)],
+        'u': [rng.randint(1, config['MAX_DURATION']) for _ in xrange(v + 1)],
+        'w_x': config['w_x'], 'w_y': config['w_y'], 'w_z': config['w_z'],
+        'w_dependency': config['w_dependency']})
+
+
+def configuration(seed=0, **overrides):
+    '''
+    Returns the default configuration of a small and quick run, holding a
+    random ``instance`` in ``hhcrsp``.
+
+    Parameters:
+
+    - ``seed``: The seed of the instance.
+    - ``overrides``: Configuration values replacing the defaults, applied
+      before the instance is drawn.
+    '''
+    config = Util.loadConfigurations([os.path.join(ROOT, filename)
+                                      for filename in CONFIGS])
+    config.update(numActivities=12, numShifts=3, problemId=seed, popSize=20,
+                  runs=1, maximumEvaluations=1000, maximumFitness=0,
+                  verbose=False)
+    config.update(overrides)
+    config['hhcrsp'] = instance(config, seed)
+    return config
+
+
+def population(config, evaluator, size, seed=0):
+    '''
+    Returns a list of ``size`` random individuals evaluated by
+    ``evaluator``, drawn without touching the global random state.
+
+    Parameters:
+
+    - ``config``: The configuration of the instance.
+    - ``evaluator``: The ``FitnessFunction`` giving their fitness.
+    - ``size``: The number of individuals.
+    - ``seed``: The seed of the individuals.
+    '''
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        genomes = [Util.randomGene(config) for _ in xrange(size)]
+    finally:
+        random.setstate(state)
+    return [Individual(genes, evaluator.evaluate(genes)) for genes in genomes]
+
+
+def evaluator(config, runNumber=0):
+    '''
+    Returns the ``FitnessFunction_HHCRSP`` of a configuration.
+    '''
+    return FitnessFunction.FitnessFunction_HHCRSP(config, runNumber)
+
+
+class FolderTestCase(unittest.TestCase):
+    '''
+    Test case running every test in a fresh temporary folder holding an
+    empty ``dataset`` folder, with the global random state seeded.
+    '''
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.folder, 'dataset'))
+        os.chdir(self.folder)
+        random.seed(0)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
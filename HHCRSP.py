@@ -1,11 +1,13 @@
 import random
 import json
 import os
+import heapq
 
 class HHCRSP(object):
     def __init__(self, config):
         self.numActivities = config['numActivities']
         self.numShifts = config['numShifts']
+        self.lookUpNeighbourhoods = {}
 
         id = int(config['problemId'])
         data_file = self.getDataJsonFile(id)
@@ -76,6 +78,33 @@ class HHCRSP(object):
             # if self.matrixQ[n][v] == 1:
                 shifts.append(v + 1)
         return shifts
+
+    def getProximity(self, n, m):
+        '''
+        Proximity between activities ``n`` and ``m`` (1-based ids), smaller
+        is closer: the shortest travel time between them plus the gap that
+        separates their time windows.  Pairs with disjoint windows that are far
+        apart can hardly interact within a shift.
+        '''
+        gap = max(0, self.tStart[m] - self.tEnd[n], self.tStart[n] - self.tEnd[m])
+        return min(self.matrixD[n][m], self.matrixD[m][n]) + gap
+
+    def getCandidateNeighbourhoods(self, k):
+        '''
+        For every gene index (activity ``i + 1``) returns the list of the
+        ``k`` closest other gene indices according to ``getProximity``.
+        Computed once per instance and ``k``, in O(n^2 log k).
+        '''
+        try:
+            return self.lookUpNeighbourhoods[k]
+        except KeyError:
+            neighbourhoods = []
+            for i in range(self.numActivities):
+                others = [j for j in range(self.numActivities) if j != i]
+                neighbourhoods.append(heapq.nsmallest(
+                    k, others, key=lambda j: self.getProximity(i + 1, j + 1)))
+            self.lookUpNeighbourhoods[k] = neighbourhoods
+            return neighbourhoods
     
     def getDataJsonFile(self, problemId):
         return 'dataset/hhcrsp_%d_%d_%d.json' % (self.numActivities, self.numShifts, problemId)
@@ -84,9 +113,25 @@ class HHCRSP(object):
         return 'dataset/hhcrsp_%d_%d_%d.txt' % (self.numActivities, self.numShifts, problemId)
     
     #-----------------------------------------------------------------------------------------------
+    @classmethod
+    def fromData(cls, data):
+        '''
+        Builds an instance directly from data in the format of its json
+        file, without reading or saving files, for instance for instances
+        derived from others.
+        '''
+        instance = cls.__new__(cls)
+        instance.lookUpNeighbourhoods = {}
+        instance.lookUpFeasibleShifts = {}
+        instance.setData(data)
+        return instance
+
     def load(self, file_path):
         with open(file_path, "r") as file:
             data = json.load(file)
+        self.setData(data)
+
+    def setData(self, data):
         self.numActivities = data['N']
         self.numShifts = data['V']
         self.matrixQ = data['matrixQ']
@@ -1,9 +1,12 @@
 '''
 This module contains coroutines designed to perform different types of hill
 climbing as well as a function to perform a complete climb of a single set
-of genes.
+of genes.  Random-key genomes are instead improved by
+``randomKeyHillClimber``, which scores moves by delta evaluation.
 '''
 import random
+import time
+from Util import decodeSchedule
 
 
 def steepestAscentHillClimber(genes):
@@ -64,3 +67,109 @@ def climb(genes, evaluator, method):
         except StopIteration:
             break
     return counter
+
+
+def randomKeyHillClimber(genes, evaluator, maximumEvaluations,
+                         deadline=None):
+    '''
+    First improvement hill climber for random-key genes.  Repeatedly tries,
+    for every activity in random order, to move it to another shift, to swap
+    it with another activity, or to reinsert it elsewhere in its own shift,
+    applying the first move that lowers the total penalty.  Each move is
+    scored from the penalties of the (at most two) shifts it changes, using
+    ``evaluator.route_penalty``, instead of evaluating the whole schedule.
+    Stops when no move improves, after ``maximumEvaluations`` scored moves
+    or once the ``deadline`` has passed, checked every 64 moves.  Modifies
+    the genes in place, re-encoding only the changed shifts, and returns how
+    many moves were scored and how many were applied.
+
+    Parameters:
+
+    - ``genes``: The initial list of random-key genes to improve.
+    - ``evaluator``: A ``FitnessFunction_HHCRSP`` like object providing
+      ``numShifts`` and ``route_penalty``.
+    - ``maximumEvaluations``: The limit on how many moves are scored.
+    - ``deadline``: The ``time.time()`` value after which no more moves are
+      scored, or None for no limit.
+    '''
+    _, decoded = decodeSchedule(genes)
+    routes = {shift: list(decoded.get(shift, []))
+              for shift in xrange(1, evaluator.numShifts + 1)}
+    penalties = {shift: evaluator.route_penalty(shift, route)
+                 for shift, route in routes.iteritems()}
+    where = {activity: shift for shift, route in routes.iteritems()
+             for activity in route}
+    changed = set()
+    evaluations = 0
+    iterations = 0
+
+    def candidates(activity):
+        '''
+        Internal function generating every move of ``activity`` as a
+        dictionary of the new routes of the shifts it changes.
+        '''
+        shift = where[activity]
+        route = routes[shift]
+        rest = [a for a in route if a != activity]
+        # Reinsert within its own shift
+        for position in xrange(len(route)):
+            if route[position] != activity:
+                yield {shift: rest[:position] + [activity] + rest[position:]}
+        for other in routes:
+            if other == shift:
+                continue
+            target = routes[other]
+            # Move to another shift
+            for position in xrange(len(target) + 1):
+                yield {shift: rest,
+                       other: target[:position] + [activity] +
+                       target[position:]}
+            # Swap with an activity of another shift
+            index = route.index(activity)
+            for position, partner in enumerate(target):
+                yield {shift: route[:index] + [partner] + route[index + 1:],
+                       other: target[:position] + [activity] +
+                       target[position + 1:]}
+        # Swap within its own shift
+        index = route.index(activity)
+        for position in xrange(index + 1, len(route)):
+            swapped = list(route)
+            swapped[index], swapped[position] = route[position], activity
+            yield {shift: swapped}
+
+    improved = True
+    expired = deadline is not None and time.time() >= deadline
+    while improved and evaluations < maximumEvaluations and not expired:
+        improved = False
+        activities = where.keys()
+        random.shuffle(activities)
+        for activity in activities:
+            for move in candidates(activity):
+                evaluations += 1
+                moved = {shift: evaluator.route_penalty(shift, route)
+                         for shift, route in move.iteritems()}
+                delta = sum(moved[shift] - penalties[shift] for shift in move)
+                if delta < -1e-9:
+                    routes.update(move)
+                    penalties.update(moved)
+                    for shift, route in move.iteritems():
+                        for a in route:
+                            where[a] = shift
+                    changed.update(move)
+                    iterations += 1
+                    improved = True
+                    break
+                if evaluations >= maximumEvaluations:
+                    break
+                if (deadline is not None and evaluations % 64 == 0 and
+                        time.time() >= deadline):
+                    expired = True
+                    break
+            if evaluations >= maximumEvaluations or expired:
+                break
+
+    for shift in changed:
+        route = routes[shift]
+        for position, activity in enumerate(route):
+            genes[activity - 1] = shift + (position + 0.5) / len(route)
+    return evaluations, iterations
@@ -3,12 +3,22 @@ Simple module containing individual object implementations.
 '''
 import sys
 import hashlib
+from array import array
+import Util
 
 class Individual(object):
     '''
     A basic individual object used to combine gene fitness with genomes, as
-    well as some basic utility functions.
+    well as some basic utility functions.  Genes should only be changed
+    through ``setGene`` so the cached schedule stays valid.
     '''
+    # Fitness this individual must beat to be accepted, if any.  Set by
+    # optimizers on offspring so evaluations may stop early.
+    threshold = None
+    # The generation, mask index and parent index of offspring, if any.  Set
+    # by optimizers for evaluation traces.
+    origin = None
+
     def __init__(self, genes=[], fitness=1 - sys.maxint):
         '''
         Create a new individual instance with optional arguments for initial
@@ -22,6 +32,37 @@ class Individual(object):
         '''
         self.genes = genes
         self.fitness = fitness
+        self.schedule = None
+
+    def decode(self):
+        '''
+        Returns the schedule encoded by the genes as given by
+        ``Util.decodeSchedule``.  Decoded on first use and cached until a gene
+        changes.
+        '''
+        if self.schedule is None:
+            self.schedule = Util.decodeSchedule(self.genes)
+        return self.schedule
+
+    def setGene(self, index, value):
+        '''
+        Changes a single gene, discarding the cached schedule.
+
+        Parameters:
+
+        - ``index``: The index of the gene to change.
+        - ``value``: The new value of the gene.
+        '''
+        self.genes[index] = value
+        self.schedule = None
+
+    def compact(self):
+        '''
+        Switches to a compact representation, keeping the genes in an array
+        of doubles and discarding the cached schedule.
+        '''
+        self.genes = array('d', self.genes)
+        self.schedule = None
 
     def __cmp__(self, other):
         '''
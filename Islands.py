@@ -0,0 +1,242 @@
+'''
+This module contains the island model, which evolves several LTGA
+populations on the same problem in separate processes.  Every few
+generations each island sends copies of its best individuals to the next
+island in a ring, and all islands share one evaluation budget.
+'''
+import random
+import os
+import Queue
+import multiprocessing
+import Experiments
+import FitnessFunction
+import Util
+from Individual import Individual
+from LTGA import LTGA
+
+
+class CountingEvaluator(object):
+    '''
+    Wraps an evaluator to count the evaluations ``oneRun`` performs with it,
+    so they can be added to the budget shared by all islands.
+    '''
+    def __init__(self, evaluator):
+        '''
+        Parameters:
+
+        - ``evaluator``: The evaluator to wrap.
+        '''
+        self.evaluator = evaluator
+        self.evaluations = 0
+
+    def __getattr__(self, name):
+        '''
+        Everything not counted is passed through to the wrapped evaluator.
+        '''
+        return getattr(self.evaluator, name)
+
+    def evaluateIndividual(self, individual, threshold=None):
+        self.evaluations += 1
+        return self.evaluator.evaluateIndividual(individual, threshold)
+
+    def evaluateBatch(self, individuals):
+        self.evaluations += len(individuals)
+        return self.evaluator.evaluateBatch(individuals)
+
+    def evaluateBoundedBatch(self, individuals):
+        self.evaluations += len(individuals)
+        return self.evaluator.evaluateBoundedBatch(individuals)
+
+
+class IslandLTGA(LTGA):
+    '''
+    LTGA population living on one island.  Migrates after every
+    ``migrationInterval`` generations and stops once the shared evaluation
+    budget is used up or another island has succeeded.
+    '''
+    def __init__(self, island, inbound, outbound, evaluator, shared, config):
+        '''
+        Parameters:
+
+        - ``island``: The number of this island.
+        - ``inbound``: The queue this island receives migrants from.
+        - ``outbound``: The queue this island sends migrants to.
+        - ``evaluator``: The ``CountingEvaluator`` used by this island.
+        - ``shared``: A tuple of the shared evaluation counter and success
+          flag.
+        - ``config``: A dictionary containing all configuration information
+          required by ``islandRun``.
+        '''
+        self.island = island
+        self.inbound = inbound
+        self.outbound = outbound
+        self.evaluator = evaluator
+        self.counter, self.solved = shared
+        self.config = config
+        self.generation = 0
+        self.reported = 0
+
+    def report(self):
+        '''
+        Adds the evaluations made since the last report to the shared counter
+        and returns the new global total.
+        '''
+        with self.counter.get_lock():
+            self.counter.value += self.evaluator.evaluations - self.reported
+            self.reported = self.evaluator.evaluations
+            return self.counter.value
+
+    def migrate(self):
+        '''
+        Sends copies of the best individuals to the next island and replaces
+        the worst individuals with any better immigrants received.
+        '''
+        self.individuals.sort()
+        emigrants = self.individuals[-self.config["migrants"]:]
+        self.outbound.put([(list(individual.genes), individual.fitness)
+                           for individual in emigrants])
+        immigrants = []
+        while True:
+            try:
+                immigrants.extend(self.inbound.get_nowait())
+            except Queue.Empty:
+                break
+        immigrants.sort(key=lambda migrant: migrant[1], reverse=True)
+        for position, (genes, fitness) in enumerate(immigrants):
+            if (position >= len(self.individuals) or
+                    fitness <= self.individuals[position].fitness):
+                break
+            self.individuals[position] = Individual(genes, fitness)
+
+    def exhausted(self):
+        '''
+        Checks if the shared budget is used up or another island succeeded.
+        The shared counter is only updated every few evaluations.
+        '''
+        if self.evaluator.evaluations - self.reported >= 16:
+            self.report()
+        return (self.counter.value >= self.config["maximumEvaluations"] or
+                self.solved.value)
+
+    def generate(self, initialPopulation, config):
+        '''
+        Runs ``LTGA.generate``, stopping as soon as ``exhausted`` is true.
+        '''
+        generator = LTGA.generate(self, initialPopulation, config)
+        individual = generator.next()
+        while not self.exhausted():
+            fitness = yield individual
+            individual = generator.send(fitness)
+        generator.close()
+
+    def endGeneration(self):
+        self.generation += 1
+        if self.generation % self.config["migrationInterval"] == 0:
+            self.migrate()
+        return False
+
+
+def runIsland(runNumber, island, queues, shared, results, config):
+    '''
+    Process entry point performing one island's part of an island run and
+    putting its result dictionary on the ``results`` queue.
+
+    Parameters:
+
+    - ``runNumber``: What number run this is.
+    - ``island``: The number of this island.
+    - ``queues``: The list of migration queues, one per island.
+    - ``shared``: A tuple of the shared evaluation counter and success flag.
+    - ``results``: The queue receiving ``(island, result)``.
+    - ``config``: A dictionary containing all configuration information
+      required by ``islandRun``.
+    '''
+    for queue in queues:
+        # Migrants left unread must not keep this process from exiting
+        queue.cancel_join_thread()
+    random.seed(hash((config["seed"], runNumber, island)))
+    islandConfig = dict(config)
+    # Each island starts from its own initial population
+    islandConfig["initialPopFolder"] = os.path.join(
+        config["initialPopFolder"], "island%i" % island)
+    if config["traceFolder"]:
+        islandConfig["traceFolder"] = os.path.join(config["traceFolder"],
+                                                   "island%i" % island)
+    # The shared budget ends islands as if they had converged
+    islandConfig["restarts"] = "none"
+    options = Util.moduleClasses(FitnessFunction)
+    evaluator = CountingEvaluator(options[config["problem"]](config,
+                                                             runNumber))
+    optimizers = []
+
+    def optimizerClass():
+        '''
+        Internal function creating this island's optimizer.
+        '''
+        optimizer = IslandLTGA(island, queues[island],
+                               queues[(island + 1) % len(queues)], evaluator,
+                               shared, config)
+        optimizers.append(optimizer)
+        return optimizer
+
+    try:
+        result = Experiments.oneRun(runNumber, optimizerClass, evaluator,
+                                    islandConfig)
+        optimizers[-1].report()
+        if result['success']:
+            shared[1].value = 1
+    except:
+        results.put((island, None))  # Keeps the parent from waiting forever
+        raise
+    results.put((island, result))
+
+
+def islandRun(runNumber, config):
+    '''
+    Performs a single run using ``islands`` LTGA populations evolving in
+    parallel processes.  Returns a result dictionary like ``oneRun`` for the
+    best island, where ``evaluations`` is the total over all islands and
+    ``islandEvaluations`` lists the share of each island.  Islands report
+    their evaluations every few evaluations, so the total can slightly
+    exceed ``maximumEvaluations``.
+
+    Parameters:
+
+    - ``runNumber``: What number run this is.
+    - ``config``: A dictionary containing all configuration information
+      required to perform a single run.  Should include values for:
+
+      - ``islands``: The number of islands.
+      - ``migrationInterval``: The number of generations between
+        migrations.
+      - ``migrants``: The number of individuals each island sends out per
+        migration.
+      - All configuration information required by ``oneRun``.
+    '''
+    islands = config["islands"]
+    queues = [multiprocessing.Queue() for _ in xrange(islands)]
+    shared = multiprocessing.Value('l', 0), multiprocessing.Value('b', 0)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(
+        target=runIsland,
+        args=(runNumber, island, queues, shared, results, config))
+        for island in xrange(islands)]
+    for process in processes:
+        process.start()
+    islandResults = dict(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    if None in islandResults.values():
+        raise Exception("An island failed, see its traceback")
+
+    best = max(islandResults.values(), key=lambda result: result['fitness'])
+    combined = dict(best)
+    for key in ['skippedOffspring', 'prunedOffspring', 'discardedOffspring',
+                'partialEvaluations', 'LS_evaluations', 'LS_iterations']:
+        combined[key] = sum(result[key] for result in islandResults.values())
+    combined['islandEvaluations'] = [islandResults[island]['evaluations']
+                                     for island in xrange(islands)]
+    combined['evaluations'] = shared[0].value
+    if config['verbose']:
+        print runNumber, combined
+    return combined
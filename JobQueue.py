@@ -0,0 +1,282 @@
+'''
+This module contains a work queue kept in a directory, letting any number of
+``main.py`` processes on one or many hosts sharing a file system perform the
+runs of an experiment together, with no scheduler or other service.
+
+Each run is a job file, which moves from the ``pending`` folder to the
+``claimed`` folder and finally to the ``done`` folder of the queue, where
+its result is written next to it.  Jobs are claimed by renaming them, which
+only one worker can do successfully.  While performing a job its worker
+touches the claimed file every ``heartbeatInterval`` seconds, and a claimed
+file that has not been touched for ``staleTimeout`` seconds is claimed again
+by another worker.  Staleness is judged by each worker's own clock, so the
+clocks of the hosts need not agree.
+
+For example, running the following command on several hosts performs the
+runs of the experiment with all of them.
+
+````pypy main.py experiments/general.cfg problems/hhcrsp_5_4.cfg -q queue````
+'''
+import os
+import time
+import random
+import socket
+import threading
+import Experiments
+import ResultStore
+import Util
+from HHCRSP import HHCRSP
+
+PENDING, CLAIMED, DONE = 'pending', 'claimed', 'done'
+
+
+class JobQueue(object):
+    '''
+    A queue of (configuration, run number) jobs kept in a directory.
+    '''
+    def __init__(self, folder, heartbeatInterval, staleTimeout):
+        '''
+        Opens the queue, creating its folders if needed.
+
+        Parameters:
+
+        - ``folder``: The relative path to the queue directory.
+        - ``heartbeatInterval``: The number of seconds between touches of a
+          job being performed.
+        - ``staleTimeout``: The number of seconds after which an untouched
+          claimed job is claimed again.
+        '''
+        self.folder = folder
+        self.heartbeatInterval = heartbeatInterval
+        self.staleTimeout = staleTimeout
+        self.worker = '%s-%i' % (socket.gethostname(), os.getpid())
+        # Claimed file name -> (modification time, local time first seen)
+        self.observed = {}
+        for state in [PENDING, CLAIMED, DONE]:
+            try:
+                os.makedirs(os.path.join(folder, state))
+            except OSError:
+                # Another worker may have created it in the meantime
+                if not os.path.isdir(os.path.join(folder, state)):
+                    raise
+
+    def path(self, state, name):
+        '''
+        Returns the path of a file in one of the queue folders.
+        '''
+        return os.path.join(self.folder, state, name)
+
+    def jobName(self, name):
+        '''
+        Returns the job name of a claimed file name, which is followed by
+        the worker holding the claim.
+        '''
+        return name.split('@')[0]
+
+    def exists(self, job):
+        '''
+        Returns if a job is pending, claimed or done.
+        '''
+        return (os.path.exists(self.path(PENDING, job)) or
+                os.path.exists(self.path(DONE, job)) or
+                any(self.jobName(name) == job
+                    for name in os.listdir(os.path.join(self.folder,
+                                                        CLAIMED))))
+
+    def submit(self, config, runNumbers=None):
+        '''
+        Adds a job for each run of a configuration that is not yet in the
+        queue.  Returns the list of job names of those runs in order.
+
+        Parameters:
+
+        - ``config``: A dictionary containing all configuration information
+          required by ``perform``.
+        - ``runNumbers``: The list of runs to add, by default every one of
+          the ``runs`` of the configuration.
+        '''
+        key = ResultStore.configKey(config)
+        stored = {name: value for name, value in config.iteritems()
+                  if name != 'hhcrsp'}
+        if runNumbers is None:
+            runNumbers = xrange(config["runs"])
+        jobs = []
+        for runNumber in runNumbers:
+            job = '%s_%i.json' % (key[:20], runNumber)
+            jobs.append(job)
+            if not self.exists(job):
+                Util.saveList(self.path(PENDING, job),
+                              [{'runNumber': runNumber, 'config': stored}])
+        return jobs
+
+    def claim(self):
+        '''
+        Claims a pending job, or a claimed job whose worker stopped touching
+        it, and returns the path of its claimed file.  Returns None if there
+        is no such job.
+        '''
+        pending = os.listdir(os.path.join(self.folder, PENDING))
+        # Workers starting together should not all race for the same job
+        random.shuffle(pending)
+        for job in pending:
+            if job.endswith('.tmp'):
+                continue
+            claimed = self.path(CLAIMED, '%s@%s' % (job, self.worker))
+            try:
+                os.rename(self.path(PENDING, job), claimed)
+                return claimed
+            except OSError:
+                pass  # Another worker claimed it first
+
+        now = time.time()
+        for name in os.listdir(os.path.join(self.folder, CLAIMED)):
+            try:
+                modified = os.stat(self.path(CLAIMED, name)).st_mtime
+            except OSError:
+                continue  # Finished or reclaimed in the meantime
+            seen = self.observed.get(name)
+            if seen is None or seen[0] != modified:
+                self.observed[name] = modified, now
+            elif now - seen[1] > self.staleTimeout:
+                claimed = self.path(CLAIMED, '%s@%s' % (self.jobName(name),
+                                                        self.worker))
+                try:
+                    os.rename(self.path(CLAIMED, name), claimed)
+                    os.utime(claimed, None)
+                    return claimed
+                except OSError:
+                    pass
+        return None
+
+    def perform(self, claimed):
+        '''
+        Performs the run of a claimed job while touching its file, then
+        writes its result into the ``done`` folder and moves the job there.
+
+        Parameters:
+
+        - ``claimed``: The path of the claimed file, as given by ``claim``.
+        '''
+        job = self.jobName(os.path.basename(claimed))
+        data = Util.loadConfiguration(claimed)[0]
+        finished = threading.Event()
+
+        def heartbeat():
+            '''
+            Internal function touching the claimed file until the run is done.
+            '''
+            while not finished.wait(self.heartbeatInterval):
+                try:
+                    os.utime(claimed, None)
+                except OSError:
+                    return  # The claim was taken over by another worker
+
+        beating = threading.Thread(target=heartbeat)
+        beating.daemon = True
+        beating.start()
+        try:
+            result = runJob(data['runNumber'], data['config'])
+        finally:
+            finished.set()
+            beating.join()
+        Util.saveList(self.path(DONE, job + '.result'), [result])
+        try:
+            os.rename(claimed, self.path(DONE, job))
+        except OSError:
+            # Reclaimed while running, the other worker writes the same result
+            pass
+
+    def result(self, job):
+        '''
+        Returns the result dictionary of a finished job, or None.
+        '''
+        try:
+            return Util.loadConfiguration(self.path(DONE, job + '.result'))[0]
+        except IOError:
+            return None
+
+
+# Problem instances of this process, by the values identifying them
+instances = {}
+
+
+def runJob(runNumber, config):
+    '''
+    Performs a single run, loading its problem instance like ``main.py``.
+    Runs are seeded from their run number, as in ``Experiments.fullRun`` with
+    a result store.  Returns the result dictionary.
+
+    Parameters:
+
+    - ``runNumber``: What number run this is.
+    - ``config``: A dictionary containing all configuration information
+      required by ``Experiments.performRun``, without the instance.
+    '''
+    key = (config['numActivities'], config['numShifts'], config['problemId'])
+    if key not in instances:
+        random.seed(config['seed'])
+        instances[key] = HHCRSP(config)
+    config = dict(config, hhcrsp=instances[key])
+    random.seed(hash((config["seed"], runNumber)))
+    return Experiments.performRun(runNumber, config)
+
+
+def queueRun(config, store=None):
+    '''
+    Submits the runs of a configuration to the queue, then performs jobs
+    from the queue, including those of other configurations, until every
+    run of this configuration is done.  Returns the list of result
+    dictionaries like ``Experiments.fullRun``.  If a keyboard interrupt
+    occurs, will return partial information, and the job being performed
+    is claimed again by another worker once stale.
+
+    With a ``store``, runs it already holds for the configuration are not
+    submitted, and the result of every other run is stored once it is done,
+    whichever worker performed it.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information
+      required to perform all runs.  Should include values for:
+
+      - ``jobQueue``: The relative path to the queue directory.
+      - ``heartbeatInterval``: The number of seconds between touches of a
+        job being performed.
+      - ``staleTimeout``: The number of seconds after which a job whose
+        worker stopped touching it is claimed again.
+      - All configuration information required by ``Experiments.fullRun``.
+    - ``store``: A ``ResultStore.ResultStore``, or None.
+    '''
+    queue = JobQueue(config["jobQueue"], config["heartbeatInterval"],
+                     config["staleTimeout"])
+    completed = {}
+    if store is not None:
+        key = ResultStore.configKey(config)
+        completed = store.completed(key)
+    runNumbers = [runNumber for runNumber in xrange(config["runs"])
+                  if runNumber not in completed]
+    jobs = zip(runNumbers, queue.submit(config, runNumbers))
+    try:
+        while True:
+            for runNumber, job in jobs:
+                if runNumber in completed:
+                    continue
+                result = queue.result(job)
+                if result is not None:
+                    completed[runNumber] = result
+                    if store is not None:
+                        store.put(key, runNumber, result, config)
+            if len(completed) == config["runs"]:
+                return [completed[runNumber]
+                        for runNumber in xrange(config["runs"])]
+            claimed = queue.claim()
+            if claimed is None:
+                # Waits for other workers to finish or go stale
+                time.sleep(queue.heartbeatInterval)
+                continue
+            if config['verbose']:
+                print 'Performing', os.path.basename(claimed)
+            queue.perform(claimed)
+    except KeyboardInterrupt:
+        print "Caught interrupt, exiting"
+        return [completed[runNumber] for runNumber in sorted(completed)]
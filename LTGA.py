@@ -4,9 +4,14 @@ functionality for each of the variants
 '''
 import math
 import random
+import heapq
+import time
 from itertools import combinations
+from collections import defaultdict, deque
+import FitnessFunction
 import Util
 from Individual import Individual
+from ParallelLinkage import ParallelLinkage
 
 
 class LTGA(object):
@@ -16,6 +21,10 @@ class LTGA(object):
     create an LTGA object and then call the ``generate`` function.  This
     will send out individuals and expects their fitness to be sent back in.
     '''
+    # Wall-clock time after which ``generate`` builds no further linkage
+    # model, set by ``Experiments.oneRun``, or None
+    deadline = None
+
     def getMaskValue(self, individual, mask):
         '''
         Gets the individual's gene values for the given mask
@@ -38,7 +47,7 @@ class LTGA(object):
         - ``value``: The list of values to change to.
         '''
         for valueIndex, geneIndex in enumerate(mask):
-            individual.genes[geneIndex] = value[valueIndex]
+            individual.setGene(geneIndex, value[valueIndex])
 
     # def entropy(self, mask, lookup):
     #     '''
@@ -113,7 +122,108 @@ class LTGA(object):
     #         lookup[c2, c1] = result
     #         return result
 
-    def buildTree(self, distance):
+    def shiftEntropy(self, counts, total):
+        '''
+        Calculates the entropy of a discretized gene value distribution.
+
+        Parameters:
+
+        - ``counts``: The number of individuals taking each value.
+        - ``total``: The number of individuals.
+        '''
+        total = float(total)
+        return -sum(x / total * math.log(x / total, 2)
+                    for x in counts if x)
+
+    def shiftIndicators(self, lookup):
+        '''
+        Returns, for every activity, a dictionary mapping each shift it is
+        assigned to in the current population to the bit set, as an integer,
+        of the individuals assigning it there, along with the list of the
+        entropies of those assignments.  Joint counts of two activities are
+        then popcounts of the intersections of their bit sets, so a pair
+        costs O(V^2 P / 64) word operations instead of a pass over the
+        population.
+
+        Parameters:
+
+        - ``lookup``: A dictionary caching the indicators for this population.
+          Should be reset if the population changes.
+        '''
+        try:
+            return lookup['shiftIndicators']
+        except KeyError:
+            shifts = [individual.decode()[0]
+                      for individual in self.individuals]
+            total = len(shifts)
+            indicators = []
+            entropies = []
+            for column in zip(*shifts):
+                bits = {}
+                # Individual k is bit k, so the string is built reversed
+                reverse = column[::-1]
+                for shift in set(column):
+                    bits[shift] = int(''.join('1' if value == shift else '0'
+                                              for value in reverse), 2)
+                indicators.append(bits)
+                entropies.append(self.shiftEntropy(
+                    [bin(x).count('1') for x in bits.itervalues()], total))
+            lookup['shiftIndicators'] = indicators, entropies
+            return lookup['shiftIndicators']
+
+    def mutualInformation(self, a, b, lookup):
+        '''
+        Returns the normalized mutual information between the shift
+        assignments of activities ``a`` and ``b``,
+        ``(H(a) + H(b) - H(a, b)) / H(a, b)``, which lies in [0, 1] and grows
+        with linkage.  Computed on demand from ``shiftIndicators``, so sparse
+        trees only pay for the pairs they use.
+
+        Parameters:
+
+        - ``a``: The index of the first activity.
+        - ``b``: The index of the second activity.
+        - ``lookup``: A dictionary caching the indicators for this population.
+          Should be reset if the population changes.
+        '''
+        indicators, entropies = self.shiftIndicators(lookup)
+        joint = self.shiftEntropy([bin(x & y).count('1')
+                                   for x in indicators[a].itervalues()
+                                   for y in indicators[b].itervalues()],
+                                  len(self.individuals))
+        if joint > 0:
+            return (entropies[a] + entropies[b] - joint) / joint
+        return 0.0
+
+    def pairwiseMutualInformation(self, c1, c2, lookup):
+        '''
+        Calculates the average pairwise mutual information between two
+        clusters of genes using ``mutualInformation``.  Much cheaper than
+        ``clusterDependencyDistance`` as no pass over the population is
+        needed past the first, and pairs are only computed when asked for.
+
+        Parameters:
+
+        - ``c1``: The first cluster.
+        - ``c2``: The second cluster.
+        - ``lookup``: A dictionary mapping cluster pairs to their previously
+          found distances.  Should be reset if the population changes.
+        '''
+        try:
+            return lookup[c1, c2]
+        except KeyError:
+            if len(c1) == 1 and len(c2) == 1:
+                result = self.mutualInformation(c1[0], c2[0], lookup)
+            else:
+                result = sum(self.pairwiseMutualInformation((a,), (b,),
+                                                            lookup)
+                             for a in c1 for b in c2) / float(
+                                 len(c1) * len(c2))
+            lookup[c1, c2] = result
+            lookup[c2, c1] = result
+            return result
+
+    def buildTree(self, distance, lookup):
         '''
         Given a method of calculating distance, build the linkage tree for the
         current population.  The tree is built by finding the two clusters with
@@ -125,13 +235,15 @@ class LTGA(object):
         Parameters:
 
         - ``distance``: The method of calculating distance.  Current options
-          are ``self.clusterDistance`` and ``self.pairwiseDistance``
+          are ``self.clusterDependencyDistance`` and
+          ``self.pairwiseMutualInformation``
+        - ``lookup``: A dictionary of distances already found for this
+          population, usually empty.
         '''
         clusters = [(i,) for i in xrange(len(self.individuals[0].genes))]
         subtrees = [(i,) for i in xrange(len(self.individuals[0].genes))]
         random.shuffle(clusters)
         random.shuffle(subtrees)
-        lookup = {}
 
         def allLowest():
             '''
@@ -168,6 +280,99 @@ class LTGA(object):
                 subtrees.append(combined)
         return subtrees
 
+    def sparsePairs(self):
+        '''
+        Returns the list of gene index pairs ``(a, b)`` with ``a < b`` where
+        either gene is in the candidate neighbourhood of the other, as used by
+        ``buildSparseTree``.
+        '''
+        neighbourhoods = self.hhcrsp.getCandidateNeighbourhoods(
+            self.neighbourhoodSize)
+        return sorted({(min(a, b), max(a, b))
+                       for a, neighbourhood in enumerate(neighbourhoods)
+                       for b in neighbourhood})
+
+    def buildSparseTree(self, distance, lookup):
+        '''
+        Sparse variant of ``buildTree`` that only considers pairs of activities
+        found in each other's candidate neighbourhood, as given by
+        ``HHCRSP.getCandidateNeighbourhoods``.  Distances are computed for
+        those edges only and clusters are merged by average linkage, where
+        pairs without an edge count as unlinked.  Once no linked clusters
+        remain, the rest are joined in random pairs to complete the tree.
+        Besides the distances of its at most n k edges, building the tree
+        costs O(n k log n) instead of the O(n^3) of ``buildTree``, while the
+        neighbourhoods take O(n^2 log k) once per instance.  Returns the
+        subtrees in the order they were created.
+
+        Parameters:
+
+        - ``distance``: The method of calculating distance between two
+          single gene clusters, for instance
+          ``self.clusterDependencyDistance``.
+        - ``lookup``: A dictionary of distances already found for this
+          population, usually empty.
+        '''
+        length = len(self.individuals[0].genes)
+        subtrees = [(i,) for i in xrange(length)]
+        random.shuffle(subtrees)
+
+        # links[c1][c2] is the summed linkage over all edges between c1 and c2
+        links = {(i,): {} for i in xrange(length)}
+        for a, b in self.sparsePairs():
+            c1, c2 = (a,), (b,)
+            links[c1][c2] = links[c2][c1] = distance(c1, c2, lookup)
+
+        heap = []
+
+        def push(c1, c2):
+            '''
+            Internal function used to queue a cluster pairing by its average
+            linkage, breaking ties randomly.
+            '''
+            average = links[c1][c2] / float(len(c1) * len(c2))
+            heapq.heappush(heap, (-average, random.random(), c1, c2))
+
+        for c1 in links:
+            for c2 in links[c1]:
+                if c1 < c2:
+                    push(c1, c2)
+
+        while len(links) > 1 and heap:
+            _, _, c1, c2 = heapq.heappop(heap)
+            # Entries of already merged clusters are stale
+            if c1 not in links or c2 not in links:
+                continue
+            combined = c1 + c2
+            merged = links.pop(c1)
+            for c, value in links.pop(c2).iteritems():
+                merged[c] = merged.get(c, 0) + value
+            merged.pop(c1, None)
+            merged.pop(c2, None)
+            for c, value in merged.iteritems():
+                links[c].pop(c1, None)
+                links[c].pop(c2, None)
+                links[c][combined] = value
+            links[combined] = merged
+            for c in merged:
+                push(combined, c)
+            # Only add it as a subtree if it is not the root
+            if len(links) != 1:
+                subtrees.append(combined)
+
+        # The clusters left are unlinked, and are joined in random pairs
+        remaining = sorted(links)
+        random.shuffle(remaining)
+        while len(remaining) > 1:
+            combined = remaining.pop() + remaining.pop()
+            remaining.append(combined)
+            # Keeps the order random for the next pair
+            other = random.randrange(len(remaining))
+            remaining[other], remaining[-1] = remaining[-1], remaining[other]
+            if len(remaining) != 1:
+                subtrees.append(combined)
+        return subtrees
+
     def leastLinkedFirst(self, subtrees):
         '''
         Reorders the subtrees such that the cluster pairs with the least
@@ -211,6 +416,29 @@ class LTGA(object):
         return Individual([p2.genes[g] if g in maskSet else p1.genes[g]
                            for g in range(len(p1.genes))])
 
+    def sameSchedule(self, parent, child, mask):
+        '''
+        Checks if ``child``, created by ``applyMask`` from ``parent`` and the
+        given mask, decodes to exactly the same schedule as ``parent``, in
+        which case both have the same fitness.  Only the shifts of the mask
+        genes need to be compared, and most children are told apart by the
+        shift of a mask gene without decoding them.
+
+        Parameters:
+
+        - ``parent``: The individual the child was cloned from.
+        - ``child``: The newly created individual.
+        - ``mask``: The list of indices copied from the donor.
+        '''
+        shifts = parent.decode()[0]
+        for g in mask:
+            if int(child.genes[g]) != shifts[g]:
+                return False
+        routes = parent.decode()[1]
+        childRoutes = child.decode()[1]
+        return all(childRoutes[shift] == routes[shift]
+                   for shift in set(shifts[g] for g in mask))
+
     # def twoParentCrossover(self, masks):
     #     '''
     #     Creates individual generator using the two parent crossover variant.
@@ -290,7 +518,9 @@ class LTGA(object):
         individuals that need to be evaluated and receives fitness information.
         Will continue sending out individuals until the population contains
         only one unique individual or a generation passes without the set of
-        unique individuals changing.
+        unique individuals changing.  Also stops before building the linkage
+        model of a generation once ``self.deadline`` has passed, as that
+        alone can take longer than evaluating a generation.
 
         Parameters:
 
@@ -304,60 +534,314 @@ class LTGA(object):
           for:
 
           - ``distance``: The method used to determine the distance between
-            clusters, for instance ``clusterDistance`` and
-            ``pairwiseDistance``.
+            clusters, for instance ``clusterDependencyDistance`` and
+            ``pairwiseMutualInformation``.
+          - ``linkage``: The method used to build the linkage tree, either
+            ``buildTree`` or ``buildSparseTree``.
+          - ``neighbourhoodSize``: The number of candidate neighbours kept
+            per activity by ``buildSparseTree``.
+          - ``linkageWorkers``: The number of processes computing pairwise
+            distances in parallel.  With 1 everything stays in this process.
           - ``ordering``: The method used to determine what order subtrees
             should be used as crossover masks, for instance
             ``leastLinkedFirst`` and ``smallestFirst``.
           - ``crossover``: The method used to generate new individuals, for
-            instance ``twoParentCrossover`` and ``globalCrossover``.
+            instance ``recombination`` and ``synchronousRecombination``.
+            Crossovers may send out a list of individuals, in which case a
+            list of fitness values is expected back.
+          - ``acceptance``: When crossovers replace a parent by its
+            offspring, either ``baseline`` or ``improving``.
+          - ``speculation``: The number of offspring ``recombination`` sends
+            out at once, 1 for one at a time.  ``Experiments.oneRun``
+            resolves 0 to the ``inFlight`` of its evaluator before calling
+            this, anything below 1 is rejected here.
+          - ``maskPruning``: A True / False value to determine if offspring
+            of mask sizes that rarely improve their parent are skipped, see
+            ``pruneMask``.
+          - ``maskPruningThreshold``, ``maskPruningFloor`` and
+            ``maskPruningWarmup``: The settings of ``pruneMask``.
         '''
         self.hhcrsp = config['hhcrsp']
 
+        self.neighbourhoodSize = config["neighbourhoodSize"]
+        self.skippedOffspring = 0
+        self.prunedOffspring = 0
+        self.discardedOffspring = 0
+        self.currentGeneration = 0
+        self.acceptance = config["acceptance"]
+        self.speculation = config["speculation"]
+        if self.speculation < 1:
+            raise Exception("speculation must be at least 1, not %r, or no"
+                            " offspring would be sent out" % self.speculation)
+        self.maskPruning = config["maskPruning"]
+        self.pruningThreshold = config["maskPruningThreshold"]
+        self.pruningFloor = config["maskPruningFloor"]
+        self.pruningWarmup = config["maskPruningWarmup"]
+        # Decayed number of offspring and total improvement per mask size
+        self.maskTrials = defaultdict(float)
+        self.maskGains = defaultdict(float)
+
         self.individuals = initialPopulation
+        linkage = Util.classMethods(self)[config["linkage"]]
         distance = Util.classMethods(self)[config["distance"]]
         ordering = Util.classMethods(self)[config["ordering"]]
         crossover = Util.classMethods(self)[config["crossover"]]
         beforeGenerationSet = set(self.individuals)
-        while True:
-            subtrees = self.buildTree(distance)
-            masks = ordering(subtrees)
-            generator = crossover(masks)
-            # print("--> tree", masks)
-            individual = generator.next()
+        parallel = None
+        if config["linkageWorkers"] > 1:
+            if linkage == self.buildSparseTree:
+                pairs = self.sparsePairs()
+            else:
+                length = len(self.individuals[0].genes)
+                pairs = list(combinations(xrange(length), 2))
+            parallel = ParallelLinkage(self, config["distance"], pairs,
+                                       config["linkageWorkers"])
+        try:
             while True:
-                fitness = yield individual
+                if self.deadline is not None and time.time() >= self.deadline:
+                    break
+                lookup = {}
+                if parallel is not None:
+                    lookup = parallel.pairLookup(self.individuals)
+                subtrees = linkage(distance, lookup)
+                masks = ordering(subtrees)
+                generator = crossover(masks)
+                # print("--> tree", masks)
+                # A generation whose offspring were all skipped or pruned
+                # sends out none, but still ends like any other
+                sent = False
+                pruned = self.prunedOffspring
                 try:
-                    individual = generator.send(fitness)
+                    individual = generator.next()
+                    sent = True
+                    while True:
+                        fitness = yield individual
+                        individual = generator.send(fitness)
                 except StopIteration:
+                    pass
+
+                # Recent generations weigh most in the mask statistics
+                for size in self.maskTrials:
+                    self.maskTrials[size] *= 0.5
+                    self.maskGains[size] *= 0.5
+                self.currentGeneration += 1
+                if self.endGeneration():
                     break
-            
-            # If all individuals are identical
-            currentSet = set(self.individuals)
-            if (len(currentSet) == 1 or
-                currentSet == beforeGenerationSet):
-                break
-            beforeGenerationSet = currentSet
-    
+                if not sent and self.prunedOffspring > pruned:
+                    # Pruning emptied the generation, which says nothing
+                    # about convergence, so the next one starts from fresh
+                    # mask statistics and tries every size again
+                    self.maskTrials.clear()
+                    self.maskGains.clear()
+                    continue
+                # If all individuals are identical
+                currentSet = set(self.individuals)
+                if (len(currentSet) == 1 or
+                    currentSet == beforeGenerationSet):
+                    break
+                beforeGenerationSet = currentSet
+        finally:
+            if parallel is not None:
+                parallel.close()
+
+    def endGeneration(self):
+        '''
+        Called by ``generate`` after every generation, before checking for
+        convergence.  Returns True if evolution should stop.  Does nothing by
+        default, subclasses use it to interact with the outside world.
+        '''
+        return False
+
+    def pruneMask(self, mask):
+        '''
+        Returns True if the next offspring of ``mask`` should be skipped, in
+        which case it is counted in ``self.prunedOffspring``.  Masks are
+        judged by the improvement per evaluation of the offspring of all
+        masks of their size, as recorded by ``recordMask``.  Once a size has
+        ``self.pruningWarmup`` recent offspring, its offspring are only
+        created with probability proportional to how its improvement per
+        evaluation compares to ``self.pruningThreshold`` times that of all
+        sizes, but never below ``self.pruningFloor``, so sizes can recover.
+        Should a whole generation be pruned, ``generate`` forgets the
+        statistics before the next one.
+
+        Parameters:
+
+        - ``mask``: The list of indices the offspring would copy.
+        '''
+        if not self.maskPruning:
+            return False
+        trials = self.maskTrials[len(mask)]
+        if trials < self.pruningWarmup:
+            return False
+        overall = sum(self.maskGains.itervalues())
+        if overall <= 0:
+            return False  # No size improved, so none can be judged worse
+        overall /= sum(self.maskTrials.itervalues())
+        rate = self.maskGains[len(mask)] / trials
+        probability = max(self.pruningFloor,
+                          rate / (self.pruningThreshold * overall))
+        if random.random() < probability:
+            return False
+        self.prunedOffspring += 1
+        return True
+
+    def recordMask(self, mask, parent, child):
+        '''
+        Records the outcome of an evaluated offspring for ``pruneMask``.
+        Offspring only given a ``PredictedFitness`` by a surrogate are not
+        trials of their mask.
+
+        Parameters:
+
+        - ``mask``: The list of indices the offspring copied.
+        - ``parent``: The individual the offspring was cloned from.
+        - ``child``: The offspring, with its fitness set.
+        '''
+        if (not self.maskPruning or
+                isinstance(child.fitness, FitnessFunction.PredictedFitness)):
+            return
+        self.maskTrials[len(mask)] += 1
+        if parent < child:
+            self.maskGains[len(mask)] += child.fitness - parent.fitness
+
     def recombination(self, masks):
         '''
         Recombining two solutions for a given subset of activities
         
-        Using a linkage tree for subsets of activities
+        Using a linkage tree for subsets of activities.  With the
+        ``baseline`` acceptance, offspring worse than their parent replace it
+        in the population, while later masks keep building on the parent.
+        With ``improving``, offspring that beat their parent replace it and
+        later masks build on them.  Offspring decoding to the same schedule
+        as their parent are skipped and counted in ``self.skippedOffspring``,
+        and those of masks rejected by ``pruneMask`` are never created.
+
+        With a ``self.speculation`` above 1, the offspring of that many of
+        the parent's next masks are sent out together as a list, so batching
+        evaluators can keep them in flight.  Masks and donors are drawn in
+        the same order as one at a time.  When an offspring replaces a parent
+        later masks build on, the offspring of the following masks of the
+        list are discarded and built again from it, with the same donors, and
+        counted in ``self.discardedOffspring``.  Only ``pruneMask`` decides
+        on statistics older than one at a time.
         '''
         random.shuffle(self.individuals)
         beforeIndividuals = self.individuals
         for i in xrange(0, len(self.individuals)):
             p1 = self.individuals[i]
-            for mask in masks:
-                candidates = [_ for _ in xrange(0, len(self.individuals)) if _ != i]
-                d = beforeIndividuals[random.choice(candidates)]
+            draws = iter(enumerate(masks))
+            # Drawn masks and donors whose offspring must be built again
+            redraws = deque()
+            while True:
+                # Entries of maskId, mask, donor and offspring, which is None
+                # if it was skipped
+                window = []
+                offspring = []
+                while len(offspring) < self.speculation:
+                    if redraws:
+                        maskId, mask, d = redraws.popleft()
+                    else:
+                        try:
+                            maskId, mask = next(draws)
+                        except StopIteration:
+                            break
+                        if self.pruneMask(mask):
+                            continue
+                        candidates = [_ for _ in xrange(0, len(self.individuals)) if _ != i]
+                        d = beforeIndividuals[random.choice(candidates)]
+
+                    p2 = self.applyMask(p1, d, mask)
+                    if self.sameSchedule(p1, p2, mask):
+                        # Cannot beat its parent, no need to evaluate it
+                        self.skippedOffspring += 1
+                        window.append((maskId, mask, d, None))
+                        continue
+                    p2.threshold = p1.fitness
+                    p2.origin = self.currentGeneration, maskId, i
+                    window.append((maskId, mask, d, p2))
+                    offspring.append(p2)
+                if not offspring:
+                    break
+                if self.speculation == 1:
+                    fitnesses = [(yield offspring[0])]
+                else:
+                    fitnesses = yield offspring
+                for p2, fitness in zip(offspring, fitnesses):
+                    p2.fitness = fitness
+
+                for position, (maskId, mask, d, p2) in enumerate(window):
+                    if p2 is None:
+                        continue
+                    self.recordMask(mask, p1, p2)
+                    
+                    if self.acceptance == 'improving':
+                        if p1 < p2:
+                            self.individuals[i] = p1 = p2
+                            break
+                    elif p2 < p1:
+                        self.individuals[i] = p2
+                # Offspring after a new p1 were built from the old one
+                for maskId, mask, d, p2 in reversed(window[position + 1:]):
+                    if p2 is None:
+                        self.skippedOffspring -= 1
+                    else:
+                        self.discardedOffspring += 1
+                    redraws.appendleft((maskId, mask, d))
+
+    def synchronousRecombination(self, masks):
+        '''
+        Generation-synchronous variant of ``recombination``.  For each mask
+        all offspring are built at once, each one copying the mask genes of a
+        random donor into its parent, and those with a schedule differing
+        from their parent's are sent out together as a single list,
+        expecting a list of fitness values back.  Offspring replace their
+        parent by the same ``self.acceptance`` as in ``recombination``: with
+        ``baseline`` those worse than it, with ``improving`` those better.
+        Donors are taken from the population as it
+        was before the mask was applied, trading the sequential acceptance of
+        ``recombination`` for batched evaluation.  Offspring rejected by
+        ``pruneMask`` are not created.
 
-                p2 = self.applyMask(p1, d, mask)
-                p2.fitness = yield p2
-                
-                if p2 < p1:
-                    self.individuals[i] = p2
+        Parameters:
+
+        - ``masks``: The list of crossover masks to be used when generating
+          individuals, ordered based on how they should be applied.
+        '''
+        random.shuffle(self.individuals)
+        size = len(self.individuals)
+        for maskId, mask in enumerate(masks):
+            before = list(self.individuals)
+            offspring = []
+            for i in xrange(size):
+                if self.pruneMask(mask):
+                    continue
+                # Any individual other than the parent
+                donor = random.randrange(size - 1)
+                if donor >= i:
+                    donor += 1
+                genes = list(before[i].genes)
+                donorGenes = before[donor].genes
+                for g in mask:
+                    genes[g] = donorGenes[g]
+                child = Individual(genes)
+                if self.sameSchedule(before[i], child, mask):
+                    self.skippedOffspring += 1
+                    continue
+                child.threshold = before[i].fitness
+                child.origin = self.currentGeneration, maskId, i
+                offspring.append((i, child))
+            if not offspring:
+                continue
+            fitnesses = yield [child for _, child in offspring]
+            for (i, child), fitness in zip(offspring, fitnesses):
+                child.fitness = fitness
+                self.recordMask(mask, before[i], child)
+                if self.acceptance == 'improving':
+                    if before[i] < child:
+                        self.individuals[i] = child
+                elif child < before[i]:
+                    self.individuals[i] = child
 
     def clusterDependencyDistance(self, c1, c2, lookup):
         '''
@@ -367,16 +851,29 @@ class LTGA(object):
 
         - ``c1``: The first cluster.
         - ``c2``: The second cluster.
+        - ``lookup``: A dictionary mapping cluster pairs, including pairs of
+          single genes, to their previously found distances.  Should be reset
+          if the population changes.
         '''
-        result = 0
-        for n in c1:
-            for m in c2:
-                try:
-                    pi = self.calculatePi(n, m) 
-                except:# len(c) == 0
-                    continue
-                result += self.computeDependencyMeasure(n, m)
-        return result
+        try:
+            return lookup[c1, c2]
+        except KeyError:
+            result = 0
+            for n in c1:
+                for m in c2:
+                    try:
+                        value = lookup[(n,), (m,)]
+                    except KeyError:
+                        try:
+                            pi = self.calculatePi(n, m)
+                        except:# len(c) == 0
+                            value = 0
+                        else:
+                            value = self.computeDependencyMeasure(n, m)
+                        lookup[(n,), (m,)] = value
+                    result += value
+            lookup[c1, c2] = result
+            return result
         
     # -----------------------------------------------
     def computeDependencyMeasure(self, n, m):
@@ -450,7 +947,7 @@ class LTGA(object):
                 for i in range(len(listActivity)):
                     activity = listActivity[i]
                     shift = listShift[i]
-                    if math.floor(individual.genes[activity - 1]) != shift:
+                    if individual.decode()[0][activity - 1] != shift:
                         check = False
                         break
                 if check: count += 1
@@ -479,7 +976,8 @@ class LTGA(object):
         '''
         schedules = []
         for individual in self.individuals:
-            if math.floor(individual.genes[n - 1]) == math.floor(individual.genes[m - 1]):
+            shifts = individual.decode()[0]
+            if shifts[n - 1] == shifts[m - 1]:
                 schedules.append(individual)
         return schedules
     
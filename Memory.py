@@ -0,0 +1,244 @@
+'''
+This module contains memory accounting for runs, and the guard used to keep
+a run below a memory ceiling by shrinking its caches.  Memory is measured as
+resident set size, read from ``/proc`` where available.
+'''
+import bisect
+import gc
+import heapq
+import os
+import resource
+from array import array
+from collections import Counter
+from itertools import izip
+import FitnessFunction
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+
+
+def peakMB():
+    '''
+    Returns the peak resident set size of this process so far in MB.
+    '''
+    # Linux reports kilobytes
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def currentMB():
+    '''
+    Returns the current resident set size of this process in MB, or the peak
+    if it cannot be read.
+    '''
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * PAGE_SIZE / 1048576.0
+    except (IOError, IndexError, ValueError):
+        return peakMB()
+
+
+class PhaseReport(object):
+    '''
+    Memory use at the end of each phase of a run, ready to be added to its
+    result dictionary.
+    '''
+    def __init__(self):
+        self.counts = Counter()
+        self.phases = []
+
+    def snapshot(self, phase, count=10):
+        '''
+        Records the current and peak resident set size, the ``count`` types
+        with the most objects tracked by the garbage collector and the
+        ``count`` types whose number of objects grew the most during the
+        phase.
+
+        Parameters:
+
+        - ``phase``: The name of the phase.
+        - ``count``: The number of types to list.
+        '''
+        counts = Counter(type(o).__name__ for o in gc.get_objects())
+        growth = counts.copy()
+        growth.subtract(self.counts)
+        self.counts = counts
+        self.phases.append({
+            'phase': phase, 'currentMB': currentMB(), 'peakMB': peakMB(),
+            'topTypes': counts.most_common(count),
+            'topGrowth': [(name, grown)
+                          for name, grown in growth.most_common(count)
+                          if grown > 0]})
+
+
+class CompactLookup(dict):
+    '''
+    Evaluation lookup mapping individual hashes to fitness values, which can
+    move its true fitness values into a pair of sorted arrays.  A compacted
+    entry takes 16 bytes instead of a dictionary slot, a boxed key and a
+    boxed fitness, and is found by binary search.  New entries always go to
+    the dictionary part, which ``len`` counts.
+    '''
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.compactKeys = array('l')
+        self.compactValues = array('d')
+
+    def __missing__(self, key):
+        index = bisect.bisect_left(self.compactKeys, key)
+        if index < len(self.compactKeys) and self.compactKeys[index] == key:
+            return self.compactValues[index]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def compacted(self):
+        '''
+        Returns the number of compacted entries.
+        '''
+        return len(self.compactKeys)
+
+    def compact(self, protected):
+        '''
+        Moves the true fitness values of the dictionary part into the arrays
+        and forgets its fitness bounds, only keeping the entries of
+        ``protected`` keys in the dictionary.  Returns the number of bounds
+        forgotten.
+
+        Parameters:
+
+        - ``protected``: The set of keys left in the dictionary.
+        '''
+        moved = sorted((key, fitness) for key, fitness in self.iteritems()
+                       if key not in protected and
+                       not isinstance(fitness, FitnessFunction.FitnessBound))
+        kept = [(key, dict.__getitem__(self, key)) for key in protected
+                if dict.__contains__(self, key)]
+        forgotten = len(self) - len(moved) - len(kept)
+        keys = array('l')
+        values = array('d')
+        for key, fitness in heapq.merge(izip(self.compactKeys,
+                                             self.compactValues), moved):
+            keys.append(key)
+            values.append(fitness)
+        self.compactKeys = keys
+        self.compactValues = values
+        # Clearing frees the table of the dictionary, unlike deleting keys
+        self.clear()
+        self.update(kept)
+        return forgotten
+
+    def thin(self):
+        '''
+        Forgets every other compacted entry.  Returns the number forgotten.
+        '''
+        forgotten = len(self.compactKeys) // 2
+        self.compactKeys = self.compactKeys[::2]
+        self.compactValues = self.compactValues[::2]
+        return forgotten
+
+
+class MemoryGuard(object):
+    '''
+    Keeps a run below a memory ceiling.  Once the resident set size reaches
+    90% of the ceiling, the population switches to compact individuals, the
+    evaluation lookup, a ``CompactLookup``, is compacted and registered
+    caches are shrunk.  From then on its dictionary part is kept to a
+    bounded capacity, or a quarter of its compacted entries if more, so
+    compacting stays amortized.  Should memory reach the ceiling again, half
+    of the compacted entries are forgotten and the capacity is halved.
+    '''
+    def __init__(self, limitMB):
+        '''
+        Parameters:
+
+        - ``limitMB``: The memory ceiling in MB.
+        '''
+        self.limitMB = limitMB
+        self.capacity = None
+        self.calls = 0
+        self.shrunkAt = 0
+        self.shrinks = 0
+        self.compactions = 0
+        self.compacted = 0
+        self.evictions = 0
+        self.callbacks = []
+
+    def register(self, callback):
+        '''
+        Adds a function called without arguments on every shrink, letting
+        other caches of the run, such as those of its evaluator, shrink too.
+        '''
+        self.callbacks.append(callback)
+
+    def check(self, lookup, individuals):
+        '''
+        Called after every evaluation step.  Keeps ``lookup`` within its
+        capacity and only reads the memory use every few calls.
+
+        Parameters:
+
+        - ``lookup``: The ``CompactLookup`` mapping individual hashes to
+          fitness values.
+        - ``individuals``: The current population, whose entries are kept in
+          the dictionary part.
+        '''
+        self.calls += 1
+        if (self.capacity is not None and
+                len(lookup) > max(self.capacity, lookup.compacted() // 4)):
+            self.compact(lookup, individuals)
+        if self.calls % 64 == 0:
+            used = currentMB()
+            # Freed memory is reused before the process grows again, so only
+            # growth since the last shrink calls for another
+            if used >= 0.9 * self.limitMB and used > self.shrunkAt:
+                self.shrink(lookup, individuals)
+                self.shrunkAt = currentMB()
+
+    def shrink(self, lookup, individuals):
+        '''
+        Compacts the population and ``lookup``, thinning the compacted
+        entries and halving the capacity after the first time, then calls
+        the registered callbacks.
+        '''
+        self.shrinks += 1
+        for individual in individuals:
+            individual.compact()
+        if self.capacity is None:
+            self.capacity = len(lookup)
+        else:
+            self.evictions += lookup.thin()
+        self.capacity = max(len(individuals), self.capacity // 2)
+        self.compact(lookup, individuals)
+        for callback in self.callbacks:
+            callback()
+        gc.collect()
+
+    def compact(self, lookup, individuals):
+        '''
+        Compacts ``lookup``, keeping the entries of ``individuals`` in its
+        dictionary part.
+        '''
+        protected = set(hash(individual) for individual in individuals)
+        self.evictions += lookup.compact(protected)
+        self.compactions += 1
+        self.compacted = lookup.compacted()
+
+    def report(self, result):
+        '''
+        Adds the number of shrinks, compactions, compacted entries and
+        forgotten lookup entries to a result dictionary.
+        '''
+        result['memoryShrinks'] = self.shrinks
+        result['lookupCompactions'] = self.compactions
+        result['lookupCompacted'] = self.compacted
+        result['lookupEvictions'] = self.evictions
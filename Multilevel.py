@@ -0,0 +1,273 @@
+'''
+This module contains the multilevel solve mode for large ``HHCRSP``
+instances.  Activities close in travel time and time window are merged into
+super-activities, halving the instance level by level until it has at most
+``multilevelCoarsest`` activities.  LTGA solves the coarsest instance first,
+then the final population of every level is projected onto the next finer
+one, where it seeds the population refined by another run of LTGA, down to
+the original instance.
+'''
+import Archive
+import Experiments
+import FitnessFunction
+import Seeding
+from HHCRSP import HHCRSP
+from Individual import Individual
+from LTGA import LTGA
+
+
+def coarsen(hhcrsp, neighbours):
+    '''
+    Groups the activities of an instance in pairs.  Taken by the start of
+    their time windows, each activity not grouped yet is paired with the
+    closest of its ``neighbours`` candidates according to
+    ``HHCRSP.getProximity`` that is not grouped yet either, or stays alone.
+    Returns the list of groups, each a list of activity ids in visiting
+    order.
+
+    Parameters:
+
+    - ``hhcrsp``: The instance to coarsen.
+    - ``neighbours``: The number of candidate partners of each activity.
+    '''
+    candidates = hhcrsp.getCandidateNeighbourhoods(neighbours)
+    order = sorted(xrange(1, hhcrsp.numActivities + 1),
+                   key=lambda a: hhcrsp.tStart[a])
+    grouped = set()
+    groups = []
+    for activity in order:
+        if activity in grouped:
+            continue
+        grouped.add(activity)
+        group = [activity]
+        for j in candidates[activity - 1]:
+            if j + 1 not in grouped:
+                grouped.add(j + 1)
+                group.append(j + 1)
+                break
+        group.sort(key=lambda a: hhcrsp.tStart[a])
+        groups.append(group)
+    return groups
+
+
+def coarseInstance(hhcrsp, groups):
+    '''
+    Returns the instance whose activities are the ``groups`` of ``hhcrsp``.
+    A super-activity takes the time window of its first activity, and lasts
+    from the start of that window until its last activity is done when they
+    are visited in order.  Travel times go from the last activity of a
+    super-activity to the first of another, and a super-activity can only
+    use the shifts all its activities can.
+
+    Parameters:
+
+    - ``hhcrsp``: The finer instance.
+    - ``groups``: The list of groups of activity ids returned by ``coarsen``.
+    '''
+    d = hhcrsp.matrixD
+    s = hhcrsp.tStart
+    p = hhcrsp.p
+    # Activities the depot, super-activity 0, starts and ends with
+    first = [0] + [group[0] for group in groups]
+    last = [0] + [group[-1] for group in groups]
+    tStart = [s[0]]
+    tEnd = [hhcrsp.tEnd[0]]
+    duration = [p[0]]
+    matrixQ = [hhcrsp.matrixQ[0]]
+    for group in groups:
+        time = s[group[0]]
+        for a, b in zip(group, group[1:]):
+            time = max(s[b], time + p[a] + d[a][b])
+        tStart.append(s[group[0]])
+        tEnd.append(hhcrsp.tEnd[group[0]])
+        duration.append(time + p[group[-1]] - s[group[0]])
+        matrixQ.append([min(hhcrsp.matrixQ[a][v] for a in group)
+                        for v in xrange(hhcrsp.numShifts + 1)])
+    matrixD = [[d[last[i]][first[j]] if i != j else 0
+                for j in xrange(len(groups) + 1)]
+               for i in xrange(len(groups) + 1)]
+    return HHCRSP.fromData({
+        'N': len(groups), 'V': hhcrsp.numShifts, 'matrixQ': matrixQ,
+        'matrixD': matrixD, 'tStart': tStart, 'eEnd': tEnd, 'p': duration,
+        'u': hhcrsp.u, 'w_x': hhcrsp.w_x, 'w_y': hhcrsp.w_y,
+        'w_z': hhcrsp.w_z, 'w_dependency': hhcrsp.w_dependency})
+
+
+def project(individual, groups, length):
+    '''
+    Returns the genes of the finer schedule an individual of the coarse
+    instance stands for, each super-activity replaced by its activities.
+
+    Parameters:
+
+    - ``individual``: An individual of the coarse instance.
+    - ``groups``: The groups the coarse instance was built from.
+    - ``length``: The number of activities of the finer instance.
+    '''
+    routes = {}
+    for shift, route in individual.decode()[1].iteritems():
+        routes[shift] = [a for activity in route for a in groups[activity - 1]]
+    return Seeding.encode(routes, length)
+
+
+def restrict(genes, groups):
+    '''
+    Returns the genes of the coarse schedule closest to a finer one, the
+    inverse of ``project``.  Every super-activity takes the gene of its
+    first activity, so it keeps that activity's shift and its place among
+    the first activities of the other groups.
+
+    Parameters:
+
+    - ``genes``: The genes of a schedule of the finer instance.
+    - ``groups``: The groups the coarse instance was built from.
+    '''
+    return [genes[group[0] - 1] for group in groups]
+
+
+def levels(config):
+    '''
+    Returns the list of ``(hhcrsp, groups)`` of every level, from the
+    original instance to the coarsest, where ``groups`` built the next
+    coarser level and is None for the coarsest.  Coarsening stops once
+    there are at most ``multilevelCoarsest`` activities or it no longer
+    removes a tenth of them.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information
+      required to perform a multilevel run, see ``multilevelRun``.
+    '''
+    hhcrsp = config['hhcrsp']
+    result = []
+    while hhcrsp.numActivities > config["multilevelCoarsest"]:
+        groups = coarsen(hhcrsp, config["multilevelNeighbours"])
+        if len(groups) > 0.9 * hhcrsp.numActivities:
+            break
+        result.append((hhcrsp, groups))
+        hhcrsp = coarseInstance(hhcrsp, groups)
+    result.append((hhcrsp, None))
+    return result
+
+
+def seedPopulation(projected, evaluator, config):
+    '''
+    Returns the evaluated initial population of a level.  Up to
+    ``multilevelProjected`` of it are the ``projected`` genes, best first,
+    and the rest are built by ``Seeding.genomeSource``.
+
+    Parameters:
+
+    - ``projected``: The list of genes projected from the coarser level.
+    - ``evaluator``: The ``FitnessFunction`` of the level.
+    - ``config``: The configuration of the level.
+    '''
+    count = int(round(config["popSize"] * config["multilevelProjected"]))
+    genomes = projected[:count]
+    nextGenes = Seeding.genomeSource(config, evaluator)
+    while len(genomes) < config["popSize"]:
+        genomes.append(nextGenes())
+    return [Individual(genes, evaluator.evaluate(genes)) for genes in genomes]
+
+
+def archived(hierarchy, config):
+    '''
+    Returns the list of genes of the ``archiveInject`` best archived
+    schedules of the original instance, restricted to the coarsest level,
+    or an empty list without an ``archiveFolder``.
+
+    Parameters:
+
+    - ``hierarchy``: The levels returned by ``levels``.
+    - ``config``: The configuration of the original instance.
+    '''
+    if not (config["archiveFolder"] and config["archiveInject"]):
+        return []
+    result = []
+    for individual in Archive.archiveFor(config).best(config["archiveInject"]):
+        genes = individual.genes
+        for _, groups in hierarchy[:-1]:
+            genes = restrict(genes, groups)
+        result.append(genes)
+    return result
+
+
+def multilevelRun(runNumber, config):
+    '''
+    Performs a single run on every level, from the coarsest to the original
+    instance, splitting the evaluation budget and time limit evenly among
+    them.  Returns the result dictionary of the run on the original
+    instance, whose ``evaluations``, ``seconds``, ``traceEvaluations`` and
+    ``traceSeconds`` cover all levels, along with the number of activities
+    and the fitness reached on every level in ``multilevelSizes`` and
+    ``multilevelFitness``.  Only the run on the original instance uses
+    ``maximumFitness`` and ``intensification``.  The ``archiveInject`` best
+    archived schedules are restricted to the coarsest level, where they
+    replace the last seeded individuals, and only the run on the original
+    instance archives its elites.
+
+    Parameters:
+
+    - ``runNumber``: What number run this is.
+    - ``config``: A dictionary containing all configuration information
+      required by ``Experiments.oneRun``, except that every level starts
+      from a seeded population instead of ``createInitialPopulation``.  The
+      ``problem`` must be ``FitnessFunction_HHCRSP``.  Should also include
+      values for:
+
+      - ``multilevelCoarsest``: The largest number of activities of the
+        coarsest level.
+      - ``multilevelNeighbours``: The number of candidate partners of each
+        activity when coarsening.
+      - ``multilevelProjected``: The share of every level's population
+        projected from the coarser level.
+    '''
+    hierarchy = levels(config)
+    share = config["maximumEvaluations"] // len(hierarchy)
+    injected = archived(hierarchy, config)[:config["popSize"]]
+    projected = []
+    sizes = []
+    fitnesses = []
+    evaluations = seconds = 0
+    for level in reversed(xrange(len(hierarchy))):
+        hhcrsp = hierarchy[level][0]
+        levelConfig = dict(config, hhcrsp=hhcrsp,
+                           numActivities=hhcrsp.numActivities,
+                           maximumSeconds=(config["maximumSeconds"] /
+                                           float(len(hierarchy))))
+        if level > 0:
+            levelConfig.update(maximumEvaluations=share,
+                               maximumFitness=float('inf'),
+                               intensification=False, archiveFolder='')
+        else:
+            levelConfig['maximumEvaluations'] -= evaluations
+        evaluator = FitnessFunction.FitnessFunction_HHCRSP(levelConfig,
+                                                           runNumber)
+        population = seedPopulation(projected, evaluator, levelConfig)
+        if level == len(hierarchy) - 1 and injected:
+            population[len(population) - len(injected):] = [
+                Individual(genes, evaluator.evaluate(genes))
+                for genes in injected]
+        final = []
+        result = Experiments.oneRun(runNumber, LTGA, evaluator, levelConfig,
+                                    population, final)
+        if level == 0:
+            # The trace of the original instance continues the earlier levels
+            result['traceEvaluations'] = [count + evaluations for count in
+                                          result['traceEvaluations']]
+            result['traceSeconds'] = [elapsed + seconds for elapsed in
+                                      result['traceSeconds']]
+        evaluations += result['evaluations']
+        seconds += result['seconds']
+        sizes.append(hhcrsp.numActivities)
+        fitnesses.append(result['fitness'])
+        if level > 0:
+            finer, groups = hierarchy[level - 1]
+            projected = [project(individual, groups, finer.numActivities)
+                         for individual in final]
+    result['evaluations'] = evaluations
+    result['seconds'] = seconds
+    result['archiveInjected'] = len(injected)
+    result['multilevelSizes'] = sizes
+    result['multilevelFitness'] = fitnesses
+    return result
@@ -0,0 +1,134 @@
+'''
+This module computes the pairwise part of LTGA's linkage model with a pool
+of worker processes.  The genes of the population are copied once per
+generation into shared memory, where the workers read them without any
+pickling, and each worker fills its own block of a shared array of pair
+distances.
+'''
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray
+from Individual import Individual
+
+# Per worker process state, set up by ``initializeWorker``
+state = {}
+
+
+def initializeWorker(optimizerClass, hhcrsp, distanceName, length, genes,
+                     pairs, values):
+    '''
+    Prepares a worker process.  Everything passed in here is inherited when
+    the pool is created, including the shared arrays.
+
+    Parameters:
+
+    - ``optimizerClass``: The class of the optimizer owning the distance
+      method, for instance ``LTGA``.
+    - ``hhcrsp``: The problem instance used by the distance method.
+    - ``distanceName``: The name of the distance method.
+    - ``length``: The number of genes per individual.
+    - ``genes``: Shared array holding the population genes row by row.
+    - ``pairs``: Shared array holding the gene pairs to compute, flattened.
+    - ``values``: Shared array receiving one distance per pair.
+    '''
+    optimizer = optimizerClass()
+    optimizer.hhcrsp = hhcrsp
+    state.update({'optimizer': optimizer, 'distanceName': distanceName,
+                  'length': length, 'genes': genes, 'pairs': pairs,
+                  'values': values, 'generation': None, 'lookup': {}})
+
+
+def fillBlock(task):
+    '''
+    Computes the distances of a contiguous block of pairs for the given
+    generation, writing them into the shared ``values`` array.  Blocks of
+    the same generation share one lookup in the worker, so values cached by
+    the distance method, such as the shift indicators of
+    ``pairwiseMutualInformation``, are computed once per worker and
+    generation rather than once per pair.
+
+    Parameters:
+
+    - ``task``: A tuple of the generation number, the population size and
+      the start and stop indices of the block of pairs.
+    '''
+    generation, size, start, stop = task
+    optimizer = state['optimizer']
+    if state['generation'] != generation:
+        length = state['length']
+        genes = state['genes']
+        optimizer.individuals = [
+            Individual(genes[i * length:(i + 1) * length])
+            for i in xrange(size)]
+        state['generation'] = generation
+        state['lookup'] = {}
+    distance = getattr(optimizer, state['distanceName'])
+    pairs = state['pairs']
+    values = state['values']
+    lookup = state['lookup']
+    for index in xrange(start, stop):
+        a, b = pairs[2 * index], pairs[2 * index + 1]
+        values[index] = distance((a,), (b,), lookup)
+
+
+class ParallelLinkage(object):
+    '''
+    Pool of worker processes computing the distance of a fixed list of gene
+    pairs for successive populations of the same size.  Call ``close`` once
+    done with it.
+    '''
+    def __init__(self, optimizer, distanceName, pairs, workers):
+        '''
+        Starts the worker pool.
+
+        Parameters:
+
+        - ``optimizer``: The optimizer whose population and instance are
+          used, for instance an ``LTGA`` object.
+        - ``distanceName``: The name of the distance method to compute, for
+          instance ``clusterDependencyDistance``.
+        - ``pairs``: The list of gene index pairs to compute.
+        - ``workers``: The number of worker processes.
+        '''
+        self.length = len(optimizer.individuals[0].genes)
+        self.pairs = pairs
+        self.genes = RawArray('d', len(optimizer.individuals) * self.length)
+        self.values = RawArray('d', len(pairs))
+        flattened = RawArray('i', [g for pair in pairs for g in pair])
+        # Several blocks per worker keeps the load balanced
+        self.blockSize = max(1, len(pairs) // (4 * workers))
+        self.generation = 0
+        self.pool = multiprocessing.Pool(
+            workers, initializeWorker,
+            (type(optimizer), optimizer.hhcrsp, distanceName, self.length,
+             self.genes, flattened, self.values))
+
+    def pairLookup(self, individuals):
+        '''
+        Computes the distance of every pair for the given population and
+        returns them as a dictionary keyed by both orientations of each pair
+        of single gene clusters, ready to seed a linkage tree lookup.
+
+        Parameters:
+
+        - ``individuals``: The population, no larger than the one the pool
+          was created for.
+        '''
+        length = self.length
+        for i, individual in enumerate(individuals):
+            self.genes[i * length:(i + 1) * length] = individual.genes
+        self.generation += 1
+        tasks = [(self.generation, len(individuals), start,
+                  min(start + self.blockSize, len(self.pairs)))
+                 for start in xrange(0, len(self.pairs), self.blockSize)]
+        self.pool.map(fillBlock, tasks)
+        lookup = {}
+        for index, (a, b) in enumerate(self.pairs):
+            lookup[(a,), (b,)] = lookup[(b,), (a,)] = self.values[index]
+        return lookup
+
+    def close(self):
+        '''
+        Stops the worker processes.
+        '''
+        self.pool.terminate()
+        self.pool.join()
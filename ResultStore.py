@@ -0,0 +1,125 @@
+'''
+This module contains a persistent store of run results kept in a SQLite
+database.  Results are keyed by a canonical hash of the configuration that
+produced them together with their run number, allowing ``fullRun`` to skip
+runs that have already been performed.
+
+To print the combined results of every configuration in a store, run
+````python ResultStore.py results.db````.
+'''
+import sys
+import json
+import hashlib
+import sqlite3
+
+# Configuration values that do not change the outcome of a single run
+IGNORED = {'hhcrsp', 'verbose', 'runs', 'resultStore', 'initialPopFolder',
+           'linkageWorkers', 'bisectionRuns', 'bisectionFailureLimit',
+           'bisectionWorkers', 'jobQueue', 'heartbeatInterval',
+           'staleTimeout', 'traceFolder'}
+
+
+def configKey(config):
+    '''
+    Returns a canonical hash of the configuration values that determine the
+    outcome of a run, including the data of the problem instance itself.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information.
+    '''
+    effective = {key: value for key, value in config.iteritems()
+                 if key not in IGNORED}
+    hhcrsp = config.get('hhcrsp')
+    if hhcrsp is not None:
+        effective['instance'] = [hhcrsp.matrixQ, hhcrsp.matrixD, hhcrsp.tStart,
+                                 hhcrsp.tEnd, hhcrsp.p, hhcrsp.u, hhcrsp.w_x,
+                                 hhcrsp.w_y, hhcrsp.w_z, hhcrsp.w_dependency]
+    canonical = json.dumps(effective, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical).hexdigest()
+
+
+class ResultStore(object):
+    '''
+    SQLite backed mapping from configuration keys and run numbers to result
+    dictionaries.  Safe to share between processes.
+    '''
+    def __init__(self, filename):
+        '''
+        Opens the store, creating it if needed.
+
+        Parameters:
+
+        - ``filename``: The relative path to the database file.
+        '''
+        self.connection = sqlite3.connect(filename, timeout=60)
+        with self.connection:
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS configs '
+                '(key TEXT PRIMARY KEY, config TEXT)')
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS results '
+                '(key TEXT, run INTEGER, result TEXT, PRIMARY KEY (key, run))')
+
+    def completed(self, key):
+        '''
+        Returns a dictionary mapping the run numbers stored for a
+        configuration key to their result dictionaries.
+
+        Parameters:
+
+        - ``key``: The configuration key, as given by ``configKey``.
+        '''
+        rows = self.connection.execute(
+            'SELECT run, result FROM results WHERE key = ?', (key,))
+        return {run: json.loads(result) for run, result in rows}
+
+    def results(self, key):
+        '''
+        Returns the list of result dictionaries stored for a configuration
+        key, ordered by run number, ready for ``Experiments.combineResults``.
+
+        Parameters:
+
+        - ``key``: The configuration key, as given by ``configKey``.
+        '''
+        completed = self.completed(key)
+        return [completed[run] for run in sorted(completed)]
+
+    def put(self, key, runNumber, result, config):
+        '''
+        Stores the result of a run.
+
+        Parameters:
+
+        - ``key``: The configuration key, as given by ``configKey``.
+        - ``runNumber``: What number run this result is for.
+        - ``result``: The result dictionary of the run.
+        - ``config``: The configuration of the run, stored for reference.
+        '''
+        description = json.dumps({name: value
+                                  for name, value in config.iteritems()
+                                  if name != 'hhcrsp'}, sort_keys=True)
+        with self.connection:
+            self.connection.execute(
+                'INSERT OR IGNORE INTO configs VALUES (?, ?)',
+                (key, description))
+            self.connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?)',
+                (key, runNumber, json.dumps(result)))
+
+    def configs(self):
+        '''
+        Returns a list of ``(key, config)`` for every configuration stored.
+        '''
+        rows = self.connection.execute('SELECT key, config FROM configs')
+        return [(key, json.loads(config)) for key, config in rows]
+
+
+if __name__ == '__main__':
+    import Experiments
+    store = ResultStore(sys.argv[1])
+    for key, config in store.configs():
+        results = store.results(key)
+        print key[:12], len(results), 'runs', Experiments.combineResults(
+            results)
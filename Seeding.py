@@ -0,0 +1,171 @@
+'''
+This module builds initial random-key genomes with fast constructive
+heuristics over the ``HHCRSP`` data, giving LTGA a better starting
+population than uniformly random genes.  Each heuristic is randomized so the
+genomes it builds differ, and the data they share is prepared once for the
+whole population by a ``Seeder``.
+'''
+import random
+import Util
+
+
+def encode(routes, length):
+    '''
+    Returns the random-key genes of a schedule.  Each activity gets its
+    shift plus a priority spreading the route evenly over the unit interval,
+    so the genes decode back to the same routes.
+
+    Parameters:
+
+    - ``routes``: A dictionary mapping shifts to their lists of activity ids
+      in visiting order.
+    - ``length``: The number of genes.
+    '''
+    genes = [0.0] * length
+    for shift, route in routes.iteritems():
+        for position, activity in enumerate(route):
+            genes[activity - 1] = shift + (position + 0.5) / len(route)
+    return genes
+
+
+def genomeSource(config, evaluator):
+    '''
+    Returns a function building the genes of the next genome.  Preparing a
+    ``Seeder`` costs O(n^2 log n), so it is only done if ``seedRatio``
+    calls for heuristics, otherwise genomes are drawn at random.
+
+    Parameters:
+
+    - ``config``: A dictionary containing all configuration information
+      required by ``Seeder``.
+    - ``evaluator``: A ``FitnessFunction_HHCRSP`` like object providing
+      ``route_penalty``.
+    '''
+    if config["seedRatio"] > 0 and config["seeding"]:
+        return Seeder(config, evaluator).genes
+    return lambda: Util.randomGene(config)
+
+
+class Seeder(object):
+    '''
+    Builds genomes for ``createInitialPopulation``, mixing random genomes
+    with those of the constructive heuristics.
+    '''
+    def __init__(self, config, evaluator):
+        '''
+        Parameters:
+
+        - ``config``: A dictionary containing all configuration information
+          required to seed the initial population.  Should include values
+          for:
+
+          - ``hhcrsp``: The problem instance.
+          - ``seeding``: The list of heuristics to use in turn, from
+            ``timeWindowInsertion``, ``nearestNeighbour`` and
+            ``shiftBalancing``.
+          - ``seedRatio``: The probability of a genome being built by a
+            heuristic instead of drawn at random.
+        - ``evaluator``: A ``FitnessFunction_HHCRSP`` like object providing
+          ``route_penalty``.
+        '''
+        self.config = config
+        self.evaluator = evaluator
+        hhcrsp = config['hhcrsp']
+        self.numActivities = hhcrsp.numActivities
+        self.shifts = range(1, hhcrsp.numShifts + 1)
+        self.activities = range(1, self.numActivities + 1)
+        d = hhcrsp.matrixD
+        # Every activity's others by increasing travel time, and the depot's
+        self.nearest = {a: sorted(self.activities, key=lambda b: d[a][b])
+                        for a in [0] + self.activities}
+        self.heuristics = [getattr(self, name) for name in config["seeding"]]
+        self.built = 0
+
+    def genes(self):
+        '''
+        Returns the genes of the next genome.
+        '''
+        ratio = self.config["seedRatio"]
+        if ratio <= 0 or not self.heuristics or random.random() >= ratio:
+            return Util.randomGene(self.config)
+        heuristic = self.heuristics[self.built % len(self.heuristics)]
+        self.built += 1
+        return encode(heuristic(), self.numActivities)
+
+    def timeWindowInsertion(self):
+        '''
+        Takes activities by the start of their time windows, with a little
+        noise, and appends each to the end of the shift where it adds the
+        least penalty, picking at random between the two best shifts.
+        '''
+        hhcrsp = self.config['hhcrsp']
+        order = sorted(self.activities, key=lambda a: hhcrsp.tStart[a] +
+                       random.uniform(0, hhcrsp.p[a]))
+        routes = {shift: [] for shift in self.shifts}
+        penalties = {shift: 0 for shift in self.shifts}
+        for activity in order:
+            costs = []
+            for shift in self.shifts:
+                penalty = self.evaluator.route_penalty(
+                    shift, routes[shift] + [activity])
+                costs.append((penalty - penalties[shift], random.random(),
+                              shift, penalty))
+            costs.sort()
+            _, _, shift, penalty = random.choice(costs[:2])
+            routes[shift].append(activity)
+            penalties[shift] = penalty
+        return routes
+
+    def nearestNeighbour(self):
+        '''
+        Builds a single tour from the depot, always travelling to the nearest
+        unvisited activity with an occasional random detour, then cuts it
+        into consecutive routes sized in proportion to each shift's working
+        time ``u``.
+        '''
+        hhcrsp = self.config['hhcrsp']
+        unvisited = set(self.activities)
+        tour = []
+        current = 0
+        while unvisited:
+            if random.random() < 0.1:
+                current = random.choice(list(unvisited))
+            else:
+                current = next(b for b in self.nearest[current]
+                               if b in unvisited)
+            unvisited.remove(current)
+            tour.append(current)
+        shifts = list(self.shifts)
+        random.shuffle(shifts)
+        total = float(sum(hhcrsp.u[shift] for shift in shifts))
+        routes = {}
+        start = 0
+        used = 0
+        for shift in shifts:
+            used += hhcrsp.u[shift]
+            stop = int(round(len(tour) * used / total))
+            routes[shift] = tour[start:stop]
+            start = stop
+        return routes
+
+    def shiftBalancing(self):
+        '''
+        Assigns activities, longest first with ties broken at random, to the
+        shift whose workload is the smallest fraction of its working time
+        ``u``, then visits each shift's activities by the start of their time
+        windows.
+        '''
+        hhcrsp = self.config['hhcrsp']
+        order = sorted(self.activities,
+                       key=lambda a: (-hhcrsp.p[a], random.random()))
+        load = {shift: 0 for shift in self.shifts}
+        routes = {shift: [] for shift in self.shifts}
+        for activity in order:
+            shift = min(self.shifts,
+                        key=lambda s: ((load[s] + hhcrsp.p[activity]) /
+                                       float(hhcrsp.u[s]), random.random()))
+            load[shift] += hhcrsp.p[activity]
+            routes[shift].append(activity)
+        for route in routes.itervalues():
+            route.sort(key=lambda a: hhcrsp.tStart[a])
+        return routes
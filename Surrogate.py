@@ -0,0 +1,177 @@
+'''
+This module contains a cheap surrogate of the HHCRSP fitness, used to
+pre-screen offspring before they are evaluated.  The surrogate is a linear
+regression on a few features of the decoded schedule, refitted online from
+every true evaluation of the run, and offspring it confidently predicts not
+to beat their ``threshold`` are not evaluated at all.
+'''
+import math
+import random
+
+# Number of features, including the constant
+FEATURES = 6
+
+
+def solve(matrix, vector):
+    '''
+    Returns the solution of a small linear system using Gaussian elimination
+    with partial pivoting.
+
+    Parameters:
+
+    - ``matrix``: A list of rows of the square system matrix.
+    - ``vector``: The right hand side of the system.
+    '''
+    size = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for column in xrange(size):
+        pivot = max(xrange(column, size), key=lambda r: abs(rows[r][column]))
+        rows[column], rows[pivot] = rows[pivot], rows[column]
+        for row in xrange(column + 1, size):
+            factor = rows[row][column] / rows[column][column]
+            for index in xrange(column, size + 1):
+                rows[row][index] -= factor * rows[column][index]
+    solution = [0.0] * size
+    for row in reversed(xrange(size)):
+        total = sum(rows[row][index] * solution[index]
+                    for index in xrange(row + 1, size))
+        solution[row] = (rows[row][size] - total) / rows[row][row]
+    return solution
+
+
+class Surrogate(object):
+    '''
+    Online least squares model of the fitness of individuals, which also
+    keeps the statistics needed to report its precision and recall.
+    '''
+    def __init__(self, hhcrsp, margin, auditRate, warmup):
+        '''
+        Parameters:
+
+        - ``hhcrsp``: The problem instance.
+        - ``margin``: How many root mean squared errors a prediction must
+          fall below a threshold before the individual is screened out.
+        - ``auditRate``: The fraction of screened out individuals that are
+          evaluated anyway, to measure the recall of the surrogate.
+        - ``warmup``: The number of true evaluations to learn from before
+          screening starts.
+        '''
+        self.hhcrsp = hhcrsp
+        self.margin = margin
+        self.auditRate = auditRate
+        self.warmup = warmup
+        self.normal = [[0.0] * FEATURES for _ in xrange(FEATURES)]
+        self.moments = [0.0] * FEATURES
+        self.weights = None
+        self.samples = 0
+        self.squaredError = None
+        # Outcomes of offspring by (predicted better, actually better)
+        self.outcomes = {(True, True): 0, (True, False): 0,
+                         (False, True): 0, (False, False): 0}
+        self.screened = 0
+        self.audited = 0
+
+    def features(self, individual):
+        '''
+        Returns the feature vector of an individual: a constant, the travel
+        time, the estimated overtime, the idle time and the lateness between
+        consecutive time windows, and the sum of squared shift sizes.
+        '''
+        hhcrsp = self.hhcrsp
+        d, s, p = hhcrsp.matrixD, hhcrsp.tStart, hhcrsp.p
+        travel = overtime = idle = late = balance = 0
+        for shift, activities in individual.decode()[1].iteritems():
+            if not activities:
+                continue
+            route = 0
+            for a, b in zip(activities, activities[1:]):
+                route += d[a][b]
+                slack = s[b] - (s[a] + p[a] + d[a][b])
+                if slack > 0:
+                    idle += slack
+                else:
+                    late -= slack
+            work = sum(p[a] for a in activities)
+            span = d[0][activities[0]] + route + work + d[activities[-1]][0]
+            overtime += max(0, span - hhcrsp.u[shift])
+            travel += route
+            balance += len(activities) ** 2
+        return [1.0, travel, overtime, idle, late, balance]
+
+    def predict(self, features):
+        '''
+        Returns the predicted fitness of a feature vector.
+        '''
+        return sum(w * f for w, f in zip(self.weights, features))
+
+    def observe(self, individual, fitness):
+        '''
+        Learns from the true fitness of an individual.  Refits the model
+        every few observations.
+        '''
+        features = self.features(individual)
+        if self.weights is not None:
+            error = (self.predict(features) - fitness) ** 2
+            if self.squaredError is None:
+                self.squaredError = error
+            # Tracks the error on unseen individuals as the search moves on
+            self.squaredError = 0.95 * self.squaredError + 0.05 * error
+        for row in xrange(FEATURES):
+            self.moments[row] += features[row] * fitness
+            for column in xrange(FEATURES):
+                self.normal[row][column] += features[row] * features[column]
+        self.samples += 1
+        if self.samples >= self.warmup and self.samples % 16 == 0:
+            # A small ridge term keeps the system solvable
+            matrix = [[value + (1e-6 if row == column else 0)
+                       for column, value in enumerate(values)]
+                      for row, values in enumerate(self.normal)]
+            self.weights = solve(matrix, self.moments)
+
+    def screen(self, individual):
+        '''
+        Decides if an individual with a ``threshold`` is evaluated.  Returns
+        a tuple of whether the surrogate predicts it to beat its threshold,
+        whether it should be skipped and its predicted fitness, None until
+        the surrogate is fitted.  Only a random ``auditRate`` share of the
+        individuals predicted not to beat it are evaluated.
+        '''
+        if self.weights is None or self.squaredError is None:
+            return True, False, None
+        predicted = self.predict(self.features(individual))
+        better = (predicted + self.margin * math.sqrt(self.squaredError) >
+                  individual.threshold)
+        if better:
+            return True, False, predicted
+        if random.random() < self.auditRate:
+            self.audited += 1
+            return False, False, predicted
+        self.screened += 1
+        return False, True, predicted
+
+    def record(self, predicted, fitness, threshold):
+        '''
+        Records the true outcome of an evaluated individual that had a
+        threshold, given what the surrogate predicted for it.
+        '''
+        self.outcomes[predicted, fitness > threshold] += 1
+
+    def report(self, result):
+        '''
+        Adds the surrogate statistics to a result dictionary.  Precision is
+        the share of individuals predicted to beat their threshold that did.
+        Recall is the share of individuals beating their threshold that were
+        predicted to, where those among the screened out individuals are
+        estimated from the audited ones.
+        '''
+        truePositives = self.outcomes[True, True]
+        predicted = truePositives + self.outcomes[True, False]
+        missed = self.outcomes[False, True]
+        if self.auditRate > 0:
+            missed /= self.auditRate
+        result['surrogateScreened'] = self.screened
+        result['surrogateAudited'] = self.audited
+        result['surrogatePrecision'] = (truePositives / float(predicted)
+                                        if predicted else 0)
+        result['surrogateRecall'] = (truePositives / (truePositives + missed)
+                                     if truePositives + missed else 0)
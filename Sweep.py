@@ -0,0 +1,240 @@
+'''
+This module performs parameter sweeps, running every run of many
+configurations on a single pool of worker processes and writing all results
+into one table.  Each worker receives the problem instances once, when it is
+started, and keeps the initial populations it loads in memory, so jobs
+sharing an instance do not reload either.
+
+The sweep is described by a json file holding either a list of
+configuration overrides or a grid, a dictionary mapping configuration keys
+to lists of values whose every combination is swept.  For example, the
+following command sweeps 2 population sizes and 2 orderings over 3 instances
+with 4 worker processes.
+
+````python Sweep.py problems/hhcrsp_5_4.cfg -g grid.json -w 4 -o sweep.csv````
+
+with ``grid.json`` containing
+``{"popSize": [100, 200], "ordering": ["smallestFirst", "leastLinkedFirst"],
+"problemId": [1, 2, 3]}``.
+'''
+import argparse
+import copy
+import csv
+import itertools
+import multiprocessing
+import random
+import Experiments
+import ResultStore
+import Util
+from HHCRSP import HHCRSP
+
+# Configuration values that select a problem instance
+INSTANCE = ['numActivities', 'numShifts', 'problemId']
+
+# Per worker process state, set up by ``initializeWorker``
+state = {}
+
+
+def expandSettings(sweep):
+    '''
+    Returns the list of override dictionaries described by a sweep, which is
+    either already such a list or a grid of values to combine.
+
+    Parameters:
+
+    - ``sweep``: A list of dictionaries, or a dictionary mapping
+      configuration keys to lists of values.
+    '''
+    if isinstance(sweep, list):
+        return sweep
+    keys = sorted(sweep)
+    return [dict(zip(keys, values))
+            for values in itertools.product(*[sweep[key] for key in keys])]
+
+
+def instanceKey(config):
+    '''
+    Returns the tuple of configuration values identifying the problem
+    instance of a configuration.
+    '''
+    return tuple(config[key] for key in INSTANCE)
+
+
+def initializeWorker(instances):
+    '''
+    Prepares a worker process.
+
+    Parameters:
+
+    - ``instances``: A dictionary mapping ``instanceKey`` values to
+      ``HHCRSP`` objects.
+    '''
+    state['instances'] = instances
+    Experiments.populationCache = {}
+
+
+def sweepJob(task):
+    '''
+    Worker function performing a single run of one configuration with
+    ``Experiments.performRun``.  Returns the setting number, the run number
+    and the result dictionary.
+
+    Parameters:
+
+    - ``task``: A tuple of the setting number, the run number and the
+      configuration, which does not yet contain its instance.
+    '''
+    setting, runNumber, config = task
+    hhcrsp = state['instances'][instanceKey(config)]
+    if hhcrsp.w_dependency != config['w_dependency']:
+        # Instances store their own weight, so swept values replace it
+        hhcrsp = copy.copy(hhcrsp)
+        hhcrsp.w_dependency = config['w_dependency']
+    config = dict(config, hhcrsp=hhcrsp)
+    random.seed(hash((config["seed"], runNumber)))
+    return setting, runNumber, Experiments.performRun(runNumber, config)
+
+
+def writeTable(filename, settings, results):
+    '''
+    Writes one row per run to a csv file, with a column for every swept
+    configuration key followed by every result value that is not a list.
+
+    Parameters:
+
+    - ``filename``: The relative path to the file to be written to.
+    - ``settings``: The list of override dictionaries that were swept.
+    - ``results``: A dictionary mapping setting and run numbers to result
+      dictionaries.
+    '''
+    swept = sorted(set(key for overrides in settings for key in overrides))
+    values = sorted(set(key for result in results.values()
+                        for key, value in result.iteritems()
+                        if not isinstance(value, list)))
+    with open(filename, 'wb') as output:
+        writer = csv.writer(output)
+        writer.writerow(['setting'] + swept + ['run'] + values)
+        for setting, runNumber in sorted(results):
+            result = results[setting, runNumber]
+            writer.writerow([setting] +
+                            [settings[setting].get(key, '') for key in swept] +
+                            [runNumber] +
+                            [result.get(key, '') for key in values])
+
+
+def sweep(config, settings, workers):
+    '''
+    Performs ``runs`` runs of every setting of a sweep on one pool of worker
+    processes.  Returns a dictionary mapping setting and run numbers to
+    result dictionaries.  Runs are seeded from their run number as in
+    ``Experiments.fullRun`` with a result store, and with ``resultStore`` set
+    the runs already stored are not performed again.  If a keyboard
+    interrupt occurs, will return partial information.
+
+    Parameters:
+
+    - ``config``: A dictionary containing the configuration information
+      shared by all settings, as required by ``Experiments.oneRun``.  Runs
+      inside the pool cannot start more processes, so ``islands`` must be 1
+      in every setting and ``linkageWorkers`` is set to 1, even if swept.
+    - ``settings``: A list of dictionaries of values overriding ``config``.
+    - ``workers``: The number of worker processes.
+    '''
+    configs = []
+    for overrides in settings:
+        settingConfig = dict(config)
+        settingConfig.update(overrides)
+        if settingConfig["islands"] > 1:
+            raise Exception("Sweeps cannot use islands")
+        settingConfig['linkageWorkers'] = 1
+        configs.append(settingConfig)
+
+    # Instances are created up front, with the random state main.py uses
+    instances = {}
+    for overrides, setting in zip(settings, configs):
+        if instanceKey(setting) not in instances:
+            random.seed(setting['seed'])
+            instances[instanceKey(setting)] = HHCRSP(setting)
+        if 'w_dependency' not in overrides:
+            # Unless swept, the weight stored with the instance is used
+            hhcrsp = instances[instanceKey(setting)]
+            setting['w_dependency'] = hhcrsp.w_dependency
+
+    results = {}
+    tasks = []
+    store = None
+    if config["resultStore"]:
+        store = ResultStore.ResultStore(config["resultStore"])
+        keys = []
+    for setting, settingConfig in enumerate(configs):
+        if store is not None:
+            hhcrsp = copy.copy(instances[instanceKey(settingConfig)])
+            hhcrsp.w_dependency = settingConfig['w_dependency']
+            keys.append(ResultStore.configKey(dict(settingConfig,
+                                                   hhcrsp=hhcrsp)))
+            completed = store.completed(keys[-1])
+        for runNumber in xrange(settingConfig["runs"]):
+            if store is not None and runNumber in completed:
+                results[setting, runNumber] = completed[runNumber]
+            else:
+                tasks.append((setting, runNumber, settingConfig))
+
+    pool = multiprocessing.Pool(workers, initializeWorker, (instances,))
+    try:
+        for setting, runNumber, result in pool.imap_unordered(sweepJob,
+                                                               tasks):
+            results[setting, runNumber] = result
+            if store is not None:
+                store.put(keys[setting], runNumber, result, configs[setting])
+            if config['verbose']:
+                print 'setting', setting, 'run', runNumber, result['fitness']
+    except KeyboardInterrupt:
+        print "Caught interrupt, exiting"
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
+
+
+description = 'Parameter sweep over LTGA configurations and instances'
+parser = argparse.ArgumentParser(description=description)
+parser.add_argument('configs', metavar='Configuration Files',
+                    type=str, nargs='+',
+                    help='One or more json formatted files containing' +
+                    ' the configuration information shared by all settings')
+
+parser.add_argument('-g', dest='sweep', type=str, required=True,
+                    help='A json formatted file containing a list of' +
+                    ' configuration overrides or a grid of values')
+
+parser.add_argument('-w', dest='workers', type=int,
+                    default=multiprocessing.cpu_count(),
+                    help='The number of worker processes')
+
+parser.add_argument('-o', dest='output_results', type=str,
+                    default='sweep.csv',
+                    help='Specify a csv file to output the results table')
+
+parser.add_argument('-s', dest='result_store', type=str,
+                    help='Specify a result store database.  Runs already' +
+                    ' stored are not performed again')
+
+parser.add_argument('-v', dest='verbose', action='store_true',
+                    help='Include this flag to increase periodic output')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    args.configs.append('experiments/general.cfg')
+    args.configs.append('variants/hhcrsp.cfg')
+    config = Util.loadConfigurations(args.configs)
+    config['verbose'] = args.verbose
+    config.setdefault('problemId', 0)
+    if args.result_store != None:
+        config['resultStore'] = args.result_store
+    settings = expandSettings(Util.loadConfiguration(args.sweep))
+    results = sweep(config, settings, args.workers)
+    writeTable(args.output_results, settings, results)
+    for setting, overrides in enumerate(settings):
+        print overrides, Experiments.combineResults(
+            [result for (number, _), result in results.items()
+             if number == setting])
@@ -0,0 +1,250 @@
+'''
+This module records every genome evaluated or screened out by a surrogate
+during a run along with its fitness, for offline analysis of LTGA
+variants.  Records are buffered in columns and written as chunks by a
+background thread, so the run itself only appends to arrays.
+
+A trace file starts with a header holding the number of genes, followed by
+chunks.  Each chunk holds its number of records, then the column of every
+field as a native array: the ``generation``, ``mask`` and ``parent`` of each
+record as ints, the ``kind`` of its ``fitness`` as a byte, one of ``FULL``,
+``BOUND`` and ``PREDICTED``, the ``fitness`` as a double and the ``genes``
+of all records back to back as doubles.  Records of individuals not created
+by crossover, such as those of restarts, have -1 as ``generation``, ``mask``
+and ``parent``.  For example
+
+````pypy TraceRecorder.py traces/FitnessFunction_HHCRSP_5_4_0/r0.trace````
+
+prints a summary of a trace.
+'''
+import argparse
+import os
+import struct
+import threading
+import Queue
+from array import array
+import FitnessFunction
+
+HEADER = struct.Struct('<8sHI')
+MAGIC = 'LTGATRCE'
+VERSION = 2
+COUNT = struct.Struct('<I')
+# Field name and array type code of every column, in file order
+COLUMNS = [('generation', 'i'), ('mask', 'i'), ('parent', 'i'),
+           ('kind', 'b'), ('fitness', 'd')]
+NO_ORIGIN = (-1, -1, -1)
+# Kinds of fitness values: true fitness, bound of an early exit and
+# surrogate prediction
+FULL, BOUND, PREDICTED = 0, 1, 2
+KINDS = {FULL: float, BOUND: FitnessFunction.FitnessBound,
+         PREDICTED: FitnessFunction.PredictedFitness}
+
+
+class TraceRecorder(object):
+    '''
+    Appends evaluation records to a trace file.  Full chunks are handed to a
+    writer thread, which the run only waits for if it falls several chunks
+    behind.
+    '''
+    def __init__(self, filename, length, chunkSize):
+        '''
+        Parameters:
+
+        - ``filename``: The relative path to the trace file, replaced if it
+          exists.
+        - ``length``: The number of genes of every genome.
+        - ``chunkSize``: The number of records per chunk.
+        '''
+        directory = os.path.dirname(filename)
+        if directory and not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        self.file = open(filename, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, length))
+        self.chunkSize = chunkSize
+        self.records = 0
+        self.chunks = Queue.Queue(maxsize=4)
+        self.writer = threading.Thread(target=self.write)
+        self.writer.daemon = True
+        self.writer.start()
+        self.startChunk()
+
+    def startChunk(self):
+        '''
+        Starts buffering a new chunk.
+        '''
+        self.columns = [array(code) for _, code in COLUMNS]
+        self.genes = array('d')
+        (self.generations, self.masks, self.parents, self.kinds,
+         self.fitnesses) = self.columns
+
+    def record(self, individual, fitness):
+        '''
+        Adds the record of an evaluated individual, using its ``origin``.
+
+        Parameters:
+
+        - ``individual``: The evaluated individual.
+        - ``fitness``: The fitness it was given, which may be a
+          ``FitnessBound`` or a ``PredictedFitness``.
+        '''
+        generation, mask, parent = individual.origin or NO_ORIGIN
+        self.generations.append(generation)
+        self.masks.append(mask)
+        self.parents.append(parent)
+        if isinstance(fitness, FitnessFunction.FitnessBound):
+            self.kinds.append(BOUND)
+        elif isinstance(fitness, FitnessFunction.PredictedFitness):
+            self.kinds.append(PREDICTED)
+        else:
+            self.kinds.append(FULL)
+        self.fitnesses.append(fitness)
+        self.genes.extend(individual.genes)
+        self.records += 1
+        if len(self.fitnesses) >= self.chunkSize:
+            self.flush()
+
+    def flush(self):
+        '''
+        Hands the records buffered so far to the writer thread.
+        '''
+        if len(self.fitnesses):
+            self.chunks.put(self.columns + [self.genes])
+            self.startChunk()
+
+    def write(self):
+        '''
+        Writer thread entry point, writing chunks until it receives None.
+        '''
+        while True:
+            chunk = self.chunks.get()
+            if chunk is None:
+                break
+            self.file.write(COUNT.pack(len(chunk[0])))
+            for column in chunk:
+                self.file.write(column.tostring())
+        self.file.close()
+
+    def close(self):
+        '''
+        Writes the remaining records and waits for the file to be closed.
+        '''
+        self.flush()
+        self.chunks.put(None)
+        self.writer.join()
+
+
+class TraceReader(object):
+    '''
+    Streams the records of a trace file back, a chunk at a time.
+    '''
+    def __init__(self, filename):
+        '''
+        Parameters:
+
+        - ``filename``: The relative path to the trace file.
+        '''
+        self.filename = filename
+        with open(filename, 'rb') as f:
+            magic, version, self.length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise Exception("Not a version %i trace file: %s" % (VERSION,
+                                                                 filename))
+
+    def chunks(self):
+        '''
+        Generates every chunk as a dictionary mapping each field to its
+        array.  ``genes`` holds the genes of all records of the chunk back to
+        back, ``length`` per record.  A chunk cut short, as left by a run
+        that was killed, ends the trace.
+        '''
+        with open(self.filename, 'rb') as f:
+            f.seek(HEADER.size)
+            while True:
+                data = f.read(COUNT.size)
+                if len(data) < COUNT.size:
+                    break
+                count, = COUNT.unpack(data)
+                chunk = {}
+                for name, code in COLUMNS + [('genes', 'd')]:
+                    column = array(code)
+                    try:
+                        column.fromfile(f, count * self.length
+                                        if name == 'genes' else count)
+                    except EOFError:
+                        return
+                    chunk[name] = column
+                yield chunk
+
+    def records(self):
+        '''
+        Generates every record as a tuple of its ``generation``, ``mask``,
+        ``parent``, ``genes`` and ``fitness``, with bounds and predictions
+        given as ``FitnessBound`` and ``PredictedFitness`` objects.
+        '''
+        length = self.length
+        for chunk in self.chunks():
+            for i in xrange(len(chunk['fitness'])):
+                fitness = KINDS[chunk['kind'][i]](chunk['fitness'][i])
+                yield (chunk['generation'][i], chunk['mask'][i],
+                       chunk['parent'][i],
+                       chunk['genes'][i * length:(i + 1) * length], fitness)
+
+
+def recorderFor(runNumber, config):
+    '''
+    Returns the recorder of a run, or None if ``traceFolder`` is empty.
+
+    Parameters:
+
+    - ``runNumber``: What number run this is.
+    - ``config``: A dictionary containing all configuration information.
+      Should include values for:
+
+      - ``traceFolder``: The relative path of the folder holding traces.
+      - ``traceChunkSize``: The number of records per chunk.
+      - All values identifying the instance: ``problem``, ``numActivities``,
+        ``numShifts`` and ``problemId``.
+    '''
+    if not config["traceFolder"]:
+        return None
+    filename = os.path.join(
+        config["traceFolder"],
+        "%(problem)s_%(numActivities)i_%(numShifts)i_%(problemId)i" % config,
+        "r%i.trace" % runNumber)
+    return TraceRecorder(filename, config["hhcrsp"].numActivities,
+                         config["traceChunkSize"])
+
+
+description = 'Summary of an LTGA evaluation trace'
+parser = argparse.ArgumentParser(description=description)
+parser.add_argument('trace', type=str,
+                    help='The trace file to summarize')
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    reader = TraceReader(args.trace)
+    records = bounds = predictions = 0
+    best = None
+    generations = {}
+    for chunk in reader.chunks():
+        records += len(chunk['fitness'])
+        bounds += chunk['kind'].count(BOUND)
+        predictions += chunk['kind'].count(PREDICTED)
+        for generation, fitness, kind in zip(chunk['generation'],
+                                             chunk['fitness'],
+                                             chunk['kind']):
+            if kind == PREDICTED:
+                continue
+            generations[generation] = generations.get(generation, 0) + 1
+            if kind == FULL and (best is None or best < fitness):
+                best = fitness
+    print 'genes per genome:', reader.length
+    print 'records: %i, bounds: %i, predictions: %i, best fitness: %s' % (
+        records, bounds, predictions, best)
+    for generation in sorted(generations):
+        print 'generation %i: %i evaluations' % (generation,
+                                                  generations[generation])
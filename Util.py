@@ -7,6 +7,7 @@ import json
 import random
 import math
 import os
+import socket
 import itertools
 
 
@@ -101,10 +102,19 @@ def saveList(filename, data, fileMethod=open):
       open.
     '''
     directory = os.path.dirname(filename)
-    if not os.path.exists(directory):
-        os.makedirs(directory)
-
-    with fileMethod(filename, 'w') as f:
+    if directory and not os.path.exists(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Another process may have created it in the meantime
+            if not os.path.isdir(directory):
+                raise
+
+    # Written next to the target and renamed, so readers never see a
+    # partially written file even if this process is killed
+    temporary = '%s.%s.%i.tmp' % (filename, socket.gethostname(),
+                                  os.getpid())
+    with fileMethod(temporary, 'w') as f:
         f.write('[' + os.linesep)
         for lineNumber, line in enumerate(data):
             json.dump(line, f)
@@ -112,6 +122,7 @@ def saveList(filename, data, fileMethod=open):
                 f.write(",")
             f.write(os.linesep)
         f.write(']' + os.linesep)
+    os.rename(temporary, filename)
 
 
 # def randomBitString(length):
@@ -135,6 +146,28 @@ def randomGene(config):
     v = hhcrsp.numShifts
     return [random.uniform(1, v + 1 - 1e-10) for _ in range(n)]
 
+def decodeSchedule(genes):
+    '''
+    Decodes a random-key genome into a schedule.  The integer part of each
+    gene is the shift its activity is assigned to and the fractional part is
+    its priority within that shift.  Returns a tuple of the list of shifts of
+    every gene and a dictionary mapping each used shift to the list of its
+    activity ids (gene index + 1) in increasing priority.
+
+    Parameters:
+
+    - ``genes``: The list of random-key genes to decode.
+    '''
+    assignment = [int(gene) for gene in genes]
+    shifts = {}
+    for i, shift in enumerate(assignment):
+        shifts.setdefault(shift, []).append((genes[i] - shift, i + 1))
+    routes = {}
+    for shift, activities in shifts.iteritems():
+        activities.sort(key=lambda x: x[0])
+        routes[shift] = [activity for _, activity in activities]
+    return assignment, routes
+
 def median(data, default=0):
     '''
     Given a data set, return the median value.
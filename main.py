@@ -49,6 +49,18 @@ parser.add_argument('-v', dest='verbose', action='store_true',
 parser.add_argument('-o', dest='output_results', type=str,
                     help='Specify a file to output the results of this run.')
 
+parser.add_argument('-b', dest='bisection', action='store_true',
+                    help='Include this flag to find the minimum population' +
+                    ' size using bisection before performing the runs')
+
+parser.add_argument('-s', dest='result_store', type=str,
+                    help='Specify a result store database.  Runs already' +
+                    ' stored for this configuration are not performed again')
+
+parser.add_argument('-q', dest='job_queue', type=str,
+                    help='Specify a job queue directory shared with other' +
+                    ' workers, which perform the runs together')
+
 if __name__ == '__main__':
     args = parser.parse_args()
     args.configs.append('experiments/general.cfg')
@@ -57,10 +69,16 @@ if __name__ == '__main__':
 
     config['problemId'] = args.verbose
     config['verbose'] = args.verbose
+    if args.result_store != None:
+        config['resultStore'] = args.result_store
+    if args.job_queue != None:
+        config['jobQueue'] = args.job_queue
     random.seed(config['seed'])
 
     config['hhcrsp'] = HHCRSP(config)
     try:
+        if args.bisection:
+            Experiments.bisection(config)
         rawResults = Experiments.fullRun(config)
         combinedResults = Experiments.combineResults(rawResults)
 
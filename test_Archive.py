@@ -0,0 +1,76 @@
+'''
+Behavioural tests of the persistent archive of elite schedules.
+'''
+import random
+import unittest
+import Archive
+import Experiments
+import Fixtures
+from Individual import Individual
+from LTGA import LTGA
+
+
+class TestArchive(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.config = Fixtures.configuration(numActivities=20,
+                                             archiveFolder='archive',
+                                             archiveSize=5)
+        self.evaluator = Fixtures.evaluator(self.config)
+
+    def test_eliteGenes(self):
+        for individual in Fixtures.population(self.config, self.evaluator, 20):
+            genes = Archive.Elite.fromIndividual(individual).genes()
+            self.assertEqual(Individual(genes).decode(), individual.decode())
+
+    def test_roundTrip(self):
+        archive = Archive.archiveFor(self.config)
+        self.assertEqual(archive.elites, [])
+        for individual in Fixtures.population(self.config, self.evaluator, 50):
+            archive.add(individual)
+            self.assertTrue(len(archive.elites) <= 5)
+        archive.save()
+        loaded = Archive.archiveFor(self.config)
+        self.assertEqual(len(loaded.elites), 5)
+        for elite, saved in zip(loaded.elites, archive.elites):
+            self.assertEqual(elite.fitness, saved.fitness)
+            self.assertTrue(elite.sameSchedule(saved))
+        # Archives of other instances are not read
+        self.assertEqual(Archive.Archive(loaded.filename, 21, 5).elites, [])
+
+    def test_best(self):
+        archive = Archive.archiveFor(self.config)
+        for individual in Fixtures.population(self.config, self.evaluator, 50):
+            archive.add(individual)
+        best = archive.best(3)
+        fitnesses = [self.evaluator.evaluate(individual.genes)
+                     for individual in best]
+        self.assertEqual(fitnesses, sorted(
+            [elite.fitness for elite in archive.elites], reverse=True)[:3])
+
+    def test_sameScheduleCompetes(self):
+        archive = Archive.archiveFor(self.config)
+        individual = Fixtures.population(self.config, self.evaluator, 1)[0]
+        archive.add(individual)
+        better = Individual(list(individual.genes), individual.fitness + 1)
+        archive.add(better)
+        archive.add(individual)
+        self.assertEqual([elite.fitness for elite in archive.elites],
+                         [better.fitness])
+
+    def test_injected(self):
+        config = dict(self.config, archiveInject=2)
+        random.seed(0)
+        first = Experiments.oneRun(0, LTGA, self.evaluator, config)
+        self.assertEqual(first['archiveInjected'], 0)
+        archived = Archive.archiveFor(config).best(2)
+        population, info = Experiments.createInitialPopulation(
+            1, self.evaluator, config)
+        self.assertEqual(info['archiveInjected'], 2)
+        self.assertEqual([individual.genes for individual in population[-2:]],
+                         [individual.genes for individual in archived])
+        self.assertEqual(population[-2].fitness, first['fitness'])
+
+
+if __name__ == '__main__':
+    unittest.main()
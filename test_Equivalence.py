@@ -0,0 +1,75 @@
+'''
+Checks the current implementation against the golden outputs of the baseline
+tree, commit e765566.  They were recorded by copying ``Equivalence.py`` into
+a checkout of that commit and running, from an empty folder holding its
+configuration folders and a ``dataset`` folder,
+
+````pypy Equivalence.py record goldens/baseline.json problems/hhcrsp_5_4.cfg
+-i 1 2 -x '{"popSize": 100, "runs": 3, "maximumEvaluations": 2000,
+"maximumFitness": 0, "numActivities": 12, "linkage": "buildTree",
+"linkageWorkers": 1, "neighbourhoodSize": 0}'````
+'''
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import Equivalence
+import Util
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+GOLDEN = os.path.join(ROOT, 'goldens', 'baseline.json')
+CONFIGS = ['problems/hhcrsp_5_4.cfg', 'experiments/general.cfg',
+           'variants/hhcrsp.cfg']
+OVERRIDES = {"popSize": 100, "runs": 3, "maximumEvaluations": 2000,
+             "maximumFitness": 0, "numActivities": 12}
+
+
+class TestGolden(unittest.TestCase):
+    def setUp(self):
+        self.config = Util.loadConfigurations(
+            [os.path.join(ROOT, filename) for filename in CONFIGS])
+        self.config.update(OVERRIDES)
+        self.config['verbose'] = False
+        # Instances are generated into dataset/ of the working directory
+        self.cwd = os.getcwd()
+        self.folder = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.folder, 'dataset'))
+        os.chdir(self.folder)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.folder)
+
+    def test_baseline(self):
+        self.assertTrue(Equivalence.check(GOLDEN, self.config, [1, 2], 1e-9))
+
+    def test_detectsChanges(self):
+        config = dict(self.config, runs=1, maximumEvaluations=300)
+        Equivalence.record('golden.json', config, [1])
+        self.assertTrue(Equivalence.check('golden.json', config, [1], 1e-9))
+        self.assertFalse(Equivalence.check(
+            'golden.json', dict(config, ordering='leastLinkedFirst'), [1],
+            1e-9))
+
+    def test_compare(self):
+        reference = json.loads('{"a": [1, 2.0], "b": "x", "seconds": 1}')
+        self.assertEqual(Equivalence.compare(
+            reference, {"a": [1, 2.0 + 1e-12], "b": "x", "seconds": 2},
+            1e-9, ['seconds']), [])
+        self.assertEqual(len(Equivalence.compare(
+            reference, {"a": [1, 2.1], "b": "y", "seconds": 1}, 1e-9)), 2)
+        # Outputs added since recording are not compared, removed ones are
+        self.assertEqual(Equivalence.compare(
+            reference, dict(reference, new=3), 1e-9), [])
+        self.assertEqual(Equivalence.compare(
+            reference, {"a": [1, 2.0], "seconds": 1}, 1e-9), ['/b missing'])
+
+    def test_instances(self):
+        data = [instanceConfig['hhcrsp'].matrixD for _, instanceConfig
+                in Equivalence.instances(self.config, [1, 2])]
+        self.assertNotEqual(data[0], data[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+'''
+Behavioural tests of the evaluator service and its remote fitness function.
+'''
+import multiprocessing
+import os
+import random
+import signal
+import time
+import unittest
+import EvaluatorClient
+import EvaluatorService
+import Experiments
+import Fixtures
+import FitnessFunction
+import Util
+from LTGA import LTGA
+
+
+class TestProtocol(unittest.TestCase):
+    def test_roundTrip(self):
+        messages = [{'genes': [1.5, 2.25], 'threshold': None},
+                    {'fitness': -3.5, 'bound': True}]
+        data = ''.join(EvaluatorClient.encode(message) for message in messages)
+        # Messages may arrive in pieces
+        self.assertEqual(EvaluatorClient.decode(data[:3]), (None, data[:3]))
+        self.assertEqual(EvaluatorClient.decode(data[:-1])[0], messages[0])
+        message, rest = EvaluatorClient.decode(data)
+        self.assertEqual(message, messages[0])
+        self.assertEqual(EvaluatorClient.decode(rest), (messages[1], ''))
+
+    def test_answer(self):
+        config = Fixtures.configuration()
+        evaluator = Fixtures.evaluator(config)
+        genes = Util.randomGene(config)
+        fitness = evaluator.evaluate(genes)
+        self.assertEqual(EvaluatorService.answer(
+            evaluator, {'genes': genes, 'threshold': None}),
+            {'fitness': fitness, 'bound': False})
+        response = EvaluatorService.answer(
+            evaluator, {'genes': genes, 'threshold': 0})
+        self.assertTrue(response['bound'])
+        self.assertTrue(fitness <= response['fitness'] <= 0)
+        self.assertTrue('error' in EvaluatorService.answer(
+            evaluator, {'genes': genes[:-1] + [100.5], 'threshold': None}))
+
+
+class TestRemote(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.config = Fixtures.configuration(evaluatorAddress='ev.sock',
+                                             evaluatorInFlight=8)
+        self.local = Fixtures.evaluator(self.config)
+        self.service = multiprocessing.Process(
+            target=EvaluatorService.serve,
+            args=('ev.sock', Fixtures.evaluator(self.config), 2))
+        self.service.start()
+        while not os.path.exists('ev.sock'):
+            time.sleep(0.01)
+        self.remote = FitnessFunction.FitnessFunction_Remote(self.config, 0)
+
+    def tearDown(self):
+        self.remote.client.close()
+        # Interrupted, the service stops its workers
+        os.kill(self.service.pid, signal.SIGINT)
+        self.service.join()
+        Fixtures.FolderTestCase.tearDown(self)
+
+    def test_matchesLocal(self):
+        individuals = Fixtures.population(self.config, self.local, 50)
+        for individual in individuals:
+            individual.threshold = individual.fitness + random.uniform(-5, 5)
+        self.assertEqual(self.remote.evaluateBatch(individuals),
+                         [individual.fitness for individual in individuals])
+        remote = self.remote.evaluateBoundedBatch(individuals)
+        local = self.local.evaluateBoundedBatch(individuals)
+        self.assertEqual(remote, local)
+        self.assertEqual([type(fitness) for fitness in remote],
+                         [type(fitness) for fitness in local])
+        self.assertTrue(FitnessFunction.FitnessBound in map(type, remote))
+
+    def test_sameRun(self):
+        # Remote runs send out inFlight offspring at once
+        config = dict(self.config, acceptance='improving', earlyExit=True,
+                      intensification=True)
+        results = []
+        for evaluator, speculation in [(self.remote, 0), (self.local, 8)]:
+            random.seed(0)
+            results.append(Experiments.oneRun(
+                0, LTGA, evaluator, dict(config, speculation=speculation)))
+        for key in ['fitness', 'evaluations', 'traceFitness',
+                    'discardedOffspring']:
+            self.assertEqual(results[0][key], results[1][key])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+'''
+Behavioural tests of the runs performed by ``Experiments``.
+'''
+import random
+import unittest
+import Experiments
+import Fixtures
+from LTGA import LTGA
+
+
+def run(config, runNumber=0, seed=0):
+    '''
+    Returns the result of a seeded ``Experiments.oneRun`` of ``LTGA``.
+    '''
+    random.seed(seed)
+    return Experiments.oneRun(runNumber, LTGA, Fixtures.evaluator(config),
+                              config)
+
+
+class TestEarlyExit(Fixtures.FolderTestCase):
+    def test_sameSearch(self):
+        # Bounds only stand in for offspring that lose to their parent
+        config = Fixtures.configuration(acceptance='improving',
+                                        maximumEvaluations=100000)
+        full = run(config)
+        bounded = run(dict(config, earlyExit=True))
+        self.assertTrue(bounded['partialEvaluations'] > 0)
+        self.assertEqual(bounded['fitness'], full['fitness'])
+        self.assertEqual(bounded['traceFitness'], full['traceFitness'])
+
+    def test_needsImproving(self):
+        config = Fixtures.configuration(earlyExit=True)
+        for crossover in ['recombination', 'synchronousRecombination']:
+            self.assertRaises(Exception, run, dict(config,
+                                                   crossover=crossover))
+            run(dict(config, crossover=crossover, acceptance='improving'))
+
+
+class TestRestarts(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.config = Fixtures.configuration(popSize=8,
+                                             maximumEvaluations=3000,
+                                             maximumFitness=float('inf'))
+
+    def test_restartPopulation(self):
+        population = Fixtures.population(self.config,
+                                         Fixtures.evaluator(self.config), 8)
+        fresh = Experiments.restartPopulation(
+            population, 16, dict(self.config, restarts='fresh'))
+        self.assertEqual(len(fresh), 16)
+        elite = Experiments.restartPopulation(
+            population, 16, dict(self.config, restarts='elite',
+                                 restartMutation=0.1))
+        self.assertEqual(len(elite), 16)
+        self.assertEqual(elite[0].genes, max(population).genes)
+        for individual in elite[1:8]:
+            kept = sum(a == b for a, b in zip(individual.genes,
+                                              elite[0].genes))
+            self.assertTrue(kept >= len(elite[0].genes) // 2)
+
+    def test_useBudget(self):
+        converged = run(self.config)
+        self.assertEqual(converged['restarts'], 0)
+        self.assertTrue(converged['evaluations'] < 3000)
+        for restarts in ['fresh', 'elite']:
+            result = run(dict(self.config, restarts=restarts))
+            self.assertTrue(result['restarts'] > 0)
+            self.assertEqual(result['evaluations'], 3000)
+            self.assertTrue(result['finalPopSize'] > 8)
+            # The first population evolves as without restarts
+            self.assertTrue(result['fitness'] >= converged['fitness'])
+
+
+class TestDeadline(Fixtures.FolderTestCase):
+    def test_anytimeTrace(self):
+        config = Fixtures.configuration(maximumSeconds=0.5,
+                                        maximumEvaluations=10 ** 9,
+                                        maximumFitness=float('inf'),
+                                        restarts='fresh',
+                                        intensification=True)
+        result = run(config)
+        self.assertEqual(result['timedOut'], 1)
+        self.assertTrue(0.5 <= result['seconds'] < 2)
+        seconds = result['traceSeconds']
+        evaluations = result['traceEvaluations']
+        fitness = result['traceFitness']
+        self.assertTrue(len(seconds) == len(evaluations) == len(fitness) > 1)
+        self.assertEqual(seconds, sorted(seconds))
+        self.assertEqual(evaluations, sorted(evaluations))
+        for before, after in zip(fitness, fitness[1:]):
+            self.assertTrue(before < after)
+        self.assertEqual(fitness[-1], result['fitness'])
+        self.assertTrue(seconds[-1] <= result['seconds'])
+
+
+class TestBisection(Fixtures.FolderTestCase):
+    def test_successfulSize(self):
+        config = Fixtures.configuration(maximumFitness=-55,
+                                        maximumEvaluations=2000,
+                                        bisectionRuns=4,
+                                        bisectionFailureLimit=1,
+                                        bisectionWorkers=2)
+        Experiments.bisection(config)
+        self.assertTrue(config['popSize'] >= 2)
+        # Trials are seeded by run and size, so the chosen size succeeds
+        # again
+        failures = [not Experiments.bisectionTrial(
+            (config, runNumber, config['popSize']))
+            for runNumber in xrange(4)]
+        self.assertTrue(sum(failures) <= 1)
+
+    def test_performRun(self):
+        config = Fixtures.configuration(maximumFitness=-55,
+                                        maximumEvaluations=2000,
+                                        bisectionRuns=2,
+                                        bisectionFailureLimit=0,
+                                        bisectionWorkers=1)
+        performed = []
+        performRun = Experiments.performRun
+
+        def counted(runNumber, config):
+            '''
+            Internal function recording the population size of every trial.
+            '''
+            performed.append(config['popSize'])
+            return performRun(runNumber, config)
+
+        Experiments.performRun = counted
+        try:
+            Experiments.bisection(config)
+        finally:
+            Experiments.performRun = performRun
+        # Trials run like fullRun, so islands and multilevel runs too
+        self.assertTrue(config['popSize'] in performed)
+        self.assertRaises(Exception, Experiments.bisection,
+                          dict(config, islands=2, bisectionWorkers=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
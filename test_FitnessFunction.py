@@ -0,0 +1,107 @@
+'''
+Behavioural tests of the ``HHCRSP`` fitness functions.
+'''
+import random
+import unittest
+import Fixtures
+import Util
+from FitnessFunction import FitnessBound
+from Individual import Individual
+
+
+class TestEarlyExit(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(numActivities=20, numShifts=4)
+        self.evaluator = Fixtures.evaluator(self.config)
+
+    def test_boundsAboveFitness(self):
+        bounds = 0
+        for _ in xrange(500):
+            genes = Util.randomGene(self.config)
+            fitness = self.evaluator.evaluate(genes)
+            threshold = fitness + random.uniform(-20, 20)
+            value = self.evaluator.evaluateBounded(genes, threshold)
+            if isinstance(value, FitnessBound):
+                # The true fitness is no higher than the bound
+                bounds += 1
+                self.assertTrue(fitness <= value <= threshold)
+            else:
+                self.assertEqual(value, fitness)
+            self.assertEqual(value, self.evaluator.evaluateIndividual(
+                Individual(genes), threshold))
+        self.assertTrue(bounds > 0)
+
+    def test_noThreshold(self):
+        for _ in xrange(50):
+            genes = Util.randomGene(self.config)
+            value = self.evaluator.evaluateBounded(genes, None)
+            self.assertFalse(isinstance(value, FitnessBound))
+            self.assertEqual(value, self.evaluator.evaluate(genes))
+
+
+class TestRouteMemo(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(numActivities=20, numShifts=4)
+        self.evaluator = Fixtures.evaluator(self.config)
+        self.plain = Fixtures.evaluator(dict(self.config, routeMemoSize=0))
+
+    def test_sameFitness(self):
+        genomes = [Util.randomGene(self.config) for _ in xrange(100)]
+        for genes in genomes + genomes:
+            self.assertEqual(self.evaluator.evaluate(genes),
+                             self.plain.evaluate(genes))
+        self.assertEqual(self.plain.routeMemo, {})
+        result = {}
+        self.evaluator.report(result)
+        routes = sum(len(Util.decodeSchedule(genes)[1]) for genes in genomes)
+        self.assertEqual(result['routeMemoHits'] + result['routeMemoMisses'],
+                         2 * routes)
+        self.assertTrue(result['routeMemoMisses'] <= routes)
+
+    def test_onlyEvaluationsCounted(self):
+        genes = Util.randomGene(self.config)
+        for shift, route in Util.decodeSchedule(genes)[1].iteritems():
+            self.evaluator.route_penalty(shift, route)
+        self.assertEqual((self.evaluator.routeMemoHits,
+                          self.evaluator.routeMemoMisses), (0, 0))
+        self.assertTrue(self.evaluator.routeMemo)
+        # Routes local search looked up are hits of the evaluation
+        self.evaluator.evaluate(genes)
+        self.assertEqual(self.evaluator.routeMemoMisses, 0)
+        self.assertTrue(self.evaluator.routeMemoHits > 0)
+
+    def test_bounded(self):
+        self.evaluator.routeMemoSize = 5
+        for _ in xrange(50):
+            self.evaluator.evaluate(Util.randomGene(self.config))
+            self.assertTrue(len(self.evaluator.routeMemo) <= 5)
+
+    def test_shrinkCaches(self):
+        self.evaluator.evaluate(Util.randomGene(self.config))
+        self.evaluator.shrinkCaches()
+        self.assertEqual(self.evaluator.routeMemo, {})
+        self.assertEqual(self.evaluator.routeMemoSize,
+                         self.config['routeMemoSize'] // 2)
+
+    def test_otherData(self):
+        # Routes of other data must not be answered from the memo
+        evaluator = self.evaluator
+        shifts = Util.decodeSchedule(Util.randomGene(self.config))[1]
+        fitness = evaluator.schedule_fitness(
+            shifts, evaluator.w_x, evaluator.w_y, evaluator.w_z,
+            evaluator.matrixD, evaluator.tStart, evaluator.tEnd, evaluator.p,
+            evaluator.u)
+        memo = dict(evaluator.routeMemo)
+        doubled = [[2 * x for x in row] for row in evaluator.matrixD]
+        other = evaluator.schedule_fitness(
+            shifts, evaluator.w_x, evaluator.w_y, evaluator.w_z, doubled,
+            evaluator.tStart, evaluator.tEnd, evaluator.p, evaluator.u)
+        self.assertNotEqual(other, fitness)
+        self.assertEqual(evaluator.routeMemo, memo)
+        self.assertEqual(evaluator.routeMemoHits, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+'''
+Behavioural tests of the random-key local search.
+'''
+import random
+import time
+import unittest
+import Fixtures
+import HillClimber
+import Util
+
+
+class TestRandomKeyHillClimber(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(numActivities=15, numShifts=3)
+        self.evaluator = Fixtures.evaluator(self.config)
+
+    def test_penaltiesAddUp(self):
+        # Moves are scored by the penalties of the shifts they change
+        for _ in xrange(20):
+            genes = Util.randomGene(self.config)
+            routes = Util.decodeSchedule(genes)[1]
+            total = sum(self.evaluator.route_penalty(shift, route)
+                        for shift, route in routes.iteritems())
+            self.assertAlmostEqual(-total, self.evaluator.evaluate(genes), 9)
+
+    def test_improves(self):
+        for _ in xrange(10):
+            genes = Util.randomGene(self.config)
+            before = self.evaluator.evaluate(genes)
+            evaluations, iterations = HillClimber.randomKeyHillClimber(
+                genes, self.evaluator, 300)
+            after = self.evaluator.evaluate(genes)
+            self.assertTrue(evaluations <= 300)
+            self.assertTrue(after >= before)
+            if iterations:
+                self.assertTrue(after > before)
+
+    def test_localOptimum(self):
+        genes = Util.randomGene(self.config)
+        iterations = True
+        while iterations:
+            evaluations, iterations = HillClimber.randomKeyHillClimber(
+                genes, self.evaluator, 10 ** 6)
+        self.assertTrue(evaluations > 0)
+        climbed = list(genes)
+        HillClimber.randomKeyHillClimber(climbed, self.evaluator, 10 ** 6)
+        self.assertEqual(climbed, genes)
+
+    def test_deadline(self):
+        genes = Util.randomGene(self.config)
+        climbed = list(genes)
+        self.assertEqual(HillClimber.randomKeyHillClimber(
+            climbed, self.evaluator, 10 ** 6, time.time() - 1), (0, 0))
+        self.assertEqual(climbed, genes)
+        evaluations, _ = HillClimber.randomKeyHillClimber(
+            climbed, self.evaluator, 10 ** 6, time.time() + 60)
+        self.assertTrue(evaluations > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
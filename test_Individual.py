@@ -0,0 +1,43 @@
+'''
+Behavioural tests of the schedule cached by ``Individual``.
+'''
+import random
+import unittest
+import Fixtures
+import Util
+from Individual import Individual
+
+
+class TestDecodeCache(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration()
+
+    def test_decode(self):
+        genes = Util.randomGene(self.config)
+        individual = Individual(list(genes))
+        schedule = individual.decode()
+        self.assertEqual(schedule, Util.decodeSchedule(genes))
+        self.assertTrue(individual.decode() is schedule)
+
+    def test_setGene(self):
+        individual = Individual(Util.randomGene(self.config))
+        individual.decode()
+        for _ in xrange(20):
+            index = random.randrange(len(individual.genes))
+            individual.setGene(index, random.uniform(1, 3.99))
+            self.assertEqual(individual.decode(),
+                             Util.decodeSchedule(individual.genes))
+
+    def test_sharedByFitness(self):
+        # Evaluating from the cached schedule gives the fitness of the genes
+        evaluator = Fixtures.evaluator(self.config)
+        for _ in xrange(20):
+            individual = Individual(Util.randomGene(self.config))
+            individual.decode()
+            self.assertEqual(evaluator.evaluateIndividual(individual),
+                             evaluator.evaluate(individual.genes))
+
+
+if __name__ == '__main__':
+    unittest.main()
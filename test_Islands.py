@@ -0,0 +1,49 @@
+'''
+Behavioural tests of the island model.
+'''
+import Queue
+import unittest
+import Fixtures
+import Islands
+from Individual import Individual
+
+
+class TestMigration(unittest.TestCase):
+    def setUp(self):
+        self.config = Fixtures.configuration(migrants=2)
+        self.inbound = Queue.Queue()
+        self.outbound = Queue.Queue()
+        self.island = Islands.IslandLTGA(0, self.inbound, self.outbound, None,
+                                         (None, None), self.config)
+        self.island.individuals = [Individual([float(i)], -i)
+                                   for i in xrange(5)]
+
+    def test_migrate(self):
+        self.inbound.put([([9.0], -0.5), ([8.0], -10)])
+        self.inbound.put([([7.0], -2.5)])
+        self.island.migrate()
+        # The two best are sent on
+        self.assertEqual(sorted(self.outbound.get_nowait()),
+                         [([0.0], 0), ([1.0], -1)])
+        # Immigrants only replace worse individuals
+        self.assertEqual(sorted(individual.fitness for individual in
+                                self.island.individuals),
+                         [-2.5, -2, -1, -0.5, 0])
+
+
+class TestIslandRun(Fixtures.FolderTestCase):
+    def test_sharedBudget(self):
+        config = Fixtures.configuration(islands=2, migrationInterval=1,
+                                        maximumEvaluations=1500,
+                                        maximumFitness=float('inf'))
+        result = Islands.islandRun(0, config)
+        self.assertEqual(result['evaluations'],
+                         sum(result['islandEvaluations']))
+        # Islands only report every few evaluations
+        self.assertTrue(result['evaluations'] <= 1500 + 2 * 16 +
+                        2 * config['popSize'])
+        self.assertTrue(all(result['islandEvaluations']))
+
+
+if __name__ == '__main__':
+    unittest.main()
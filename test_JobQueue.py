@@ -0,0 +1,72 @@
+'''
+Behavioural tests of the job queue over a shared file system.
+'''
+import os
+import random
+import time
+import unittest
+import Experiments
+import Fixtures
+import JobQueue
+import ResultStore
+from HHCRSP import HHCRSP
+
+
+class TestJobQueue(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.config = Fixtures.configuration(runs=2, jobQueue='queue',
+                                             heartbeatInterval=0.01)
+        # Jobs load their instance like main.py
+        random.seed(self.config['seed'])
+        self.config['hhcrsp'] = HHCRSP(self.config)
+
+    def test_lifecycle(self):
+        queue = JobQueue.JobQueue('queue', 1, 60)
+        jobs = queue.submit(self.config, [0])
+        self.assertEqual(queue.submit(self.config, [0]), jobs)
+        self.assertEqual(os.listdir(os.path.join('queue', JobQueue.PENDING)),
+                         jobs)
+        claimed = queue.claim()
+        self.assertEqual(queue.jobName(os.path.basename(claimed)), jobs[0])
+        self.assertTrue(queue.exists(jobs[0]))
+        self.assertEqual(queue.claim(), None)
+        self.assertEqual(queue.result(jobs[0]), None)
+        queue.perform(claimed)
+        self.assertTrue('fitness' in queue.result(jobs[0]))
+        self.assertEqual(os.listdir(os.path.join('queue', JobQueue.CLAIMED)),
+                         [])
+
+    def test_staleClaim(self):
+        queue = JobQueue.JobQueue('queue', 1, 0)
+        queue.submit(self.config, [0])
+        claimed = queue.claim()
+        other = JobQueue.JobQueue('queue', 1, 0)
+        other.worker = 'other'
+        # Staleness is judged from when the claim was first seen
+        self.assertEqual(other.claim(), None)
+        time.sleep(0.01)
+        reclaimed = other.claim()
+        self.assertEqual(queue.jobName(os.path.basename(reclaimed)),
+                         queue.jobName(os.path.basename(claimed)))
+        self.assertTrue(reclaimed.endswith('@other'))
+
+    def test_matchesFullRun(self):
+        store = ResultStore.ResultStore('results.db')
+        results = JobQueue.queueRun(self.config, store)
+        expected = Experiments.fullRun(dict(self.config, jobQueue='',
+                                            resultStore='expected.db'))
+        self.assertEqual([result['fitness'] for result in results],
+                         [result['fitness'] for result in expected])
+        key = ResultStore.configKey(self.config)
+        self.assertEqual(sorted(store.completed(key)), [0, 1])
+        # Stored runs are not submitted again
+        for name in os.listdir(os.path.join('queue', JobQueue.DONE)):
+            os.remove(os.path.join('queue', JobQueue.DONE, name))
+        self.assertEqual(len(JobQueue.queueRun(self.config, store)), 2)
+        self.assertEqual(os.listdir(os.path.join('queue', JobQueue.PENDING)),
+                         [])
+
+
+if __name__ == '__main__':
+    unittest.main()
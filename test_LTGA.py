@@ -0,0 +1,412 @@
+'''
+Behavioural tests of the linkage models and crossovers of ``LTGA``.
+'''
+import math
+import random
+import time
+import unittest
+from collections import Counter, defaultdict
+from itertools import combinations
+import Experiments
+import Fixtures
+from FitnessFunction import PredictedFitness
+from Individual import Individual
+from LTGA import LTGA
+
+
+def optimizer(config, size=30, seed=0, optimizerClass=LTGA):
+    '''
+    Returns an ``LTGA`` object, or one of ``optimizerClass``, holding a
+    random evaluated population, ready to build linkage models.
+    '''
+    ltga = optimizerClass()
+    ltga.hhcrsp = config['hhcrsp']
+    ltga.neighbourhoodSize = config["neighbourhoodSize"]
+    ltga.individuals = Fixtures.population(config, Fixtures.evaluator(config),
+                                           size, seed)
+    return ltga
+
+
+class TestSparseTree(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(neighbourhoodSize=3)
+        self.ltga = optimizer(self.config)
+        self.length = self.config['numActivities']
+
+    def assertTree(self, subtrees):
+        '''
+        Checks the subtrees form a linkage tree over every gene without its
+        root: every gene alone, then every merge of two disjoint clusters.
+        '''
+        self.assertEqual(len(subtrees), 2 * self.length - 2)
+        self.assertEqual(sorted(subtrees[:self.length]),
+                         [(i,) for i in xrange(self.length)])
+        clusters = set(subtrees[:self.length])
+        for subtree in subtrees[self.length:]:
+            parts = [c for c in clusters if set(c) <= set(subtree)]
+            self.assertEqual(sorted(sum(parts, ())), sorted(subtree))
+            self.assertEqual(len(parts), 2)
+            clusters.difference_update(parts)
+            clusters.add(subtree)
+        self.assertEqual(len(clusters), 2)
+
+    def test_sparsePairs(self):
+        pairs = self.ltga.sparsePairs()
+        neighbourhoods = self.config['hhcrsp'].getCandidateNeighbourhoods(3)
+        for a, b in pairs:
+            self.assertTrue(a < b)
+            self.assertTrue(b in neighbourhoods[a] or a in neighbourhoods[b])
+        self.ltga.neighbourhoodSize = self.length - 1
+        self.assertEqual(self.ltga.sparsePairs(),
+                         list(combinations(xrange(self.length), 2)))
+
+    def test_buildSparseTree(self):
+        for name in ['clusterDependencyDistance', 'pairwiseMutualInformation']:
+            distance = getattr(self.ltga, name)
+            self.assertTree(self.ltga.buildSparseTree(distance, {}))
+
+    def test_disconnected(self):
+        # Without edges, or with few, unlinked clusters are joined at random
+        for size in [0, 1]:
+            self.ltga.neighbourhoodSize = size
+            self.assertTree(self.ltga.buildSparseTree(
+                self.ltga.clusterDependencyDistance, {}))
+
+    def test_sparseDistances(self):
+        # Only the distances of neighbouring pairs are computed
+        lookup = {}
+        self.ltga.buildSparseTree(self.ltga.clusterDependencyDistance, lookup)
+        pairs = set(self.ltga.sparsePairs())
+        for key in lookup:
+            (a,), (b,) = key
+            self.assertTrue((min(a, b), max(a, b)) in pairs)
+
+
+def evolve(ltga, config, evaluator, steps, check=None):
+    '''
+    Drives ``ltga.generate`` from its population for up to ``steps``
+    requests, evaluating every offspring sent out, alone or in a list.
+    Calls ``check`` with every request before answering it.  A
+    ``speculation`` of 0 stands for 1, as for ``FitnessFunction_HHCRSP`` in
+    ``Experiments.oneRun``.
+    '''
+    config = dict(config, speculation=config["speculation"] or 1)
+    generator = ltga.generate(ltga.individuals, config)
+    request = generator.next()
+    for _ in xrange(steps):
+        if check is not None:
+            check(request)
+        if isinstance(request, list):
+            answer = [evaluator.evaluate(child.genes) for child in request]
+        else:
+            answer = evaluator.evaluate(request.genes)
+        try:
+            request = generator.send(answer)
+        except StopIteration:
+            break
+    generator.close()
+
+
+def entropy(values):
+    '''
+    Returns the entropy of the distribution of a list of values.
+    '''
+    total = float(len(values))
+    return -sum(count / total * math.log(count / total, 2)
+                for count in Counter(values).itervalues())
+
+
+class TestMutualInformation(unittest.TestCase):
+    def setUp(self):
+        self.config = Fixtures.configuration()
+        self.ltga = optimizer(self.config, size=40)
+
+    def test_matchesCounts(self):
+        shifts = [individual.decode()[0] for individual in
+                  self.ltga.individuals]
+        lookup = {}
+        for a, b in combinations(xrange(self.config['numActivities']), 2):
+            column = [genes[a] for genes in shifts]
+            other = [genes[b] for genes in shifts]
+            joint = entropy(zip(column, other))
+            expected = ((entropy(column) + entropy(other) - joint) / joint
+                        if joint > 0 else 0.0)
+            value = self.ltga.pairwiseMutualInformation((a,), (b,), lookup)
+            self.assertAlmostEqual(value, expected, 9)
+            self.assertEqual(value, self.ltga.pairwiseMutualInformation(
+                (b,), (a,), lookup))
+            self.assertTrue(-1e-9 <= value <= 1 + 1e-9)
+
+    def test_clusterAverage(self):
+        lookup = {}
+        c1, c2 = (0, 3), (5, 7, 8)
+        expected = sum(self.ltga.pairwiseMutualInformation((a,), (b,), {})
+                       for a in c1 for b in c2) / 6.0
+        self.assertAlmostEqual(
+            self.ltga.pairwiseMutualInformation(c1, c2, lookup), expected, 12)
+        self.assertTrue((c2, c1) in lookup)
+
+
+class TestSynchronousRecombination(unittest.TestCase):
+    def test_batchesNeverWorsen(self):
+        random.seed(1)
+        config = Fixtures.configuration(crossover='synchronousRecombination',
+                                        acceptance='improving')
+        evaluator = Fixtures.evaluator(config)
+        ltga = optimizer(config)
+        history = [sorted(individual.fitness for individual in
+                          ltga.individuals)]
+
+        def check(request):
+            '''
+            Internal function checking every request is a batch of one mask
+            and that no individual got worse since the last one.
+            '''
+            self.assertTrue(isinstance(request, list))
+            self.assertEqual(len(set(child.origin[:2] for child in request)),
+                             1)
+            current = sorted(individual.fitness for individual in
+                             ltga.individuals)
+            self.assertEqual(len(current), len(history[-1]))
+            for before, after in zip(history[-1], current):
+                self.assertTrue(before <= after)
+            history.append(current)
+
+        evolve(ltga, config, evaluator, 200, check)
+        self.assertTrue(len(history) > 10)
+        self.assertTrue(history[-1][-1] > history[0][-1])
+
+    def test_baselineAcceptance(self):
+        random.seed(1)
+        config = Fixtures.configuration(crossover='synchronousRecombination')
+        evaluator = Fixtures.evaluator(config)
+        ltga = optimizer(config)
+        previous = []
+        replaced = []
+
+        def check(request):
+            '''
+            Internal function checking that only offspring worse than their
+            parent, whose fitness is their threshold, replaced it.
+            '''
+            population = set(map(id, ltga.individuals))
+            for child in previous:
+                if id(child) in population:
+                    self.assertTrue(child.fitness < child.threshold)
+                    replaced.append(child)
+            previous[:] = request
+
+        evolve(ltga, config, evaluator, 50, check)
+        self.assertTrue(replaced)
+
+
+class TestSameSchedule(unittest.TestCase):
+    def test_matchesDecoding(self):
+        random.seed(3)
+        config = Fixtures.configuration()
+        ltga = optimizer(config)
+        length = config['numActivities']
+        same = 0
+        for _ in xrange(2000):
+            parent, donor = random.sample(ltga.individuals, 2)
+            if random.random() < 0.3:
+                # Shifting every priority a little keeps the schedule
+                donor = Individual([gene + 1e-6 for gene in parent.genes])
+            mask = random.sample(xrange(length), random.randint(1, 3))
+            child = ltga.applyMask(parent, donor, mask)
+            expected = child.decode()[1] == parent.decode()[1]
+            self.assertEqual(ltga.sameSchedule(parent, child, mask), expected)
+            same += expected
+        self.assertTrue(0 < same < 2000)
+
+
+class CountingLTGA(LTGA):
+    '''
+    Counts the generations that end.
+    '''
+    generations = 0
+
+    def endGeneration(self):
+        self.generations += 1
+        return False
+
+
+class TestEmptyGeneration(unittest.TestCase):
+    def test_allSkipped(self):
+        config = Fixtures.configuration(speculation=1)
+        ltga = optimizer(config, optimizerClass=CountingLTGA)
+        # Different genes, all decoding to the same schedule
+        genes = ltga.individuals[0].genes
+        ltga.individuals = [
+            Individual([x + 1e-9 * k for x in genes], -1.0) for k in xrange(5)]
+        generator = ltga.generate(ltga.individuals, config)
+        self.assertRaises(StopIteration, generator.next)
+        self.assertEqual(ltga.generations, 1)
+        self.assertTrue(ltga.skippedOffspring > 0)
+
+
+class PruneFirstLTGA(CountingLTGA):
+    '''
+    Prunes every offspring of the first generation.
+    '''
+    def pruneMask(self, mask):
+        if self.generations:
+            return False
+        self.prunedOffspring += 1
+        return True
+
+
+class TestPrunedGeneration(unittest.TestCase):
+    def test_allPruned(self):
+        config = Fixtures.configuration(speculation=1, maskPruning=True)
+        ltga = optimizer(config, size=10, optimizerClass=PruneFirstLTGA)
+        generator = ltga.generate(ltga.individuals, config)
+        # The empty generation is not taken for convergence
+        request = generator.next()
+        self.assertEqual(ltga.generations, 1)
+        self.assertEqual(request.origin[0], 1)
+        self.assertEqual(ltga.prunedOffspring,
+                         10 * (2 * config['numActivities'] - 2))
+        generator.close()
+
+
+class TestSpeculation(unittest.TestCase):
+    def generation(self, speculation, acceptance):
+        '''
+        Returns the genes of the population after one generation of
+        ``recombination`` sending out ``speculation`` offspring at once, and
+        the number of offspring it discarded.
+        '''
+        config = Fixtures.configuration()
+        evaluator = Fixtures.evaluator(config)
+        ltga = optimizer(config)
+        ltga.acceptance = acceptance
+        ltga.speculation = speculation
+        ltga.maskPruning = False
+        ltga.currentGeneration = 0
+        ltga.skippedOffspring = ltga.discardedOffspring = 0
+        random.seed(5)
+        masks = ltga.smallestFirst(ltga.buildTree(
+            ltga.clusterDependencyDistance, {}))
+        crossover = ltga.recombination(masks)
+        try:
+            request = crossover.next()
+            while True:
+                if speculation == 1:
+                    answer = evaluator.evaluate(request.genes)
+                else:
+                    answer = [evaluator.evaluate(child.genes)
+                              for child in request]
+                request = crossover.send(answer)
+        except StopIteration:
+            pass
+        return ([list(individual.genes) for individual in ltga.individuals],
+                ltga.discardedOffspring)
+
+    def test_rejectsZero(self):
+        config = Fixtures.configuration(speculation=0)
+        ltga = optimizer(config)
+        generator = ltga.generate(ltga.individuals, config)
+        self.assertRaises(Exception, generator.next)
+
+    def test_sameAsOneAtATime(self):
+        for acceptance in ['baseline', 'improving']:
+            sequential, discarded = self.generation(1, acceptance)
+            self.assertEqual(discarded, 0)
+            for speculation in [3, 8]:
+                speculative, discarded = self.generation(speculation,
+                                                         acceptance)
+                self.assertEqual(speculative, sequential)
+                # Only replaced parents that later masks build on discard
+                self.assertEqual(discarded > 0, acceptance == 'improving')
+
+
+class TestMaskPruning(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        config = Fixtures.configuration()
+        self.ltga = optimizer(config, 2)
+        self.ltga.maskPruning = True
+        self.ltga.pruningThreshold = 0.25
+        self.ltga.pruningFloor = 0
+        self.ltga.pruningWarmup = 5
+        self.ltga.prunedOffspring = 0
+        self.ltga.maskTrials = defaultdict(float)
+        self.ltga.maskGains = defaultdict(float)
+        self.parent = Individual([1.5], -10)
+
+    def record(self, mask, fitnesses):
+        '''
+        Records offspring of ``mask`` with the given fitnesses.
+        '''
+        for fitness in fitnesses:
+            self.ltga.recordMask(mask, self.parent, Individual([1.5], fitness))
+
+    def test_prunesUnproductive(self):
+        self.record([0, 1], [-12, -5] * 5)
+        self.record([0, 1, 2, 3], [-11] * 4)
+        # Sizes are only judged after their warmup
+        self.assertFalse(self.ltga.pruneMask([0, 1, 2, 3]))
+        self.record([0, 1, 2, 3], [-11])
+        for _ in xrange(20):
+            self.assertTrue(self.ltga.pruneMask([0, 1, 2, 3]))
+            self.assertFalse(self.ltga.pruneMask([0, 1]))
+        self.assertEqual(self.ltga.prunedOffspring, 20)
+        # The floor lets pruned sizes recover
+        self.ltga.pruningFloor = 1
+        self.assertFalse(self.ltga.pruneMask([0, 1, 2, 3]))
+
+    def test_disabled(self):
+        self.ltga.maskPruning = False
+        self.record([0, 1], [-5] * 10)
+        self.record([0, 1, 2, 3], [-11] * 10)
+        self.assertEqual(self.ltga.maskTrials, {})
+        self.assertFalse(self.ltga.pruneMask([0, 1, 2, 3]))
+
+    def test_predictedNotRecorded(self):
+        self.record([0, 1], [PredictedFitness(-5)] * 10)
+        self.assertEqual(self.ltga.maskTrials[2], 0)
+
+
+class TestPrunedRun(Fixtures.FolderTestCase):
+    def test_bestIsTrue(self):
+        config = Fixtures.configuration(maskPruning=True, maskPruningFloor=0,
+                                        maskPruningWarmup=5,
+                                        maximumEvaluations=3000)
+        evaluator = Fixtures.evaluator(config)
+        final = []
+        result = Experiments.oneRun(0, LTGA, evaluator, config, None, final)
+        self.assertTrue(result['prunedOffspring'] > 0)
+        self.assertEqual(evaluator.evaluate(final[0].genes), result['fitness'])
+
+
+class TimedLTGA(LTGA):
+    '''
+    Records when every linkage model is built.
+    '''
+    def buildTree(self, distance, lookup):
+        self.built.append(time.time())
+        return LTGA.buildTree(self, distance, lookup)
+
+
+class TestDeadline(unittest.TestCase):
+    def test_noLinkageAfterDeadline(self):
+        config = Fixtures.configuration(speculation=1)
+        evaluator = Fixtures.evaluator(config)
+        ltga = optimizer(config, optimizerClass=TimedLTGA)
+        ltga.built = []
+        ltga.deadline = time.time() + 0.2
+        generator = ltga.generate(ltga.individuals, config)
+        try:
+            request = generator.next()
+            while True:
+                request = generator.send(evaluator.evaluate(request.genes))
+        except StopIteration:
+            pass
+        self.assertTrue(time.time() >= ltga.deadline)
+        self.assertTrue(len(ltga.built) > 1)
+        self.assertTrue(ltga.built[-1] < ltga.deadline)
+
+if __name__ == '__main__':
+    unittest.main()
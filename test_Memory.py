@@ -0,0 +1,100 @@
+'''
+Behavioural tests of the bounded-memory run mode.
+'''
+import random
+import unittest
+import Experiments
+import Fixtures
+import Memory
+from FitnessFunction import FitnessBound
+from LTGA import LTGA
+
+
+class TestCompactLookup(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.values = {random.getrandbits(60) - 2 ** 59: -random.random()
+                       for _ in xrange(200)}
+        self.bounds = {random.getrandbits(60): FitnessBound(-random.random())
+                       for _ in xrange(20)}
+        self.lookup = Memory.CompactLookup(self.values)
+        self.lookup.update(self.bounds)
+
+    def test_compact(self):
+        protected = set(random.sample(self.values, 5) + self.bounds.keys()[:3])
+        self.assertEqual(self.lookup.compact(protected), 17)
+        self.assertEqual(len(self.lookup), 8)
+        self.assertEqual(self.lookup.compacted(), 195)
+        for key, fitness in self.values.iteritems():
+            self.assertTrue(key in self.lookup)
+            self.assertEqual(self.lookup[key], fitness)
+            self.assertEqual(self.lookup.get(key), fitness)
+        for key in self.bounds.keys()[3:]:
+            self.assertFalse(key in self.lookup)
+            self.assertEqual(self.lookup.get(key, 1), 1)
+        for key in self.bounds.keys()[:3]:
+            self.assertTrue(isinstance(self.lookup[key], FitnessBound))
+        self.assertRaises(KeyError, self.lookup.__getitem__, 1)
+
+    def test_compactAgain(self):
+        self.lookup.compact(set())
+        self.lookup[1] = -0.5
+        self.lookup.compact(set())
+        self.assertEqual(list(self.lookup.compactKeys),
+                         sorted(self.values.keys() + [1]))
+        self.assertEqual(self.lookup[1], -0.5)
+        self.assertEqual(self.lookup.thin(), 100)
+        self.assertEqual(self.lookup.compacted(), 101)
+        kept = list(self.lookup.compactKeys)
+        self.assertEqual(kept, sorted(kept))
+        for key in kept:
+            self.assertTrue(key in self.lookup)
+
+
+class TestMemoryGuard(unittest.TestCase):
+    def test_shrink(self):
+        config = Fixtures.configuration()
+        individuals = Fixtures.population(config, Fixtures.evaluator(config),
+                                          10)
+        hashes = [hash(individual) for individual in individuals]
+        lookup = Memory.CompactLookup(zip(hashes, [individual.fitness for
+                                                   individual in individuals]))
+        lookup.update((key, -1.0) for key in xrange(100))
+        guard = Memory.MemoryGuard(1)
+        calls = []
+        guard.register(lambda: calls.append(1))
+        guard.shrink(lookup, individuals)
+        self.assertEqual(calls, [1])
+        # Compact individuals keep their hash, so their entries stay found
+        self.assertEqual([hash(individual) for individual in individuals],
+                         hashes)
+        self.assertEqual(len(lookup), 10)
+        self.assertEqual(lookup.compacted(), 100)
+        for individual in individuals:
+            self.assertEqual(lookup[hash(individual)], individual.fitness)
+        guard.shrink(lookup, individuals)
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(guard.evictions, 50)
+        result = {}
+        guard.report(result)
+        self.assertEqual(result['memoryShrinks'], 2)
+
+
+class TestBoundedRun(Fixtures.FolderTestCase):
+    def test_ceiling(self):
+        config = Fixtures.configuration(memoryLimitMB=1,
+                                        maximumEvaluations=3000,
+                                        maximumFitness=float('inf'),
+                                        restarts='fresh')
+        random.seed(0)
+        evaluator = Fixtures.evaluator(config)
+        result = Experiments.oneRun(0, LTGA, evaluator, config)
+        self.assertTrue(result['memoryShrinks'] > 0)
+        # The evaluator's route memo shrinks along with the lookup
+        self.assertTrue(evaluator.routeMemoSize < config['routeMemoSize'])
+        self.assertTrue(result['lookupCompacted'] > 0)
+        self.assertEqual(result['evaluations'], 3000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+'''
+Behavioural tests of the multilevel solve mode.
+'''
+import random
+import unittest
+import Archive
+import Experiments
+import Fixtures
+import Multilevel
+import Util
+from Individual import Individual
+
+
+class TestCoarsening(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(numActivities=40,
+                                             multilevelCoarsest=10)
+        self.hhcrsp = self.config['hhcrsp']
+
+    def test_coarsen(self):
+        groups = Multilevel.coarsen(self.hhcrsp, 8)
+        self.assertEqual(sorted(sum(groups, [])), range(1, 41))
+        self.assertTrue(20 <= len(groups) < 40)
+        for group in groups:
+            self.assertTrue(1 <= len(group) <= 2)
+            self.assertEqual(group, sorted(group,
+                                           key=lambda a: self.hhcrsp.tStart[a]))
+        coarse = Multilevel.coarseInstance(self.hhcrsp, groups)
+        self.assertEqual(coarse.numActivities, len(groups))
+        self.assertEqual(coarse.tStart[1:], [self.hhcrsp.tStart[group[0]]
+                                             for group in groups])
+
+    def test_projectRestrict(self):
+        groups = Multilevel.coarsen(self.hhcrsp, 8)
+        coarse = dict(self.config, hhcrsp=Multilevel.coarseInstance(
+            self.hhcrsp, groups))
+        for _ in xrange(20):
+            individual = Individual(Util.randomGene(coarse))
+            genes = Multilevel.project(individual, groups, 40)
+            routes = Individual(genes).decode()[1]
+            for shift, route in individual.decode()[1].iteritems():
+                self.assertEqual(routes[shift], [a for activity in route
+                                                 for a in groups[activity - 1]])
+            restricted = Individual(Multilevel.restrict(genes, groups))
+            self.assertEqual(restricted.decode(), individual.decode())
+
+    def test_levels(self):
+        hierarchy = Multilevel.levels(self.config)
+        sizes = [hhcrsp.numActivities for hhcrsp, _ in hierarchy]
+        self.assertEqual(sizes[0], 40)
+        self.assertEqual(sizes, sorted(sizes, reverse=True))
+        self.assertTrue(sizes[-1] <= 10)
+        self.assertEqual(hierarchy[-1][1], None)
+        for (hhcrsp, groups), (coarser, _) in zip(hierarchy, hierarchy[1:]):
+            self.assertEqual(len(groups), coarser.numActivities)
+
+
+class TestMultilevelRun(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.config = Fixtures.configuration(
+            numActivities=40, multilevelCoarsest=10, maximumEvaluations=3000,
+            maximumFitness=float('inf'), archiveFolder='archive',
+            archiveInject=3)
+
+    def test_run(self):
+        result = Experiments.performRun(0, self.config)
+        sizes = result['multilevelSizes']
+        self.assertEqual(sizes[-1], 40)
+        self.assertEqual(sizes, sorted(sizes))
+        self.assertEqual(len(result['multilevelFitness']), len(sizes))
+        self.assertTrue(result['evaluations'] <= 3000)
+        # The trace continues the evaluations of the coarser levels
+        share = 3000 // len(sizes)
+        self.assertTrue(result['traceEvaluations'][0] > share)
+        self.assertEqual(result['traceEvaluations'],
+                         sorted(result['traceEvaluations']))
+        self.assertEqual(result['archiveInjected'], 0)
+        # Archived schedules of the original instance seed the next run
+        archived = len(Archive.archiveFor(self.config).elites)
+        self.assertTrue(archived > 0)
+        self.assertEqual(Experiments.performRun(1, self.config)
+                         ['archiveInjected'], min(archived, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+'''
+Behavioural tests of the pool computing linkage distances in parallel.
+'''
+import random
+import unittest
+from itertools import combinations
+import Fixtures
+from ParallelLinkage import ParallelLinkage
+from test_LTGA import evolve, optimizer
+
+
+class TestParallelLinkage(unittest.TestCase):
+    def setUp(self):
+        self.config = Fixtures.configuration()
+        self.pairs = list(combinations(xrange(self.config['numActivities']),
+                                       2))
+
+    def test_matchesSerial(self):
+        ltga = optimizer(self.config)
+        later = optimizer(self.config, seed=1).individuals
+        for name in ['clusterDependencyDistance', 'pairwiseMutualInformation']:
+            parallel = ParallelLinkage(ltga, name, self.pairs, 2)
+            try:
+                for individuals in [ltga.individuals, later]:
+                    lookup = parallel.pairLookup(individuals)
+                    serial = optimizer(self.config)
+                    serial.individuals = individuals
+                    distance = getattr(serial, name)
+                    for a, b in self.pairs:
+                        expected = distance((a,), (b,), {})
+                        self.assertAlmostEqual(lookup[(a,), (b,)], expected,
+                                               12)
+                        self.assertAlmostEqual(lookup[(b,), (a,)], expected,
+                                               12)
+            finally:
+                parallel.close()
+
+    def test_sameOffspring(self):
+        # Workers only precompute distances, so the search is unchanged
+        offspring = []
+        for workers in [1, 2]:
+            config = dict(self.config, linkageWorkers=workers)
+            random.seed(2)
+            children = []
+            evolve(optimizer(config), config, Fixtures.evaluator(config), 150,
+                   lambda request: children.append(list(request.genes)))
+            offspring.append(children)
+        self.assertEqual(offspring[0], offspring[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+'''
+Behavioural tests of the persistent result store.
+'''
+import unittest
+import Experiments
+import Fixtures
+import ResultStore
+
+
+class TestConfigKey(unittest.TestCase):
+    def test_effectiveValues(self):
+        config = Fixtures.configuration()
+        key = ResultStore.configKey(config)
+        self.assertEqual(key, ResultStore.configKey(dict(config)))
+        self.assertEqual(key, ResultStore.configKey(
+            dict(config, verbose=True, runs=7, linkageWorkers=4)))
+        self.assertNotEqual(key, ResultStore.configKey(dict(config,
+                                                            popSize=21)))
+        self.assertNotEqual(key, ResultStore.configKey(
+            dict(config, hhcrsp=Fixtures.instance(config, 1))))
+
+
+class TestResultStore(Fixtures.FolderTestCase):
+    def test_roundTrip(self):
+        store = ResultStore.ResultStore('results.db')
+        config = {'popSize': 3}
+        store.put('key', 1, {'fitness': -2.5}, config)
+        store.put('key', 0, {'fitness': -1.0}, config)
+        store.put('key', 1, {'fitness': -2.0}, config)
+        store.put('other', 0, {'fitness': 0}, config)
+        store = ResultStore.ResultStore('results.db')
+        self.assertEqual(store.completed('key'), {0: {'fitness': -1.0},
+                                                  1: {'fitness': -2.0}})
+        self.assertEqual(store.results('key'), [{'fitness': -1.0},
+                                                {'fitness': -2.0}])
+        self.assertEqual(sorted(store.configs()),
+                         [('key', config), ('other', config)])
+
+    def test_skipsCompleted(self):
+        config = Fixtures.configuration(runs=2, resultStore='results.db')
+        first = Experiments.fullRun(config)
+        performed = []
+        performRun = Experiments.performRun
+
+        def counted(runNumber, config):
+            '''
+            Internal function recording which runs are performed.
+            '''
+            performed.append(runNumber)
+            return performRun(runNumber, config)
+
+        Experiments.performRun = counted
+        try:
+            second = Experiments.fullRun(dict(config, runs=3))
+        finally:
+            Experiments.performRun = performRun
+        self.assertEqual(performed, [2])
+        self.assertEqual(len(second), 3)
+        for stored, result in zip(second, first):
+            self.assertEqual(stored['fitness'], result['fitness'])
+            self.assertEqual(stored['evaluations'], result['evaluations'])
+
+
+if __name__ == '__main__':
+    unittest.main()
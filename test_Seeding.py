@@ -0,0 +1,70 @@
+'''
+Behavioural tests of the constructive heuristics seeding the population.
+'''
+import os
+import random
+import unittest
+import Experiments
+import Fixtures
+import Seeding
+import Util
+
+
+class TestSeeding(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(numActivities=15, seedRatio=1.0)
+        self.evaluator = Fixtures.evaluator(self.config)
+
+    def test_encode(self):
+        routes = {1: [3, 1], 3: [2, 5, 4]}
+        assignment, decoded = Util.decodeSchedule(Seeding.encode(routes, 5))
+        self.assertEqual(decoded, routes)
+        self.assertEqual(assignment, [1, 3, 1, 3, 3])
+
+    def test_heuristics(self):
+        seeder = Seeding.Seeder(self.config, self.evaluator)
+        activities = range(1, 16)
+        for heuristic in seeder.heuristics:
+            routes = heuristic()
+            self.assertEqual(sorted(sum(routes.values(), [])), activities)
+            self.assertTrue(set(routes) <= set([1, 2, 3]))
+            genes = Seeding.encode(routes, 15)
+            self.assertEqual(Util.decodeSchedule(genes)[1],
+                             dict((shift, route) for shift, route in
+                                  routes.iteritems() if route))
+
+    def test_betterThanRandom(self):
+        seeded = Seeding.genomeSource(self.config, self.evaluator)
+        drawn = Seeding.genomeSource(dict(self.config, seedRatio=0),
+                                     self.evaluator)
+        mean = lambda source: sum(self.evaluator.evaluate(source())
+                                  for _ in xrange(30)) / 30
+        self.assertTrue(mean(seeded) > mean(drawn))
+
+    def test_randomWithoutRatio(self):
+        source = Seeding.genomeSource(dict(self.config, seedRatio=0),
+                                      self.evaluator)
+        state = random.getstate()
+        genes = source()
+        random.setstate(state)
+        self.assertEqual(genes, Util.randomGene(self.config))
+
+
+class TestSeededPopulation(Fixtures.FolderTestCase):
+    def test_storedSeparately(self):
+        config = Fixtures.configuration(seedRatio=0.5, initialPopFolder='pops')
+        evaluator = Fixtures.evaluator(config)
+        seeded, _ = Experiments.createInitialPopulation(0, evaluator, config)
+        drawn, _ = Experiments.createInitialPopulation(
+            0, evaluator, dict(config, seedRatio=0))
+        self.assertEqual(len(os.listdir('pops')), 2)
+        self.assertNotEqual([individual.genes for individual in seeded],
+                            [individual.genes for individual in drawn])
+        for individual in seeded:
+            self.assertEqual(individual.fitness,
+                             evaluator.evaluate(individual.genes))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+'''
+Behavioural tests of the surrogate pre-screening offspring.
+'''
+import random
+import unittest
+import Experiments
+import Fixtures
+import Surrogate
+import Util
+from FitnessFunction import PredictedFitness
+from Individual import Individual
+from LTGA import LTGA
+
+
+class TestSurrogate(unittest.TestCase):
+    def setUp(self):
+        random.seed(0)
+        self.config = Fixtures.configuration(numActivities=15)
+        self.surrogate = Surrogate.Surrogate(self.config['hhcrsp'], 1.0, 0,
+                                             32)
+        self.weights = [3.0, -0.5, -1.0, -0.25, -0.75, -0.1]
+
+    def linear(self, individual):
+        '''
+        Returns a fitness the surrogate can model exactly.
+        '''
+        return sum(w * f for w, f in zip(self.weights,
+                                         self.surrogate.features(individual)))
+
+    def test_solve(self):
+        self.assertEqual([round(x, 9) for x in Surrogate.solve(
+            [[2.0, 1.0], [1.0, 3.0]], [5.0, 10.0])], [1.0, 3.0])
+
+    def test_learnsAndScreens(self):
+        for _ in xrange(64):
+            individual = Individual(Util.randomGene(self.config))
+            self.surrogate.observe(individual, self.linear(individual))
+        individual = Individual(Util.randomGene(self.config))
+        fitness = self.linear(individual)
+        individual.threshold = fitness - 1
+        better, skip, predicted = self.surrogate.screen(individual)
+        self.assertAlmostEqual(predicted, fitness, 3)
+        self.assertEqual((better, skip), (True, False))
+        individual.threshold = fitness + 1
+        better, skip, _ = self.surrogate.screen(individual)
+        self.assertEqual((better, skip), (False, True))
+        self.assertEqual(self.surrogate.screened, 1)
+
+    def test_warmup(self):
+        individual = Individual(Util.randomGene(self.config))
+        individual.threshold = 0
+        self.assertEqual(self.surrogate.screen(individual), (True, False, None))
+
+
+class TestScreenedRun(Fixtures.FolderTestCase):
+    def test_predictionsAreMarked(self):
+        config = Fixtures.configuration(acceptance='improving', surrogate=True,
+                                        surrogateWarmup=20,
+                                        surrogateMargin=0.5,
+                                        maximumEvaluations=3000)
+        evaluator = Fixtures.evaluator(config)
+        final = []
+        result = Experiments.oneRun(0, LTGA, evaluator, config, None, final)
+        self.assertTrue(result['surrogateScreened'] > 0)
+        # The best individual has a true fitness
+        self.assertEqual(evaluator.evaluate(final[0].genes), result['fitness'])
+        self.assertFalse(isinstance(result['fitness'], PredictedFitness))
+
+    def test_evaluateIndividuals(self):
+        config = Fixtures.configuration()
+        evaluator = Fixtures.evaluator(config)
+        surrogate = Surrogate.Surrogate(config['hhcrsp'], 0, 0, 16)
+        for individual in Fixtures.population(config, evaluator, 32):
+            surrogate.observe(individual, individual.fitness)
+        individuals = Fixtures.population(config, evaluator, 20, seed=1)
+        for individual in individuals:
+            individual.threshold = 0
+        result = {'evaluations': 0, 'partialEvaluations': 0}
+        lookup = {}
+        fitnesses = Experiments.evaluateIndividuals(
+            individuals, evaluator, lookup, result, config, surrogate)
+        # Nothing beats a threshold of 0, so all are screened out
+        self.assertEqual(result['evaluations'], 0)
+        self.assertEqual(lookup, {})
+        for fitness in fitnesses:
+            self.assertTrue(isinstance(fitness, PredictedFitness))
+            self.assertTrue(fitness <= 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
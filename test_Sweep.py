@@ -0,0 +1,48 @@
+'''
+Behavioural tests of the parameter sweep runner.
+'''
+import random
+import unittest
+import Experiments
+import Fixtures
+import Sweep
+from HHCRSP import HHCRSP
+
+
+class TestExpandSettings(unittest.TestCase):
+    def test_grid(self):
+        self.assertEqual(Sweep.expandSettings({'b': [1, 2], 'a': ['x']}),
+                         [{'a': 'x', 'b': 1}, {'a': 'x', 'b': 2}])
+
+    def test_list(self):
+        settings = [{'popSize': 10}, {'ordering': 'leastLinkedFirst'}]
+        self.assertEqual(Sweep.expandSettings(settings), settings)
+
+
+class TestSweep(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.config = Fixtures.configuration(runs=2, linkageWorkers=2)
+
+    def test_matchesFullRun(self):
+        settings = Sweep.expandSettings({'popSize': [10, 14]})
+        results = Sweep.sweep(self.config, settings, 2)
+        self.assertEqual(sorted(results), [(0, 0), (0, 1), (1, 0), (1, 1)])
+        # Sweeps seed runs like full runs with a result store
+        random.seed(self.config['seed'])
+        hhcrsp = HHCRSP(self.config)
+        for setting, overrides in enumerate(settings):
+            config = dict(self.config, hhcrsp=hhcrsp, linkageWorkers=1,
+                          resultStore='results%i.db' % setting, **overrides)
+            for runNumber, result in enumerate(Experiments.fullRun(config)):
+                swept = results[setting, runNumber]
+                self.assertEqual(swept['fitness'], result['fitness'])
+                self.assertEqual(swept['evaluations'], result['evaluations'])
+
+    def test_noIslands(self):
+        self.assertRaises(Exception, Sweep.sweep, self.config,
+                          [{'islands': 1}, {'islands': 2}], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+'''
+Behavioural tests of the evaluation trace recorder and reader.
+'''
+import os
+import random
+import unittest
+import Experiments
+import Fixtures
+import TraceRecorder
+from FitnessFunction import FitnessBound, PredictedFitness
+from Individual import Individual
+from LTGA import LTGA
+
+
+class TestTrace(Fixtures.FolderTestCase):
+    def setUp(self):
+        Fixtures.FolderTestCase.setUp(self)
+        self.records = []
+        for i in xrange(10):
+            individual = Individual([random.uniform(1, 4) for _ in xrange(5)])
+            if i % 4:
+                individual.origin = (i // 4, i, i + 1)
+            fitness = [-1.5 * i, FitnessBound(-2.0 * i),
+                       PredictedFitness(-0.5 * i)][i % 3]
+            self.records.append((individual, fitness))
+
+    def write(self, filename, chunkSize):
+        '''
+        Writes the records to a trace file.
+        '''
+        recorder = TraceRecorder.TraceRecorder(filename, 5, chunkSize)
+        for individual, fitness in self.records:
+            recorder.record(individual, fitness)
+        recorder.close()
+        self.assertEqual(recorder.records, 10)
+
+    def test_roundTrip(self):
+        self.write(os.path.join('traces', 'r0.trace'), 3)
+        reader = TraceRecorder.TraceReader(os.path.join('traces', 'r0.trace'))
+        self.assertEqual(reader.length, 5)
+        self.assertEqual([len(chunk['fitness']) for chunk in reader.chunks()],
+                         [3, 3, 3, 1])
+        records = list(reader.records())
+        self.assertEqual(len(records), 10)
+        for (individual, fitness), record in zip(self.records, records):
+            generation, mask, parent, genes, value = record
+            self.assertEqual((generation, mask, parent),
+                             individual.origin or TraceRecorder.NO_ORIGIN)
+            self.assertEqual(list(genes), individual.genes)
+            self.assertEqual(value, fitness)
+            self.assertEqual(type(value), type(fitness))
+
+    def test_cutShort(self):
+        self.write('r0.trace', 4)
+        with open('r0.trace', 'rb') as f:
+            data = f.read()
+        with open('r0.trace', 'wb') as f:
+            f.write(data[:-8])
+        records = list(TraceRecorder.TraceReader('r0.trace').records())
+        self.assertEqual(len(records), 8)
+
+    def test_notATrace(self):
+        with open('r0.trace', 'wb') as f:
+            f.write('\0' * 64)
+        self.assertRaises(Exception, TraceRecorder.TraceReader, 'r0.trace')
+
+
+class TestTracedRun(Fixtures.FolderTestCase):
+    def test_run(self):
+        config = Fixtures.configuration(traceChunkSize=64)
+        self.assertEqual(TraceRecorder.recorderFor(0, config), None)
+        config['traceFolder'] = 'traces'
+        result = Experiments.oneRun(0, LTGA, Fixtures.evaluator(config),
+                                    config)
+        folder = os.path.join('traces', os.listdir('traces')[0])
+        reader = TraceRecorder.TraceReader(os.path.join(folder, 'r0.trace'))
+        records = list(reader.records())
+        self.assertEqual(len(records), result['traceRecords'])
+        self.assertEqual(len(records), result['evaluations'])
+        self.assertTrue(all(record[0] >= 0 for record in records))
+        self.assertEqual(max(record[4] for record in records),
+                         result['fitness'])
+
+
+if __name__ == '__main__':
+    unittest.main()